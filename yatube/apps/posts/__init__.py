@@ -0,0 +1 @@
+default_app_config = 'apps.posts.apps.PostsConfig'
@@ -1,16 +1,56 @@
 from django.contrib import admin
+from django.db.models import Q
 
-from .models import Comment, Follow, Group, Post
+from .models import Comment, Follow, Group, Post, Task
+from .pagination import EstimatedCountPaginator
+from .search import search_posts
+from .services import follow, unfollow
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """ Класс LargeTableAdmin используется как основа конфигурации моделей с
+    большими таблицами в админ-панели.
+
+    Атрибуты класса
+    --------
+    paginator : Type[Paginator]
+        Пагинатор с оценочным числом записей
+    show_full_result_count : bool
+        Не выполнять отдельный COUNT(*) по всей таблице при поиске
+    username_search_fields : Tuple[str]
+        Поля-ссылки на пользователя, по которым выполняется поиск по точному
+        имени пользователя (по уникальному индексу username)
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    username_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        """Вернуть записи пользователей с именем search_term."""
+        search_term = search_term.strip()
+        if not self.username_search_fields or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        condition = Q()
+        for field in self.username_search_fields:
+            condition |= Q(**{f'{field}__username': search_term})
+        return queryset.filter(condition), False
+
+
+class PostAdmin(LargeTableAdmin):
     """ Класс PostAdmin используется для конфигурации отображения модели Post
     в админ-панели.
 
+    Поиск выполняется по полнотекстовому индексу (см. search.search_posts).
+
     Атрибуты класса
     --------
     list_display : Tuple[str]
         Список отображаемых полей
+    list_select_related : Tuple[str]
+        Связанные модели, загружаемые вместе со списком
+    autocomplete_fields : Tuple[str]
+        Поля-ссылки с выбором через автодополнение
     search_fields : Tuple[str]
         Список полей по которым осуществляется поиск
     list_filter : Tuple[str]
@@ -20,10 +60,18 @@ class PostAdmin(admin.ModelAdmin):
     """
 
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Вернуть записи, найденные по полнотекстовому индексу."""
+        if not search_term.strip():
+            return queryset, False
+        return search_posts(search_term, queryset), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """ Класс GroupAdmin используется для конфигурации отображения модели Group
@@ -44,41 +92,106 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     """ Класс FollowAdmin используется для конфигурации отображения модели
     Follow в админ-панели.
 
+    Подписки создаются и удаляются через services.follow() и
+    services.unfollow(), как на сайте и в API; у существующей подписки
+    пользователя и автора изменить нельзя.
+
     Атрибуты класса
     --------
     list_display : Tuple[str]
         Список отображаемых полей
+    list_select_related : Tuple[str]
+        Связанные модели, загружаемые вместе со списком
+    autocomplete_fields : Tuple[str]
+        Поля-ссылки с выбором через автодополнение
     search_fields : Tuple[str]
         Список полей по которым осуществляется поиск
+    username_search_fields : Tuple[str]
+        Поля-ссылки на пользователя для поиска по имени
     empty_value_display : str
         Значение отображаемое вместо пустой строки.
     """
 
     list_display = ('user', 'author')
-    list_filter = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    username_search_fields = ('user', 'author')
     empty_value_display = '-пусто-'
 
+    def get_readonly_fields(self, request, obj=None):
+        """Запретить изменение пользователя и автора подписки."""
+        if obj is not None:
+            return ('user', 'author')
+        return super().get_readonly_fields(request, obj)
+
+    def save_model(self, request, obj, form, change):
+        """Создать подписку одним INSERT; повторная подписка не создает
+        дубликат, а открывает существующую."""
+        if change:
+            return
+        follow(obj.user, obj.author_id)
+        obj.pk = Follow.objects.filter(
+            user=obj.user, author_id=obj.author_id).values_list(
+            'pk', flat=True).get()
+
+    def delete_model(self, request, obj):
+        """Удалить подписку с обновлением статистики и ленты."""
+        unfollow(obj.user, obj.author_id)
+
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     """ Класс CommentAdmin используется для конфигурации отображения модели
-    Group в админ-панели.
+    Comment в админ-панели.
 
     Атрибуты класса
     --------
     list_display : Tuple[str]
         Список отображаемых полей
+    list_select_related : Tuple[str]
+        Связанные модели, загружаемые вместе со списком
+    autocomplete_fields : Tuple[str]
+        Поля-ссылки с выбором через автодополнение
+    raw_id_fields : Tuple[str]
+        Поля-ссылки с вводом первичного ключа
     search_fields : Tuple[str]
         Список полей по которым осуществляется поиск
+    username_search_fields : Tuple[str]
+        Поля-ссылки на пользователя для поиска по имени
     empty_value_display : str
         Значение отображаемое вместо пустой строки.
     """
 
     list_display = ('post', 'author', 'text')
-    search_fields = ('author',)
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
+    search_fields = ('author__username',)
+    username_search_fields = ('author',)
+    empty_value_display = '-пусто-'
+
+
+class TaskAdmin(LargeTableAdmin):
+    """ Класс TaskAdmin используется для конфигурации отображения модели
+    Task в админ-панели.
+
+    Атрибуты класса
+    --------
+    list_display : Tuple[str]
+        Список отображаемых полей
+    list_filter : Tuple[str]
+        Список полей по которым может применен фильтр
+    empty_value_display : str
+        Значение отображаемое вместо пустой строки.
+    """
+
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'created',
+                    'finished', 'worker')
+    list_filter = ('status',)
     empty_value_display = '-пусто-'
 
 
@@ -86,3 +199,4 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(Task, TaskAdmin)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'apps.posts'
+
+    def ready(self):
+        """Подключить обработчики сигналов моделей приложения."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,16 @@
+from django.conf import settings
+
+from .tasks import enqueue
+
+
+def run_in_background(func, *args, **kwargs):
+    """Выполнить func вне обработчика запроса.
+
+    Задача ставится в очередь на базе БД (см. tasks.enqueue) в текущей
+    транзакции и выполняется обработчиком manage.py run_tasks. При
+    BACKGROUND_TASKS_EAGER = True задача выполняется сразу в текущем
+    потоке, что удобно для тестов и management-команд.
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        return func(*args, **kwargs)
+    return enqueue(func, *args, **kwargs)
@@ -0,0 +1,258 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Число ключей в одном запросе get_many/delete_many (предел параметров
+# SQLite)
+_CHUNK_SIZE = 500
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entries ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_entries_accessed '
+    'ON cache_entries (accessed)',
+)
+
+_ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+def _encode(value):
+    """Целые числа хранятся как INTEGER SQLite (для атомарного incr),
+    остальные значения -- сериализованными pickle."""
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(value):
+    return value if isinstance(value, int) else pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """ Класс SQLiteCache -- бэкенд кэша Django в файле SQLite, общий для
+    всех процессов (воркеров gunicorn) одного сервера.
+
+    Родительский класс -- BaseCache.
+
+    Файл открывается в режиме WAL: чтения не блокируют запись и друг друга.
+    Каждый поток каждого процесса держит свое постоянное соединение.
+    incr/decr выполняются одним UPDATE в транзакции, поэтому счетчики
+    (кэш страниц, ограничение частоты запросов) не теряют приращения при
+    конкурентном доступе. При превышении MAX_ENTRIES вытесняются записи,
+    к которым дольше всего не обращались (LRU).
+
+    Параметры OPTIONS (помимо MAX_ENTRIES и CULL_FREQUENCY)
+    --------
+    BUSY_TIMEOUT : float
+        сколько секунд ждать блокировки записи (по умолчанию 5)
+    ACCESS_RESOLUTION : float
+        время последнего обращения при чтении обновляется не чаще раза в
+        столько секунд, чтобы чтение не превращалось в запись
+        (по умолчанию 10)
+    CULL_CHECK_INTERVAL : int
+        размер кэша проверяется раз в столько записей каждым соединением
+        (по умолчанию 64)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        if not location:
+            raise ValueError('Для SQLiteCache нужно указать LOCATION -- '
+                             'путь к файлу кэша')
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._access_resolution = float(
+            options.get('ACCESS_RESOLUTION', 10))
+        self._cull_interval = int(options.get('CULL_CHECK_INTERVAL', 64))
+        self._local = threading.local()
+
+    def _connection(self):
+        """Вернуть соединение текущего потока; после fork открыть новое."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout,
+                isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid, local.writes = (
+                connection, os.getpid(), 0)
+        return local.connection
+
+    @contextmanager
+    def _write(self):
+        """Выполнить блок в транзакции с немедленной блокировкой записи."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        self._maybe_cull(connection)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key = ? AND expires <= ?',
+                (key, now))
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache_entries VALUES (?, ?, ?, ?)',
+                (key, _encode(value), self.get_backend_timeout(timeout), now))
+            return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            f'SELECT value, accessed FROM cache_entries '
+            f'WHERE key = ? AND {_ALIVE}', (key, now)).fetchone()
+        if row is None:
+            return default
+        if now - row[1] > self._access_resolution:
+            connection.execute(
+                'UPDATE cache_entries SET accessed = ? WHERE key = ?',
+                (now, key))
+        return _decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)',
+            (key, _encode(value), self.get_backend_timeout(timeout),
+             time.time()))
+        self._maybe_cull(connection)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            f'UPDATE cache_entries SET expires = ? WHERE key = ? AND {_ALIVE}',
+            (self.get_backend_timeout(timeout), key, time.time()))
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            f'SELECT 1 FROM cache_entries WHERE key = ? AND {_ALIVE}',
+            (key, time.time())).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно увеличить значение на delta и вернуть новое значение."""
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as connection:
+            cursor = connection.execute(
+                f'UPDATE cache_entries SET value = value + ? '
+                f"WHERE key = ? AND {_ALIVE} AND typeof(value) = 'integer'",
+                (delta, key, now))
+            row = connection.execute(
+                f'SELECT value FROM cache_entries WHERE key = ? AND {_ALIVE}',
+                (key, now)).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            if cursor.rowcount == 1:
+                return row[0]
+            # значение не целое (например, float): сложение в Python
+            value = _decode(row[0]) + delta
+            connection.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (_encode(value), key))
+            return value
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        now = time.time()
+        connection = self._connection()
+        found, stale = {}, []
+        names = list(keys)
+        for start in range(0, len(names), _CHUNK_SIZE):
+            chunk = names[start:start + _CHUNK_SIZE]
+            rows = connection.execute(
+                f'SELECT key, value, accessed FROM cache_entries '
+                f'WHERE key IN ({", ".join("?" * len(chunk))}) AND {_ALIVE}',
+                (*chunk, now))
+            for key, value, accessed in rows:
+                found[keys[key]] = _decode(value)
+                if now - accessed > self._access_resolution:
+                    stale.append((now, key))
+        if stale:
+            connection.executemany(
+                'UPDATE cache_entries SET accessed = ? WHERE key = ?', stale)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [(self._key(key, version), _encode(value), expires, now)
+                for key, value in data.items()]
+        with self._write() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?)',
+                rows)
+        return []
+
+    def delete_many(self, keys, version=None):
+        rows = [(self._key(key, version),) for key in keys]
+        with self._write() as connection:
+            connection.executemany(
+                'DELETE FROM cache_entries WHERE key = ?', rows)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def _maybe_cull(self, connection):
+        """Раз в CULL_CHECK_INTERVAL записей удалить истекшие записи и,
+        если записей больше MAX_ENTRIES, вытеснить давно не читавшиеся."""
+        local = self._local
+        local.writes += 1
+        if local.writes % self._cull_interval:
+            return
+        count, = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache_entries WHERE expires <= ?',
+                           (time.time(),))
+        count, = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache_entries')
+            return
+        excess = max(count // self._cull_frequency,
+                     count - self._max_entries)
+        connection.execute(
+            'DELETE FROM cache_entries WHERE key IN (SELECT key FROM '
+            'cache_entries ORDER BY accessed LIMIT ?)', (excess,))
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TIMEOUT = getattr(settings, 'POST_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+# Период (с) переноса счетчиков попаданий из памяти процесса в кэш
+STATS_FLUSH_INTERVAL = getattr(settings, 'POST_CARD_STATS_FLUSH_INTERVAL', 60)
+HITS_KEY = 'post_card:hits'
+MISSES_KEY = 'post_card:misses'
+LIKE_PLACEHOLDER = '<!--post-card:like-->'
+EDIT_PLACEHOLDER = '<!--post-card:edit-->'
+
+
+def card_cache_key(post):
+    """Вернуть ключ кэша общей части карточки поста.
+
+    Ключ включает версию поста, которая увеличивается при редактировании,
+    смене изображения, лайках и комментариях, а также имя автора.
+    """
+    return f'post_card:{post.pk}:{post.version}:{post.author.username}'
+
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def _take_pending():
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    return pending
+
+
+def _count(key):
+    """Увеличить счетчик попаданий или промахов кэша карточек.
+
+    Счетчики копятся в памяти процесса и переносятся в кэш не чаще раза в
+    STATS_FLUSH_INTERVAL секунд: запись в общий кэш на каждую карточку
+    была бы транзакцией записи SQLiteCache при каждом рендере ленты.
+    """
+    global _flushed_at
+    with _pending_lock:
+        _pending[key] += 1
+        now = time.monotonic()
+        if now - _flushed_at < STATS_FLUSH_INTERVAL:
+            return
+        _flushed_at = now
+    flush_card_stats()
+
+
+def flush_card_stats():
+    """Перенести накопленные процессом счетчики в кэш."""
+    for key, value in _take_pending().items():
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            pass
+
+
+def get_card_stats():
+    """Вернуть число попаданий и промахов кэша карточек.
+
+    Учитываются счетчики текущего процесса и перенесенные в кэш другими
+    процессами (с задержкой до STATS_FLUSH_INTERVAL секунд).
+    """
+    flush_card_stats()
+    stats = cache.get_many([HITS_KEY, MISSES_KEY])
+    return stats.get(HITS_KEY, 0), stats.get(MISSES_KEY, 0)
+
+
+def reset_card_stats():
+    """Обнулить счетчики попаданий и промахов кэша карточек."""
+    _take_pending()
+    cache.set_many({HITS_KEY: 0, MISSES_KEY: 0}, timeout=None)
+
+
+def render_post_card(post, request=None, user=None):
+    """Вернуть HTML карточки поста.
+
+    Не зависящая от пользователя часть карточки берется из кэша, а в нее
+    подставляются отрендеренные для текущего пользователя кнопка лайка и
+    кнопка редактирования.
+    """
+    key = card_cache_key(post)
+    html = cache.get(key)
+    if html is None:
+        _count(MISSES_KEY)
+        html = render_to_string('includes/card_post_shared.html',
+                                {'post': post})
+        cache.set(key, html, CARD_TIMEOUT)
+    else:
+        _count(HITS_KEY)
+    context = {'post': post, 'request': request, 'user': user}
+    like = render_to_string('includes/card_post_like.html', context)
+    edit = ''
+    if user is not None and user == post.author:
+        edit = render_to_string('includes/card_post_edit.html', context)
+    return mark_safe(html.replace(LIKE_PLACEHOLDER, like).replace(
+        EDIT_PLACEHOLDER, edit))
@@ -0,0 +1,105 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Like, Post, User
+
+
+def _shifted(field, delta):
+    """Вернуть выражение field + delta, не опускающееся ниже нуля."""
+    return Greatest(F(field) + delta, 0)
+
+
+def _pk_filter(pk):
+    """Вернуть условие отбора по первичному ключу или списку ключей."""
+    if isinstance(pk, (list, tuple, set, frozenset)):
+        return {'pk__in': pk}
+    return {'pk': pk}
+
+
+def adjust_post_counters(post_id, likes=0, comments=0):
+    """Изменить денормализованные счетчики поста на заданные величины.
+
+    Обновление выполняется одним UPDATE с выражением F(), поэтому
+    конкурентные изменения не теряются. Значения не опускаются ниже нуля.
+    Вместе со счетчиками увеличивается версия поста. Вместо post_id можно
+    передать список ключей, чтобы изменить счетчики нескольких постов на
+    одну и ту же величину.
+    """
+    changes = {}
+    if likes:
+        changes['likes_count'] = _shifted('likes_count', likes)
+    if comments:
+        changes['comments_count'] = _shifted('comments_count', comments)
+    if changes:
+        Post.objects.filter(**_pk_filter(post_id)).update(
+            version=F('version') + 1, **changes)
+
+
+def bump_post_versions(**filters):
+    """Увеличить версию постов, отобранных по filters."""
+    Post.objects.filter(**filters).update(version=F('version') + 1)
+
+
+def adjust_author_stats(user_id, posts=0, followers=0, following=0):
+    """Изменить статистику автора на заданные величины одним UPDATE.
+
+    Вместо user_id можно передать список ключей пользователей."""
+    changes = {}
+    if posts:
+        changes['posts_count'] = _shifted('posts_count', posts)
+    if followers:
+        changes['followers_count'] = _shifted('followers_count', followers)
+    if following:
+        changes['following_count'] = _shifted('following_count', following)
+    if changes:
+        AuthorStats.objects.filter(**_pk_filter(user_id)).update(**changes)
+
+
+def count_subquery(model, field, outer='pk'):
+    """Вернуть подзапрос с числом записей model, у которых field == outer."""
+    queryset = model.objects.filter(**{field: OuterRef(outer)}).order_by(
+    ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(queryset, output_field=IntegerField()), 0)
+
+
+def rebuild_post_counters(dry_run=False):
+    """Пересчитать счетчики постов, разошедшиеся с фактическими данными.
+
+    Вернуть число постов с расхождениями.
+    """
+    likes = count_subquery(Like, 'post')
+    comments = count_subquery(Comment, 'post')
+    drifted = Post.objects.exclude(likes_count=likes,
+                                   comments_count=comments)
+    if dry_run:
+        return drifted.count()
+    return drifted.update(likes_count=likes, comments_count=comments)
+
+
+def rebuild_author_stats(user_ids=None, dry_run=False):
+    """Создать недостающие записи AuthorStats и пересчитать разошедшиеся.
+
+    Вернуть пару: число созданных записей и число записей с расхождениями.
+    """
+    users = User.objects.all()
+    stats = AuthorStats.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        stats = stats.filter(pk__in=user_ids)
+    missing = users.filter(stats__isnull=True).values_list('pk', flat=True)
+    if dry_run:
+        created = missing.count()
+    else:
+        created = len(AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=pk) for pk in missing],
+            ignore_conflicts=True))
+    posts = count_subquery(Post, 'author', 'user')
+    followers = count_subquery(Follow, 'author', 'user')
+    following = count_subquery(Follow, 'user', 'user')
+    drifted = stats.exclude(posts_count=posts, followers_count=followers,
+                            following_count=following)
+    if dry_run:
+        return created, drifted.count()
+    return created, drifted.update(posts_count=posts,
+                                   followers_count=followers,
+                                   following_count=following)
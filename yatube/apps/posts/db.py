@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+@contextmanager
+def immediate_atomic(using=None):
+    """Выполнить блок в transaction.atomic, на SQLite с параметром
+    immediate_writes (бэкенд apps.posts.sqlite) -- в транзакции BEGIN
+    IMMEDIATE.
+
+    Обычная транзакция SQLite получает блокировку записи только при первом
+    изменении; если к этому моменту другой процесс уже пишет, транзакция
+    с прочитанными данными не может дождаться блокировки и сразу падает с
+    "database is locked". BEGIN IMMEDIATE берет блокировку в начале, и
+    конкурирующие запросы ждут ее в пределах busy_timeout. Вложенный блок
+    работает как обычный atomic. Используется и как декоратор.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    if (not connection.in_atomic_block
+            and connection.settings_dict['OPTIONS'].get('immediate_writes')):
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using):
+            connection.begin_immediate = False
+            yield
+    finally:
+        connection.begin_immediate = False
+
+
+class WriteTransactionMixin:
+    """ Класс WriteTransactionMixin выполняет изменяющие запросы (POST, PUT,
+    PATCH, DELETE) представления Django или DRF в транзакции
+    immediate_atomic. В представлениях Django ставится после
+    LoginRequiredMixin, чтобы переадресация на вход не брала блокировку
+    записи.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with immediate_atomic():
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,112 @@
+import zlib
+from datetime import datetime
+
+import orjson
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Follow, Group, Like, Post, User
+
+# Выгружаемые данные в порядке зависимостей: запись каждого вида ссылается
+# только на записи видов, выгруженных раньше. Для каждого вида: модель,
+# имена полей записи, соответствующие им поля выборки и поле даты для
+# инкрементальной выгрузки (None -- выгружается целиком)
+EXPORT_KINDS = {
+    'users': (User, ('username', 'first_name', 'last_name', 'email',
+                     'date_joined'), None, 'date_joined'),
+    'groups': (Group, ('title', 'slug', 'description'), None, None),
+    'posts': (Post, ('id', 'author', 'group', 'text', 'pub_date', 'image'),
+              ('id', 'author__username', 'group__slug', 'text', 'pub_date',
+               'image'), 'pub_date'),
+    'comments': (Comment, ('id', 'post', 'author', 'text', 'created'),
+                 ('id', 'post_id', 'author__username', 'text', 'created'),
+                 'created'),
+    'likes': (Like, ('user', 'post', 'created'),
+              ('user__username', 'post_id', 'created'), 'created'),
+    'follows': (Follow, ('user', 'author'),
+                ('user__username', 'author__username'), None),
+}
+
+# Тип записи в NDJSON для каждого вида данных
+RECORD_TYPES = {'users': 'user', 'groups': 'group', 'posts': 'post',
+                'comments': 'comment', 'likes': 'like', 'follows': 'follow'}
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+def parse_since(value):
+    """Разобрать дату или дату и время начала выгрузки.
+
+    Время без часового пояса считается заданным в текущем поясе. Вызвать
+    ValueError, если значение не распознано.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Некорректная дата: {value}')
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_kinds(value):
+    """Разобрать список видов данных через запятую. Пустое значение --
+    все виды. Вызвать ValueError для неизвестного вида."""
+    if not value:
+        return list(EXPORT_KINDS)
+    kinds = [kind.strip() for kind in value.split(',') if kind.strip()]
+    unknown = set(kinds) - set(EXPORT_KINDS)
+    if unknown:
+        raise ValueError('Неизвестные виды данных: '
+                         + ', '.join(sorted(unknown)))
+    return [kind for kind in EXPORT_KINDS if kind in kinds]
+
+
+def iter_rows(kind, since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Выдать записи вида kind словарями.
+
+    Строки читаются пачками по chunk_size с продолжением от последнего
+    первичного ключа, поэтому память не зависит от размера таблицы, а
+    каждая пачка -- короткий запрос по индексу первичного ключа.
+    """
+    model, names, columns, date_field = EXPORT_KINDS[kind]
+    columns = columns or names
+    queryset = model.objects.order_by('pk')
+    if since is not None and date_field is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    record_type = RECORD_TYPES[kind]
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(chunk.values_list('pk', *columns)[:chunk_size])
+        for row in rows:
+            record = {'type': record_type}
+            record.update(zip(names, row[1:]))
+            yield record
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0]
+
+
+def iter_ndjson(kinds=None, since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Выдать выгрузку строками NDJSON (bytes) для видов kinds."""
+    for kind in kinds or EXPORT_KINDS:
+        for record in iter_rows(kind, since, chunk_size):
+            yield orjson.dumps(record) + b'\n'
+
+
+def gzip_stream(chunks, batch_size=64 * 1024):
+    """Сжать поток байтов в формат gzip, выдавая сжатые блоки."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    buffer, size = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= batch_size:
+            data = compressor.compress(b''.join(buffer))
+            buffer, size = [], 0
+            if data:
+                yield data
+    yield compressor.compress(b''.join(buffer)) + compressor.flush()
@@ -0,0 +1,448 @@
+import orjson
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Max, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import page_cache, search, timeline
+from .counters import rebuild_author_stats, rebuild_post_counters
+from .db import immediate_atomic
+from .export import RECORD_TYPES
+from .models import Comment, Follow, Group, Like, Post, User
+
+# Число записей одного вида, сохраняемых одним bulk_create
+IMPORT_BATCH_SIZE = getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+
+# Виды данных в порядке зависимостей (как в выгрузке)
+IMPORT_KINDS = tuple(RECORD_TYPES)
+_KIND_BY_TYPE = {record_type: kind
+                 for kind, record_type in RECORD_TYPES.items()}
+
+# Сколько сообщений об ошибках хранить для отчета
+MAX_REPORTED_ERRORS = 20
+
+# Число строк в одном UPDATE дат из выгрузки (по два параметра на строку
+# в CASE и один в IN не превышают ограничение SQLite в 999 параметров)
+DATES_UPDATE_SIZE = 300
+
+
+class RecordError(ValueError):
+    """Запись выгрузки не может быть загружена."""
+
+
+def _text(record, field, required=True, default=''):
+    value = record.get(field)
+    if value is None or value == '':
+        if required:
+            raise RecordError(f'не указано поле {field}')
+        return default
+    if not isinstance(value, str):
+        raise RecordError(f'поле {field} должно быть строкой')
+    return value
+
+
+def _id(record, field, required=True):
+    value = record.get(field)
+    if value is None and not required:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise RecordError(f'поле {field} должно быть целым числом')
+    return value
+
+
+def _moment(record, field):
+    value = record.get(field)
+    if value is None:
+        return timezone.now()
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        raise RecordError(f'некорректная дата в поле {field}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _set_dates(model, field_name, dates):
+    """Записать даты из выгрузки в поле field_name с auto_now_add.
+
+    bulk_create заполняет такие поля текущим временем, поэтому после
+    вставки даты dates ({ключ: дата}) записываются одним UPDATE с CASE на
+    DATES_UPDATE_SIZE строк.
+    """
+    dates = list(dates.items())
+    for start in range(0, len(dates), DATES_UPDATE_SIZE):
+        chunk = dates[start:start + DATES_UPDATE_SIZE]
+        model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(**{
+            field_name: Case(*(When(pk=pk, then=Value(moment))
+                               for pk, moment in chunk),
+                             output_field=DateTimeField())})
+
+
+class Importer:
+    """ Класс Importer загружает записи выгрузки (см. export) пачками.
+
+    Записи накапливаются по видам и сохраняются одним bulk_create на пачку
+    в отдельной транзакции, без сигналов и save() моделей. Имена
+    пользователей и слаги групп переводятся в ключи через словари в
+    памяти, недостающие ключи запрашиваются одним запросом на пачку.
+    Дубликаты (пользователь с тем же именем, группа с тем же слагом,
+    пост или комментарий с тем же id, повторный лайк или подписка)
+    пропускаются, поэтому загрузку можно повторить.
+
+    Посты и комментарии сохраняются с id из выгрузки, чтобы на них могли
+    ссылаться комментарии и лайки; записям без id ключи выдаются подряд
+    после наибольшего в таблице. Даты из выгрузки записываются после
+    вставки (см. _set_dates). Денормализованные счетчики, статистика
+    авторов, ленты подписчиков и поисковый индекс не обновляются на каждую
+    запись, а перестраиваются один раз методом finish().
+
+    Атрибуты класса
+    --------
+    batch_size : int
+        число записей одного вида в пачке
+    stats : Dict[str, Dict[str, int]]
+        число созданных (created), пропущенных (skipped) и ошибочных
+        (failed) записей по видам данных
+    errors : List[str]
+        первые MAX_REPORTED_ERRORS сообщений об ошибках
+
+    Методы класса
+    --------
+    load_lines() -- загружает строки NDJSON.
+    add() -- добавляет запись в пачку своего вида.
+    flush() -- сохраняет накопленные пачки.
+    finish() -- перестраивает производные данные после загрузки.
+    """
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = {kind: {'created': 0, 'skipped': 0, 'failed': 0}
+                      for kind in IMPORT_KINDS}
+        self.errors = []
+        self.malformed = 0
+        self.users = {}
+        self.groups = {}
+        self._buffers = {kind: [] for kind in IMPORT_KINDS}
+        self._authors = set()
+        self._touched_posts = set()
+        self._touched_groups = set()
+
+    @property
+    def total(self):
+        """Вернуть число обработанных записей."""
+        return self.malformed + sum(
+            sum(counts.values()) for counts in self.stats.values())
+
+    def _fail(self, kind, message):
+        if kind is None:
+            self.malformed += 1
+        else:
+            self.stats[kind]['failed'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def load_lines(self, lines):
+        """Загрузить записи из итератора строк NDJSON (str или bytes)."""
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                self._fail(None, f'строка {number}: {exc}')
+                continue
+            self.add(record, number)
+
+    def add(self, record, number=None):
+        """Добавить запись в пачку; заполненная пачка сохраняется сразу."""
+        kind = (_KIND_BY_TYPE.get(record.get('type'))
+                if isinstance(record, dict) else None)
+        if kind is None:
+            self._fail(None, f'строка {number}: неизвестный тип записи')
+            return
+        buffer = self._buffers[kind]
+        buffer.append((number, record))
+        if len(buffer) >= self.batch_size:
+            self.flush(kind)
+
+    def flush(self, kind=None):
+        """Сохранить пачки вида kind и видов, от которых он зависит
+        (по умолчанию -- все пачки)."""
+        last = IMPORT_KINDS.index(kind) if kind else len(IMPORT_KINDS) - 1
+        for current in IMPORT_KINDS[:last + 1]:
+            batch = self._buffers[current]
+            if not batch:
+                continue
+            self._buffers[current] = []
+            # блокировка записи с начала транзакции: ключи новых записей
+            # выдаются по наибольшему ключу таблицы (см. _assign_ids)
+            with immediate_atomic():
+                getattr(self, f'_save_{current}')(self._parse(current, batch))
+
+    def _parse(self, kind, batch):
+        """Разобрать записи пачки, пропустив ошибочные."""
+        parse = getattr(self, f'_parse_{kind[:-1]}')
+        rows = []
+        for number, record in batch:
+            try:
+                row = parse(record)
+                row['line'] = number
+                rows.append(row)
+            except RecordError as exc:
+                self._fail(kind, f'строка {number}: {exc}')
+        return rows
+
+    def _resolve(self, cache, model, field, names):
+        """Дополнить словарь cache ключами объектов model по значениям
+        field одним запросом."""
+        unknown = {name for name in names if name not in cache}
+        if unknown:
+            cache.update(model.objects.filter(
+                **{f'{field}__in': unknown}).values_list(field, 'pk'))
+
+    def _save_new(self, kind, rows, key, existing, model, build):
+        """Сохранить строки, ключ которых не встречался раньше, одним
+        bulk_create. Вернуть сохраненные строки."""
+        new, seen = [], set(existing)
+        for row in rows:
+            if row[key] in seen:
+                self.stats[kind]['skipped'] += 1
+            else:
+                seen.add(row[key])
+                new.append(row)
+        model.objects.bulk_create([build(row) for row in new],
+                                  batch_size=self.batch_size)
+        self.stats[kind]['created'] += len(new)
+        return new
+
+    @staticmethod
+    def _parse_user(record):
+        return {'username': _text(record, 'username'),
+                'first_name': _text(record, 'first_name', False),
+                'last_name': _text(record, 'last_name', False),
+                'email': _text(record, 'email', False),
+                'date_joined': _moment(record, 'date_joined')}
+
+    def _save_users(self, rows):
+        names = {row['username'] for row in rows}
+        self._resolve(self.users, User, 'username', names)
+        # у загруженных пользователей нет пароля: вход после сброса пароля
+        password = make_password(None)
+        new = self._save_new('users', rows, 'username', self.users, User,
+                             lambda row: User(
+                                 username=row['username'],
+                                 first_name=row['first_name'],
+                                 last_name=row['last_name'],
+                                 email=row['email'],
+                                 date_joined=row['date_joined'],
+                                 password=password))
+        self._resolve(self.users, User, 'username',
+                      [row['username'] for row in new])
+
+    @staticmethod
+    def _parse_group(record):
+        return {'title': _text(record, 'title'),
+                'slug': _text(record, 'slug'),
+                'description': _text(record, 'description', False)}
+
+    def _save_groups(self, rows):
+        self._resolve(self.groups, Group, 'slug',
+                      {row['slug'] for row in rows})
+        new = self._save_new('groups', rows, 'slug', self.groups, Group,
+                             lambda row: Group(
+                                 title=row['title'], slug=row['slug'],
+                                 description=row['description']))
+        self._resolve(self.groups, Group, 'slug',
+                      [row['slug'] for row in new])
+        self._touched_groups.update(row['slug'] for row in new)
+
+    def _check_references(self, kind, rows, checks):
+        """Оставить строки, все ссылки которых найдены.
+
+        checks -- пары (поле строки, функция получения ключа по значению).
+        Найденные ключи записываются в поле с суффиксом _id.
+        """
+        valid = []
+        for row in rows:
+            for field, lookup in checks:
+                value = row[field]
+                pk = lookup(value) if value is not None else None
+                if value is not None and pk is None:
+                    self._fail(kind, f'строка {row["line"]}: не найден '
+                                     f'{field} {value}')
+                    break
+                row[f'{field}_id'] = pk
+            else:
+                valid.append(row)
+        return valid
+
+    @staticmethod
+    def _assign_ids(model, rows):
+        """Выдать строкам без id ключи подряд после наибольшего ключа
+        таблицы и пачки, чтобы после вставки записать их даты."""
+        missing = [row for row in rows if row['id'] is None]
+        if not missing:
+            return
+        last = max([model.objects.aggregate(last=Max('pk'))['last'] or 0]
+                   + [row['id'] for row in rows if row['id'] is not None])
+        for number, row in enumerate(missing, last + 1):
+            row['id'] = number
+
+    def _existing_posts(self, ids):
+        return set(Post.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True))
+
+    @staticmethod
+    def _parse_post(record):
+        return {'id': _id(record, 'id', required=False),
+                'author': _text(record, 'author'),
+                'group': _text(record, 'group', False, None),
+                'text': _text(record, 'text'),
+                'pub_date': _moment(record, 'pub_date'),
+                'image': _text(record, 'image', False)}
+
+    def _save_posts(self, rows):
+        self._resolve(self.users, User, 'username',
+                      {row['author'] for row in rows})
+        self._resolve(self.groups, Group, 'slug',
+                      {row['group'] for row in rows if row['group']})
+        rows = self._check_references('posts', rows, [
+            ('author', self.users.get), ('group', self.groups.get)])
+        existing = self._existing_posts(
+            [row['id'] for row in rows if row['id'] is not None])
+        # пост без id не может быть дубликатом: на него не ссылаются
+        self._assign_ids(Post, rows)
+        new = self._save_new('posts', rows, 'id', existing, Post,
+                             lambda row: Post(id=row['id'],
+                                              author_id=row['author_id'],
+                                              group_id=row['group_id'],
+                                              text=row['text'],
+                                              image=row['image']))
+        _set_dates(Post, 'pub_date',
+                   {row['id']: row['pub_date'] for row in new})
+        self._authors.update(row['author_id'] for row in new)
+        self._touched_groups.update(row['group'] for row in new
+                                    if row['group'])
+
+    @staticmethod
+    def _parse_comment(record):
+        return {'id': _id(record, 'id', required=False),
+                'post': _id(record, 'post'),
+                'author': _text(record, 'author'),
+                'text': _text(record, 'text'),
+                'created': _moment(record, 'created')}
+
+    def _save_comments(self, rows):
+        self._resolve(self.users, User, 'username',
+                      {row['author'] for row in rows})
+        posts = self._existing_posts({row['post'] for row in rows})
+        rows = self._check_references('comments', rows, [
+            ('author', self.users.get),
+            ('post', lambda pk: pk if pk in posts else None)])
+        existing = set(Comment.objects.filter(pk__in=[
+            row['id'] for row in rows if row['id'] is not None]).values_list(
+            'pk', flat=True))
+        self._assign_ids(Comment, rows)
+        new = self._save_new('comments', rows, 'id', existing, Comment,
+                             lambda row: Comment(id=row['id'],
+                                                 post_id=row['post_id'],
+                                                 author_id=row['author_id'],
+                                                 text=row['text']))
+        _set_dates(Comment, 'created',
+                   {row['id']: row['created'] for row in new})
+        self._touched_posts.update(row['post_id'] for row in new)
+
+    @staticmethod
+    def _parse_like(record):
+        return {'user': _text(record, 'user'), 'post': _id(record, 'post'),
+                'created': _moment(record, 'created')}
+
+    def _save_likes(self, rows):
+        self._resolve(self.users, User, 'username',
+                      {row['user'] for row in rows})
+        posts = self._existing_posts({row['post'] for row in rows})
+        rows = self._check_references('likes', rows, [
+            ('user', self.users.get),
+            ('post', lambda pk: pk if pk in posts else None)])
+        for row in rows:
+            row['pair'] = (row['user_id'], row['post_id'])
+        existing = Like.objects.filter(
+            user_id__in={row['user_id'] for row in rows},
+            post_id__in={row['post_id'] for row in rows}).values_list(
+            'user_id', 'post_id')
+        new = self._save_new('likes', rows, 'pair', existing, Like,
+                             lambda row: Like(user_id=row['user_id'],
+                                              post_id=row['post_id']))
+        dates = {row['pair']: row['created'] for row in new}
+        pks = {(user_id, post_id): pk for user_id, post_id, pk in
+               Like.objects.filter(
+                   user_id__in={user_id for user_id, _ in dates},
+                   post_id__in={post_id for _, post_id in dates}
+               ).values_list('user_id', 'post_id', 'pk')}
+        _set_dates(Like, 'created',
+                   {pks[pair]: moment for pair, moment in dates.items()})
+        self._touched_posts.update(row['post_id'] for row in new)
+
+    @staticmethod
+    def _parse_follow(record):
+        user, author = _text(record, 'user'), _text(record, 'author')
+        if user == author:
+            raise RecordError('подписка на самого себя')
+        return {'user': user, 'author': author}
+
+    def _save_follows(self, rows):
+        self._resolve(self.users, User, 'username',
+                      {row[field] for row in rows
+                       for field in ('user', 'author')})
+        rows = self._check_references('follows', rows, [
+            ('user', self.users.get), ('author', self.users.get)])
+        for row in rows:
+            row['pair'] = (row['user_id'], row['author_id'])
+        existing = Follow.objects.filter(
+            user_id__in={row['user_id'] for row in rows},
+            author_id__in={row['author_id'] for row in rows}).values_list(
+            'user_id', 'author_id')
+        new = self._save_new('follows', rows, 'pair', existing, Follow,
+                             lambda row: Follow(user_id=row['user_id'],
+                                                author_id=row['author_id']))
+        self._authors.update(row['author_id'] for row in new)
+
+    def finish(self, rebuild=True):
+        """Один раз перестроить счетчики, статистику авторов, ленты
+        подписчиков и поисковый индекс. Неполные пачки должны быть
+        сохранены до вызова методом flush()."""
+        created = any(counts['created'] for counts in self.stats.values())
+        if not created:
+            return
+        self._reset_sequences()
+        if rebuild:
+            with transaction.atomic():
+                rebuild_post_counters()
+                rebuild_author_stats()
+                timeline.rebuild_for_authors(self._authors)
+                search.rebuild_index()
+        self._invalidate_pages()
+
+    @staticmethod
+    def _reset_sequences():
+        """Сдвинуть последовательности ключей после вставки постов и
+        комментариев с явными id (на SQLite не требуется)."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def _invalidate_pages(self):
+        """Сбросить кэш страниц, на которых появились загруженные данные."""
+        usernames = [name for name, pk in self.users.items()
+                     if pk in self._authors]
+        page_cache.invalidate(
+            page_cache.feed_scope(), *page_cache.COMMON_SCOPES,
+            *(page_cache.group_scope(slug) for slug in self._touched_groups),
+            *(page_cache.user_scope(name) for name in usernames),
+            *(page_cache.post_scope(pk) for pk in self._touched_posts))
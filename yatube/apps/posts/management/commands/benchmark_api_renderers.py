@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ...models import Group, Post, User
+from ...post_api.renderers import MessagePackRenderer, ORJSONRenderer
+from ...post_api.serializers import PostSerializer
+
+
+class StandardPostSerializer(PostSerializer):
+    """Сериализатор постов со штатным выводом DRF для сравнения."""
+
+    fast_representation = False
+
+
+def _measure(func, repeat):
+    """Вернуть лучшее время выполнения func() из repeat попыток, секунд."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    """ Класс Command сравнивает скорость сериализации и рендеринга списка
+    постов штатными средствами DRF и быстрыми вариантами API.
+
+    Посты создаются в памяти, без обращения к БД.
+    """
+
+    help = 'Сравнить скорость сериализаторов и рендереров API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=1000,
+            help='Число постов в списке',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Число повторов каждого замера',
+        )
+
+    def handle(self, *args, **options):
+        items, repeat = options['items'], options['repeat']
+        author = User(pk=1, username='benchmark')
+        group = Group(pk=1, title='Сообщество', slug='benchmark')
+        now = timezone.now()
+        posts = [Post(pk=number, author=author, group=group, pub_date=now,
+                      text='<p>Текст записи для замера скорости</p>' * 5,
+                      likes_count=number % 7, comments_count=number % 3)
+                 for number in range(1, items + 1)]
+
+        self.stdout.write(f'Постов: {items}, лучшее из {repeat} замеров')
+        data = None
+        for name, serializer_class in (('DRF', StandardPostSerializer),
+                                       ('быстрый', PostSerializer)):
+            elapsed, data = _measure(
+                lambda: serializer_class(posts, many=True).data, repeat)
+            self.report(f'Сериализатор {name}', items, elapsed)
+
+        renderers = [('JSONRenderer', JSONRenderer()),
+                     ('ORJSONRenderer', ORJSONRenderer()),
+                     ('MessagePackRenderer', MessagePackRenderer())]
+        for name, renderer in renderers:
+            elapsed, body = _measure(lambda: renderer.render(data), repeat)
+            self.report(f'{name}, {len(body) // 1024} КБ', items, elapsed)
+
+    def report(self, title, items, elapsed):
+        self.stdout.write(f'{title}: {elapsed * 1000:.1f} мс, '
+                          f'{items / elapsed:,.0f} объектов/с')
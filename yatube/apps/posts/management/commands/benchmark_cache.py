@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+# Сравниваемые бэкенды: название, путь к классу и LOCATION (None --
+# временный файл или каталог)
+BACKENDS = (
+    ('LocMemCache', 'django.core.cache.backends.locmem.LocMemCache',
+     'benchmark'),
+    ('FileBasedCache',
+     'django.core.cache.backends.filebased.FileBasedCache', None),
+    ('SQLiteCache', 'apps.posts.cache_backend.SQLiteCache', None),
+)
+
+
+def _create(path, location, max_entries):
+    return import_string(path)(location, {
+        'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': max_entries}})
+
+
+def _operations(cache, count):
+    """Вернуть замеры операций кэша: название, число операций и функция."""
+    keys = [f'benchmark:{number}' for number in range(count)]
+    value = {'html': 'x' * 1024, 'version': 1}
+    batches = [keys[start:start + 10] for start in range(0, count, 10)]
+    return (
+        ('set', count, lambda: [cache.set(key, value) for key in keys]),
+        ('get', count, lambda: [cache.get(key) for key in keys]),
+        ('get_many (по 10)', count,
+         lambda: [cache.get_many(batch) for batch in batches]),
+        ('set_many (по 10)', count,
+         lambda: [cache.set_many({key: value for key in batch})
+                  for batch in batches]),
+        ('incr', count, lambda: [cache.incr('benchmark:counter')
+                                 for _ in keys]),
+    )
+
+
+def _worker(cache, number, processes, count, barrier, results):
+    """Записать свои ключи, дождаться остальных процессов и прочитать
+    ключи всех процессов; вернуть долю попаданий и число incr."""
+    for index in range(count):
+        cache.set(f'shared:{number}:{index}', index)
+    barrier.wait()
+    started = time.perf_counter()
+    hits = sum(cache.get(f'shared:{other}:{index}') is not None
+               for other in range(processes) for index in range(count))
+    for _ in range(count):
+        try:
+            cache.incr('shared:counter')
+        except ValueError:
+            cache.add('shared:counter', 0)
+            cache.incr('shared:counter')
+    results.put((hits / (processes * count),
+                 time.perf_counter() - started))
+
+
+class Command(BaseCommand):
+    """ Класс Command сравнивает скорость бэкендов кэша LocMemCache,
+    FileBasedCache и SQLiteCache в одном процессе и долю попаданий при
+    обращении нескольких процессов к общим ключам.
+    """
+
+    help = 'Сравнить скорость и общий доступ бэкендов кэша'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=500,
+            help='Число операций каждого вида',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=4,
+            help='Число процессов в замере общего доступа (0 -- без него)',
+        )
+
+    def handle(self, *args, **options):
+        count, processes = options['operations'], options['processes']
+        with tempfile.TemporaryDirectory() as directory:
+            for name, path, location in BACKENDS:
+                location = location or os.path.join(directory, name)
+                # все ключи замеров помещаются в кэш без вытеснения
+                cache = _create(path, location,
+                                count * (max(processes, 1) + 2) * 2)
+                cache.clear()
+                cache.set('benchmark:counter', 0)
+                self.stdout.write(name)
+                for title, total, func in _operations(cache, count):
+                    started = time.perf_counter()
+                    func()
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f'  {title}: {total / elapsed:,.0f} '
+                                      f'операций/с')
+                if processes:
+                    self.shared(cache, processes, count)
+                cache.clear()
+
+    def shared(self, cache, processes, count):
+        """Запустить процессы с общими ключами и вывести долю попаданий."""
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+        workers = [context.Process(target=_worker, args=(
+            cache, number, processes, count, barrier, results))
+            for number in range(processes)]
+        for worker in workers:
+            worker.start()
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        hit_rate = sum(rate for rate, _ in reports) / processes
+        elapsed = max(seconds for _, seconds in reports)
+        operations = processes * (processes * count + count)
+        counter = cache.get('shared:counter') or 0
+        self.stdout.write(
+            f'  {processes} процесса(ов): попаданий {hit_rate:.0%}, '
+            f'{operations / elapsed:,.0f} операций/с, '
+            f'incr из всех процессов: {counter} из {processes * count}')
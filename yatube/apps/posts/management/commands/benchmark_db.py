@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.test.utils import override_settings
+
+from ... import services
+from ...models import Post, User
+
+BENCHMARK_USERNAME = 'benchmark_worker_{}'
+BENCHMARK_POSTS = 20
+
+# Кэш процессов замера: инвалидация страниц не трогает общий кэш сайта
+LOCAL_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def _profiles():
+    """Вернуть сравниваемые профили: название, OPTIONS и CONN_MAX_AGE.
+    Исходный профиль явно возвращает журнал DELETE, так как режим WAL
+    сохраняется в файле базы."""
+    database = settings.DATABASES['default']
+    return (
+        ('Без настройки', {'pragmas': {'journal_mode': 'DELETE'}}, 0),
+        ('С профилем', database.get('OPTIONS', {}),
+         database.get('CONN_MAX_AGE', 0)),
+    )
+
+
+def _use_database(path, options, max_age):
+    """Переключить соединение default процесса на файл path с параметрами
+    профиля."""
+    current = connections['default']
+    connections['default'] = current.__class__(
+        {**current.settings_dict, 'NAME': path, 'OPTIONS': options,
+         'CONN_MAX_AGE': max_age}, 'default')
+
+
+def _seed(path, workers, options):
+    """Создать пользователей процессов замера и посты, если их нет."""
+    with override_settings(CACHES=LOCAL_CACHES):
+        _use_database(path, options, 0)
+        for number in range(workers):
+            User.objects.get_or_create(
+                username=BENCHMARK_USERNAME.format(number))
+        if Post.objects.count() < BENCHMARK_POSTS:
+            author = User.objects.get(username=BENCHMARK_USERNAME.format(0))
+            for number in range(BENCHMARK_POSTS):
+                Post.objects.create(author=author,
+                                    text=f'Пост замера {number}')
+        connections['default'].close()
+
+
+def _worker(path, profile, number, operations, write_share, barrier,
+            results):
+    """Выполнить чтения ленты и лайки, считая каждую операцию запросом."""
+    _, options, max_age = profile
+    with override_settings(CACHES=LOCAL_CACHES):
+        _use_database(path, options, max_age)
+        user = User.objects.get(username=BENCHMARK_USERNAME.format(number))
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:50])
+        close_old_connections()
+        reads = writes = locked = 0
+        barrier.wait()
+        started = time.perf_counter()
+        for index in range(operations):
+            try:
+                if int((index + 1) * write_share) > int(index * write_share):
+                    post_id = post_ids[writes % len(post_ids)]
+                    if not services.like(user, post_id):
+                        services.unlike(user, post_id)
+                    writes += 1
+                else:
+                    list(Post.objects.select_related('author', 'group')
+                         .order_by('-pub_date')[:10])
+                    reads += 1
+            except OperationalError:
+                locked += 1
+            # конец запроса: соединение закрывается, если истек CONN_MAX_AGE
+            close_old_connections()
+        results.put((reads, writes, locked, time.perf_counter() - started))
+        connections['default'].close()
+
+
+class Command(BaseCommand):
+    """ Класс Command измеряет пропускную способность чтения и записи SQLite
+    при одновременной работе нескольких процессов без настройки и с
+    профилем из DATABASES (прагмы, постоянные соединения, BEGIN IMMEDIATE).
+
+    Замер идет на копиях текущей базы во временном каталоге, база сайта не
+    изменяется.
+    """
+
+    help = ('Сравнить чтение и запись SQLite несколькими процессами без '
+            'настройки и с профилем из DATABASES')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Число одновременных процессов',
+        )
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=300,
+            help='Число запросов каждого процесса',
+        )
+        parser.add_argument(
+            '--write-share',
+            type=float,
+            default=0.2,
+            help='Доля запросов-записей (лайк или снятие лайка)',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер доступен только для SQLite')
+        workers = options['workers']
+        if workers < 1 or options['operations'] < 1:
+            raise CommandError('Число процессов и запросов должно быть '
+                               'положительным')
+        write_share = min(max(options['write_share'], 0), 1)
+        context = multiprocessing.get_context('fork')
+        connection.ensure_connection()
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in _profiles():
+                path = os.path.join(directory, f'{len(os.listdir(directory))}'
+                                               f'.sqlite3')
+                with sqlite3.connect(path) as target:
+                    connection.connection.backup(target)
+                seeding = context.Process(target=_seed,
+                                          args=(path, workers, profile[1]))
+                seeding.start()
+                seeding.join()
+                if seeding.exitcode:
+                    raise CommandError('Не удалось подготовить копию базы')
+                barrier = context.Barrier(workers)
+                results = context.Queue()
+                processes = [context.Process(target=_worker, args=(
+                    path, profile, number, options['operations'],
+                    write_share, barrier, results))
+                    for number in range(workers)]
+                for process in processes:
+                    process.start()
+                reports = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+                self.report(profile[0], workers, reports)
+
+    def report(self, name, workers, reports):
+        reads, writes, locked = (sum(report[column] for report in reports)
+                                 for column in range(3))
+        elapsed = max(report[3] for report in reports)
+        self.stdout.write(
+            f'{name}: {workers} процесса(ов), чтение {reads / elapsed:,.0f} '
+            f'запросов/с, запись {writes / elapsed:,.0f} запросов/с, '
+            f'ошибок "database is locked": {locked}')
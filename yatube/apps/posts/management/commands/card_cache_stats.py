@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from ...cards import get_card_stats, reset_card_stats
+
+
+class Command(BaseCommand):
+    """ Класс Command выводит статистику кэша карточек постов."""
+
+    help = 'Вывести число попаданий и промахов кэша карточек постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счетчики после вывода',
+        )
+
+    def handle(self, *args, **options):
+        hits, misses = get_card_stats()
+        total = hits + misses
+        ratio = hits / total * 100 if total else 0
+        self.stdout.write(f'Попаданий: {hits}, промахов: {misses}, '
+                          f'доля попаданий: {ratio:.1f}%')
+        if options['reset']:
+            reset_card_stats()
@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...export import (EXPORT_CHUNK_SIZE, gzip_stream, iter_ndjson,
+                       parse_kinds, parse_since)
+
+
+class Command(BaseCommand):
+    """ Класс Command выгружает пользователей, группы, посты, комментарии,
+    лайки и подписки в формате NDJSON (одна запись JSON на строку)."""
+
+    help = ('Выгрузить данные в NDJSON: пользователи, группы, посты, '
+            'комментарии, лайки и подписки')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл для выгрузки (по умолчанию -- стандартный вывод)',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжать выгрузку в формат gzip',
+        )
+        parser.add_argument(
+            '--since',
+            help='Выгрузить только записи, созданные начиная с даты '
+                 '(ГГГГ-ММ-ДД или ГГГГ-ММ-ДД ЧЧ:ММ[:СС]); подписки и '
+                 'группы выгружаются целиком',
+        )
+        parser.add_argument(
+            '--kinds',
+            default='',
+            help='Виды данных через запятую: users, groups, posts, '
+                 'comments, likes, follows (по умолчанию -- все)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Число строк, читаемых из БД одним запросом',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            kinds = parse_kinds(options['kinds'])
+            since = (parse_since(options['since']) if options['since']
+                     else None)
+        except ValueError as exc:
+            raise CommandError(exc)
+        if options['chunk_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+        stream = iter_ndjson(kinds, since, options['chunk_size'])
+        if options['gzip']:
+            stream = gzip_stream(stream)
+        started = time.monotonic()
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                size = self._write(stream, output)
+            elapsed = time.monotonic() - started
+            self.stderr.write(f'Выгружено {size} байт за {elapsed:.1f} с '
+                              f'в {options["output"]}')
+        else:
+            output = getattr(self.stdout._out, 'buffer', None)
+            if output is None:
+                # поток без двоичного буфера (например, StringIO в тестах)
+                if options['gzip']:
+                    raise CommandError('Для сжатой выгрузки укажите --output')
+                for chunk in stream:
+                    self.stdout.write(chunk.decode(), ending='')
+            else:
+                self.stdout.flush()
+                self._write(stream, output)
+                output.flush()
+
+    @staticmethod
+    def _write(stream, output):
+        size = 0
+        for chunk in stream:
+            output.write(chunk)
+            size += len(chunk)
+        return size
@@ -0,0 +1,59 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ...models import Post
+from ...thumbnails import generate_post_thumbnails
+
+
+def _generate(post_ids):
+    """Сгенерировать миниатюры для пачки постов в рабочем процессе."""
+    try:
+        return sum(generate_post_thumbnails(post_id, check_files=True)
+                   for post_id in post_ids)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    """ Класс Command создает недостающие миниатюры изображений постов.
+
+    Посты с изображениями разбиваются на пачки, которые обрабатываются
+    параллельно в нескольких процессах.
+    """
+
+    help = 'Сгенерировать недостающие миниатюры изображений постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help='Число рабочих процессов',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Число постов в пачке одного процесса',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        post_ids = list(Post.objects.exclude(image__isnull=True).exclude(
+            image='').order_by('pk').values_list('pk', flat=True))
+        size = options['batch_size']
+        batches = [post_ids[i:i + size] for i in range(0, len(post_ids), size)]
+        if options['processes'] > 1 and len(batches) > 1:
+            # соединения с БД не должны наследоваться дочерними процессами
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with context.Pool(options['processes']) as pool:
+                total = sum(pool.imap_unordered(_generate, batches))
+        else:
+            total = sum(_generate(batch) for batch in batches)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Постов: {len(post_ids)}, миниатюр: {total}, '
+                          f'время: {elapsed:.1f} с')
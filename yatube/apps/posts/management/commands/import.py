@@ -0,0 +1,74 @@
+import gzip
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...importer import IMPORT_BATCH_SIZE, IMPORT_KINDS, Importer
+
+
+class Command(BaseCommand):
+    """ Класс Command загружает пользователей, группы, посты, комментарии,
+    лайки и подписки из NDJSON в формате команды export."""
+
+    help = ('Загрузить данные из NDJSON (формат команды export) пачками '
+            'через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help='Файл выгрузки (.ndjson или .ndjson.gz); "-" -- '
+                 'стандартный ввод',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Число записей одного вида, сохраняемых одним запросом',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не перестраивать счетчики, ленты и поисковый индекс '
+                 '(выполнить позже командами rebuild_counters и '
+                 'rebuild_search_index)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным')
+        importer = Importer(options['batch_size'])
+        started = time.monotonic()
+        try:
+            with self._open(options['input']) as source:
+                importer.load_lines(source)
+        except OSError as exc:
+            raise CommandError(exc)
+        # неполные пачки -- часть загрузки, а не перестроения
+        importer.flush()
+        loaded = time.monotonic()
+        importer.finish(rebuild=not options['no_rebuild'])
+        finished = time.monotonic()
+        for kind in IMPORT_KINDS:
+            counts = importer.stats[kind]
+            self.stdout.write(f'{kind}: создано {counts["created"]}, '
+                              f'пропущено {counts["skipped"]}, '
+                              f'ошибок {counts["failed"]}')
+        if importer.malformed:
+            self.stdout.write(f'Нераспознанных строк: {importer.malformed}')
+        for message in importer.errors:
+            self.stderr.write(message)
+        elapsed = loaded - started
+        rate = importer.total / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Загружено записей: {importer.total} за {elapsed:.1f} с '
+            f'({rate:.0f} записей/с), перестроение '
+            f'{finished - loaded:.1f} с')
+
+    @staticmethod
+    def _open(path):
+        if path == '-':
+            return open(sys.stdin.fileno(), 'rb', closefd=False)
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...counters import rebuild_author_stats, rebuild_post_counters
+
+
+class Command(BaseCommand):
+    """ Класс Command пересчитывает денормализованные счетчики.
+
+    Счетчики постов (likes_count, comments_count) и статистика авторов
+    (AuthorStats) обновляются одним UPDATE с коррелированными подзапросами
+    только там, где они разошлись с фактическими данными.
+    """
+
+    help = 'Пересчитать счетчики постов и статистику авторов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только вывести число записей с расхождениями',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        with transaction.atomic():
+            posts = rebuild_post_counters(dry_run=dry_run)
+            created, authors = rebuild_author_stats(dry_run=dry_run)
+        self.stdout.write(f'Постов с расхождениями счетчиков: {posts}')
+        self.stdout.write(f'Отсутствующих записей статистики: {created}')
+        self.stdout.write(f'Авторов с расхождениями статистики: {authors}')
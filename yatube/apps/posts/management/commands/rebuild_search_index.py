@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ...search import rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    """ Класс Command заново строит полнотекстовый индекс постов."""
+
+    help = 'Перестроить полнотекстовый индекс постов'
+
+    def handle(self, *args, **options):
+        if not search_available():
+            self.stdout.write('Полнотекстовый индекс недоступен, поиск '
+                              'выполняется без индекса')
+            return
+        self.stdout.write(f'Проиндексировано постов: {rebuild_index()}')
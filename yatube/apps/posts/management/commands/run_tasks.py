@@ -0,0 +1,119 @@
+import multiprocessing
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ... import tasks
+
+
+def _work(stop, burst, poll_interval, purge_after):
+    """Цикл обработчика: брать задачи, пока не будет запрошена остановка.
+
+    В режиме burst обработчик завершается, как только очередь опустеет.
+    Вернуть число обработанных задач.
+    """
+    processed = 0
+    last_purge = time.monotonic()
+    try:
+        while not stop.is_set():
+            if tasks.run_next():
+                processed += 1
+                continue
+            if burst:
+                break
+            if purge_after and time.monotonic() - last_purge > purge_after:
+                tasks.purge(purge_after)
+                last_purge = time.monotonic()
+            stop.wait(poll_interval)
+    finally:
+        connections.close_all()
+    return processed
+
+
+class _Count:
+    """Счетчик обработанных задач потока, совместимый с multiprocessing.Value
+    по атрибуту value."""
+
+    value = 0
+
+
+def _run(count, stop, *args):
+    """Запустить цикл обработчика и сохранить число обработанных задач."""
+    count.value = _work(stop, *args)
+
+
+class Command(BaseCommand):
+    """ Класс Command запускает обработчики очереди фоновых задач.
+
+    Обработчики работают в потоках или процессах и берут задачи из
+    таблицы Task, пока команда не будет остановлена.
+    """
+
+    help = 'Запустить обработчики очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число обработчиков',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=('threads', 'processes'),
+            default='threads',
+            help='Запускать обработчики в потоках или процессах',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Завершиться, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, секунд',
+        )
+        parser.add_argument(
+            '--purge-after',
+            type=int,
+            default=24 * 60 * 60,
+            help='Удалять выполненные задачи старше стольких секунд '
+                 '(0 -- не удалять)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        workers = max(options['workers'], 1)
+        if options['mode'] == 'processes':
+            # соединения с БД не должны наследоваться дочерними процессами
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            spawn, counter = context.Process, context.Value
+            stop = context.Event()
+        else:
+            spawn, counter = threading.Thread, None
+            stop = threading.Event()
+        counts = [counter('i', 0) if counter else _Count()
+                  for _ in range(workers)]
+        runners = [spawn(target=_run, name=f'tasks-worker-{number}',
+                         args=(count, stop, options['burst'],
+                               options['poll_interval'],
+                               options['purge_after']))
+                   for number, count in enumerate(counts)]
+        for runner in runners:
+            runner.start()
+        try:
+            for runner in runners:
+                runner.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for runner in runners:
+                runner.join()
+        processed = sum(count.value for count in counts)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Обработано задач: {processed}, '
+                          f'время: {elapsed:.1f} с')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from ...tasks import queue_stats
+
+
+class Command(BaseCommand):
+    """ Класс Command выводит метрики очереди фоновых задач."""
+
+    help = 'Вывести глубину очереди и задержки выполнения фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=60 * 60,
+            help='Учитывать задачи, завершённые за столько секунд',
+        )
+
+    def handle(self, *args, **options):
+        stats = queue_stats(options['window'])
+        self.stdout.write(', '.join(
+            f'{status}: {total}' for status, total in stats['depth'].items()))
+        for row in stats['latency']:
+            wait = row['wait'].total_seconds() if row['wait'] else 0
+            run = row['run'].total_seconds() if row['run'] else 0
+            self.stdout.write(f'{row["name"]}: выполнено {row["total"]}, '
+                              f'ожидание {wait:.3f} с, '
+                              f'выполнение {run:.3f} с')
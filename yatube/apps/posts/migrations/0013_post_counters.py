@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:02
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    Comment = apps.get_model('posts', 'Comment')
+
+    def count_subquery(model):
+        queryset = model.objects.filter(post=OuterRef('pk')).order_by(
+        ).values('post').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(queryset, output_field=IntegerField()), 0)
+
+    Post.objects.update(likes_count=count_subquery(Like),
+                        comments_count=count_subquery(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_auto_20210203_1102'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Поддерживается автоматически при изменении комментариев', verbose_name='Число комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Поддерживается автоматически при изменении лайков', verbose_name='Число лайков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
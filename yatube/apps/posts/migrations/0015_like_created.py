@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:06
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, help_text='Дата и время лайка', verbose_name='Дата/время лайка'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['user', '-created'], name='like_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_author_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+
+    def count_subquery(model, field):
+        queryset = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+        ).values(field).annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(queryset, output_field=IntegerField()), 0)
+
+    users = User.objects.annotate(
+        posts_total=count_subquery(Post, 'author'),
+        followers_total=count_subquery(Follow, 'author'),
+        following_total=count_subquery(Follow, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk, posts_count=posts,
+                     followers_count=followers, following_count=following)
+         for pk, posts, followers, following in users.iterator()],
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0015_like_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(help_text='Укажите пользователя', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, help_text='Число записей автора', verbose_name='Записей')),
+                ('followers_count', models.PositiveIntegerField(default=0, help_text='Число подписчиков автора', verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, help_text='Число авторов, на которых подписан пользователь', verbose_name='Подписан')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_author_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Увеличивается при изменении записи, лайков и комментариев', verbose_name='Версия'),
+        ),
+    ]
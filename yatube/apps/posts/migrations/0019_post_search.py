@@ -0,0 +1,46 @@
+# Generated by Django 2.2.28 on 2026-10-18 08:21
+
+import html
+
+from django.db import migrations
+from django.db.utils import OperationalError
+from django.utils.html import strip_tags
+
+
+def create_search_table(apps, schema_editor):
+    """Создать таблицу FTS5 и проиндексировать посты.
+
+    На других СУБД и на SQLite без FTS5 таблица не создается, поиск
+    выполняется через icontains."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Post = apps.get_model('posts', 'Post')
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE posts_post_search USING fts5("
+                "text, tokenize='unicode61 remove_diacritics 2')")
+        except OperationalError:
+            return
+        rows = [(pk, html.unescape(strip_tags(text or '')).strip())
+                for pk, text in Post.objects.values_list('pk', 'text')]
+        cursor.executemany(
+            'INSERT INTO posts_post_search (rowid, text) VALUES (%s, %s)',
+            rows)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_task_queue'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
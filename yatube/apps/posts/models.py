@@ -1,13 +1,38 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import UniqueConstraint
-from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils import timezone
 from pytils.translit import slugify
 from sorl.thumbnail import delete as delete_tumbnails, get_thumbnail
 
+from .db import immediate_atomic
+
 User = get_user_model()
 
+# Адаптивные варианты изображения поста для includes/card_post_shared.html:
+# ширины с пропорциями карточки 960x339 и форматы (формат sorl, MIME-тип,
+# качество) в порядке предпочтения, последний -- запасной для <img>
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = (
+    ('WEBP', 'image/webp', 80),
+    ('JPEG', 'image/jpeg', 85),
+)
+POST_IMAGE_VARIANTS = tuple(
+    (mime_type, width, round(width * 339 / 960),
+     {'crop': 'center', 'upscale': True, 'format': image_format,
+      'quality': quality})
+    for image_format, mime_type, quality in POST_IMAGE_FORMATS
+    for width in POST_IMAGE_WIDTHS
+)
+
+# Все миниатюры изображений постов: (геометрия, параметры sorl). Последняя
+# выводится Post.get_post_image()
+POST_THUMBNAILS = tuple(
+    (f'{width}x{height}', options)
+    for _, width, height, options in POST_IMAGE_VARIANTS
+) + (('960x339', {'crop': 'center', 'quality': 95}),)
+
 
 def author_directory_path(instance, filename):
     """Вернуть путь к каталогу с изображениями автора.
@@ -23,7 +48,7 @@ class Post(models.Model):
 
     Атрибуты класса
     --------
-                                            PK <-- Comment, Like
+                                            PK <-- Comment, Like, TimelineEntry
     text : models.TextField()
         текст сообщения
     pub_date : models.DateTimeField()
@@ -34,6 +59,12 @@ class Post(models.Model):
         ссылка на модель Group.
     image : models.ImageField()
         изображение в сообщении.
+    likes_count : models.PositiveIntegerField()
+        денормализованное число лайков.
+    comments_count : models.PositiveIntegerField()
+        денормализованное число комментариев.
+    version : models.PositiveIntegerField()
+        версия записи, увеличивается при любом изменении карточки поста.
 
     Методы класса
     --------
@@ -42,6 +73,10 @@ class Post(models.Model):
         записью.
     clear_thumbnails() --
     get_post_image() --
+    get_image_variants() -- возвращает адаптивные варианты изображения.
+    get_image_sources() -- возвращает варианты, сгруппированные по формату,
+        для тега <picture>.
+    save() -- сохраняет запись и зависимые счетчики в одной транзакции.
     delete() --
     """
 
@@ -77,6 +112,24 @@ class Post(models.Model):
         null=True,
         help_text='Выберите изображение к сообщению'
     )
+    likes_count = models.PositiveIntegerField(
+        verbose_name='Число лайков',
+        default=0,
+        editable=False,
+        help_text='Поддерживается автоматически при изменении лайков'
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False,
+        help_text='Поддерживается автоматически при изменении комментариев'
+    )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=0,
+        editable=False,
+        help_text='Увеличивается при изменении записи, лайков и комментариев'
+    )
 
     class Meta:
         verbose_name_plural = 'Публикации'
@@ -101,13 +154,58 @@ class Post(models.Model):
 
     def get_post_image(self):
         """Получить изображение для отображения в посте."""
-        return get_thumbnail(self.image, '960x339', crop='center', quality=95)
-
-    def delete(self):
-        """При удалении записи удалить все ссылаемые объекты."""
-        obj = get_object_or_404(Post, pk=self.pk)
-        obj.clear_thumbnails()
-        super().delete()
+        geometry, options = POST_THUMBNAILS[-1]
+        return get_thumbnail(self.image, geometry, **options)
+
+    def get_image_variants(self):
+        """Вернуть адаптивные варианты изображения: список словарей с
+        MIME-типом, шириной, высотой и адресом миниатюры."""
+        if not self.image:
+            return []
+        variants = []
+        for mime_type, width, height, options in POST_IMAGE_VARIANTS:
+            thumbnail = get_thumbnail(self.image, f'{width}x{height}',
+                                      **options)
+            variants.append({'type': mime_type, 'width': width,
+                             'height': height, 'url': thumbnail.url})
+        return variants
+
+    def get_image_sources(self):
+        """Вернуть варианты изображения, сгруппированные по MIME-типу, в
+        виде словарей с атрибутом srcset и адресом самого широкого
+        варианта."""
+        sources = {}
+        for variant in self.get_image_variants():
+            source = sources.setdefault(variant['type'], {
+                'type': variant['type'], 'srcset': [], 'src': None})
+            source['srcset'].append(f'{variant["url"]} {variant["width"]}w')
+            source['src'] = variant['url']
+        for source in sources.values():
+            source['srcset'] = ', '.join(source['srcset'])
+        return list(sources.values())
+
+    def save(self, *args, **kwargs):
+        """Сохранить запись. При изменении существующей записи увеличить
+        версию. Статистика автора и ленты подписчиков обновляются
+        обработчиком post_save в той же транзакции."""
+        bump_version = not self._state.adding
+        if bump_version:
+            self.version = models.F('version') + 1
+        with immediate_atomic():
+            super().save(*args, **kwargs)
+            if bump_version:
+                self.refresh_from_db(fields=['version'])
+
+    def delete(self, *args, **kwargs):
+        """При удалении записи поставить в очередь удаление миниатюр."""
+        from .background import run_in_background
+        from .thumbnails import delete_image_thumbnails
+
+        image = self.image.name
+        result = super().delete(*args, **kwargs)
+        if image:
+            run_in_background(delete_image_thumbnails, image)
+        return result
 
 
 class Group(models.Model):
@@ -182,6 +280,7 @@ class Comment(models.Model):
     Методы класса
     --------
     __str__() -- строковое представление модели.
+    save() -- сохраняет комментарий и счетчик поста в одной транзакции.
     """
 
     post = models.ForeignKey(
@@ -222,6 +321,12 @@ class Comment(models.Model):
             return self.text[:15] + "..."
         return self.text
 
+    def save(self, *args, **kwargs):
+        """Сохранить комментарий. Счетчик комментариев поста обновляется
+        обработчиком post_save в той же транзакции."""
+        with immediate_atomic():
+            super().save(*args, **kwargs)
+
 
 class Follow(models.Model):
     """ Класс Follow используется для описания модели подписок.
@@ -239,6 +344,7 @@ class Follow(models.Model):
         Методы класса
         --------
         __str__() -- строковое представление модели.
+        save() -- сохраняет подписку и статистику в одной транзакции.
     """
 
     user = models.ForeignKey(
@@ -266,6 +372,12 @@ class Follow(models.Model):
         """ Вернуть строковое представление."""
         return f'{self.user} подписан на {self.author}'
 
+    def save(self, *args, **kwargs):
+        """Сохранить подписку. Статистика авторов и лента подписчика
+        обновляются обработчиком post_save в той же транзакции."""
+        with immediate_atomic():
+            super().save(*args, **kwargs)
+
 
 class Like(models.Model):
     """ Класс Like используется для описания модели лаков к постам.
@@ -279,10 +391,13 @@ class Like(models.Model):
         ссылка на модель User
     post : models.ForeignKey()              FK --> Post
         ссылка на модель Post
+    created : models.DateTimeField()
+        дата и время лайка
 
         Методы класса
         --------
         __str__() -- строковое представление модели.
+        save() -- сохраняет лайк и счетчик поста в одной транзакции.
     """
 
     user = models.ForeignKey(
@@ -299,13 +414,245 @@ class Like(models.Model):
         related_name='likes',
         help_text='Укажите к какому посту лайк'
     )
+    created = models.DateTimeField(
+        verbose_name='Дата/время лайка',
+        auto_now_add=True,
+        help_text='Дата и время лайка'
+    )
 
     class Meta:
         verbose_name_plural = 'Лайки'
         verbose_name = 'Лайк'
         constraints = [UniqueConstraint(fields=['user', 'post'],
                                         name='unique_like')]
+        indexes = [models.Index(fields=['user', '-created'],
+                                name='like_user_created_idx')]
 
     def __str__(self):
         """ Вернуть строковое представление."""
         return f'{self.user} оценил пост {self.post_id}'
+
+    def save(self, *args, **kwargs):
+        """Сохранить лайк. Счетчик лайков поста обновляется обработчиком
+        post_save в той же транзакции."""
+        with immediate_atomic():
+            super().save(*args, **kwargs)
+
+
+class TimelineEntry(models.Model):
+    """ Класс TimelineEntry используется для описания модели ленты подписок
+    пользователя (fan-out on write).
+
+    Родительский класс -- models.Model.
+
+    Атрибуты класса
+    --------
+                                            PK <--
+    user : models.ForeignKey()              FK --> User
+        ссылка на модель User, владельца ленты
+    post : models.ForeignKey()              FK --> Post
+        ссылка на модель Post
+    pub_date : models.DateTimeField()
+        дата и время публикации поста, копия Post.pub_date для индекса
+        (user, pub_date).
+
+        Методы класса
+        --------
+        __str__() -- строковое представление модели.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        help_text='Укажите владельца ленты'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Сообщение',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        help_text='Укажите пост в ленте'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата/время публикации',
+        help_text='Дата и время публикации поста'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Записи лент подписок'
+        verbose_name = 'Запись ленты подписок'
+        constraints = [UniqueConstraint(fields=['user', 'post'],
+                                        name='unique_timeline_entry')]
+        indexes = [models.Index(fields=['user', '-pub_date', '-post'],
+                                name='timeline_user_pub_date_idx')]
+
+    def __str__(self):
+        """ Вернуть строковое представление."""
+        return f'Пост {self.post_id} в ленте {self.user}'
+
+
+class AuthorStats(models.Model):
+    """ Класс AuthorStats используется для описания модели материализованной
+    статистики автора.
+
+    Родительский класс -- models.Model.
+
+    Атрибуты класса
+    --------
+    user : models.OneToOneField()           PK, FK --> User
+        ссылка на модель User
+    posts_count : models.PositiveIntegerField()
+        число записей автора
+    followers_count : models.PositiveIntegerField()
+        число подписчиков автора
+    following_count : models.PositiveIntegerField()
+        число авторов, на которых подписан пользователь
+
+        Методы класса
+        --------
+        __str__() -- строковое представление модели.
+    """
+
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        help_text='Укажите пользователя'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Записей',
+        default=0,
+        help_text='Число записей автора'
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        help_text='Число подписчиков автора'
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписан',
+        default=0,
+        help_text='Число авторов, на которых подписан пользователь'
+    )
+
+    class Meta:
+        verbose_name_plural = 'Статистика авторов'
+        verbose_name = 'Статистика автора'
+
+    def __str__(self):
+        """ Вернуть строковое представление."""
+        return f'Статистика {self.user_id}'
+
+
+class Task(models.Model):
+    """ Класс Task используется для описания модели фоновой задачи в очереди
+    на базе БД.
+
+    Родительский класс -- models.Model.
+
+    Атрибуты класса
+    --------
+    name : models.CharField()
+        импортируемый путь к функции задачи
+    args : models.TextField()
+        позиционные и именованные аргументы задачи в JSON
+    status : models.CharField()
+        состояние задачи
+    attempts : models.PositiveSmallIntegerField()
+        число выполненных попыток
+    max_attempts : models.PositiveSmallIntegerField()
+        максимальное число попыток
+    run_at : models.DateTimeField()
+        время, раньше которого задачу нельзя брать в работу
+    created : models.DateTimeField()
+        дата постановки в очередь
+    started : models.DateTimeField()
+        дата начала последней попытки
+    finished : models.DateTimeField()
+        дата завершения задачи
+    worker : models.CharField()
+        идентификатор обработчика, взявшего задачу
+    last_error : models.TextField()
+        текст последней ошибки
+
+        Методы класса
+        --------
+        __str__() -- строковое представление модели.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=200,
+        help_text='Импортируемый путь к функции задачи'
+    )
+    args = models.TextField(
+        verbose_name='Аргументы',
+        default='{}',
+        help_text='Аргументы задачи в JSON'
+    )
+    status = models.CharField(
+        verbose_name='Состояние',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+        default=5
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Выполнить не раньше',
+        default=timezone.now
+    )
+    created = models.DateTimeField(
+        verbose_name='Поставлена в очередь',
+        auto_now_add=True
+    )
+    started = models.DateTimeField(
+        verbose_name='Начало выполнения',
+        null=True,
+        blank=True
+    )
+    finished = models.DateTimeField(
+        verbose_name='Завершена',
+        null=True,
+        blank=True
+    )
+    worker = models.CharField(
+        verbose_name='Обработчик',
+        max_length=100,
+        blank=True
+    )
+    last_error = models.TextField(
+        verbose_name='Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        verbose_name_plural = 'Фоновые задачи'
+        verbose_name = 'Фоновая задача'
+        indexes = [models.Index(fields=['status', 'run_at'],
+                                name='task_status_run_at_idx')]
+
+    def __str__(self):
+        """ Вернуть строковое представление."""
+        return f'{self.name} ({self.get_status_display()})'
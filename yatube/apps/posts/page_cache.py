@@ -0,0 +1,274 @@
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import Post, User
+from .routers import pin_seconds, use_primary
+
+PAGE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 60)
+GENERATION_PREFIX = 'pagegen:'
+MODIFIED_PREFIX = 'pagemod:'
+PAGE_PREFIX = 'page:'
+
+# Области, от которых зависит любая страница: названия сообществ выводятся
+# в карточках постов на всех лентах
+COMMON_SCOPES = ('groups',)
+
+
+def feed_scope():
+    return 'feed'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def user_scope(username):
+    return f'user:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def timeline_scope(user_id):
+    return f'timeline:{user_id}'
+
+
+def _generation_keys(scopes):
+    return [GENERATION_PREFIX + scope for scope in scopes]
+
+
+def get_generations(scopes):
+    """Вернуть текущие поколения областей scopes.
+
+    Отсутствующее в кэше поколение инициализируется уникальным значением,
+    чтобы после вытеснения ключа не могла вернуться устаревшая страница.
+    """
+    keys = _generation_keys(scopes)
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def get_modified(scopes):
+    """Вернуть время последнего изменения областей scopes (UNIX-время, с).
+
+    Для области без отметки в кэше (не менявшейся с заполнения кэша)
+    отметкой становится текущее время.
+    """
+    keys = [MODIFIED_PREFIX + scope for scope in scopes]
+    modified = cache.get_many(keys)
+    missing = [key for key in keys if key not in modified]
+    if missing:
+        now = int(time.time())
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        modified.update(cache.get_many(missing))
+    return max(modified.values(), default=0)
+
+
+def _bump(scopes):
+    for key in _generation_keys(scopes):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+    now = int(time.time())
+    cache.set_many({MODIFIED_PREFIX + scope: now for scope in scopes},
+                   timeout=None)
+
+
+def invalidate(*scopes):
+    """Сделать недействительными страницы, зависящие от scopes.
+
+    Поколения увеличиваются сразу и повторно после фиксации транзакции,
+    чтобы страница, закэшированная конкурентным запросом до фиксации, не
+    пережила изменение. Вместе с поколением запоминается время изменения
+    для заголовка Last-Modified.
+    """
+    scopes = [scope for scope in scopes if scope]
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def post_scopes(post_id, author_username, group_slug=None):
+    """Вернуть области страниц, на которых выводится пост."""
+    scopes = [feed_scope(), user_scope(author_username), post_scope(post_id)]
+    if group_slug:
+        scopes.append(group_scope(group_slug))
+    return scopes
+
+
+def invalidate_post(post_id):
+    """Сделать недействительными страницы, на которых выводится пост."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group__slug').first()
+    if row is not None:
+        invalidate(*post_scopes(post_id, *row))
+
+
+def invalidate_posts(post_ids):
+    """Сделать недействительными страницы, на которых выводятся посты,
+    одним запросом к БД."""
+    rows = Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'author__username', 'group__slug')
+    invalidate(*{scope for row in rows for scope in post_scopes(*row)})
+
+
+def invalidate_users(*user_ids):
+    """Сделать недействительными профили и посты пользователей."""
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True)
+    invalidate(*(user_scope(username) for username in usernames))
+
+
+def fresh_reads(modified):
+    """Вернуть контекст чтений для страницы, области которой изменились в
+    момент modified (см. get_modified).
+
+    В течение REPLICA_PIN_SECONDS после изменения реплика может еще не
+    содержать его, а построенная по ней страница попала бы в кэш или
+    получила бы ETag с новым поколением, поэтому такие чтения идут в
+    основную базу.
+    """
+    if time.time() - modified < pin_seconds():
+        return use_primary()
+    return nullcontext()
+
+
+def page_key(request, scopes):
+    """Вернуть ключ кэша страницы для запроса и поколений scopes."""
+    scopes = list(COMMON_SCOPES) + list(scopes)
+    generations = ':'.join(str(gen) for gen in get_generations(scopes))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{PAGE_PREFIX}{path}:{generations}'
+
+
+def get_validators(request, scopes):
+    """Вернуть ETag и Last-Modified ответа, зависящего от scopes.
+
+    Валидаторы строятся по поколениям и отметкам времени областей в кэше,
+    без выполнения запросов страницы: ETag -- хэш адреса, пользователя,
+    заголовка Accept и поколений, Last-Modified -- время последнего
+    изменения областей. Для авторизованного пользователя в ETag входит и
+    CSRF-токен, который выводится в формах страницы: после его смены
+    (например, при входе) браузер не получит 304 со старым токеном.
+    """
+    scopes = list(COMMON_SCOPES) + list(scopes)
+    generations = ':'.join(str(gen) for gen in get_generations(scopes))
+    user = getattr(request, 'user', None)
+    user_id = csrf_token = ''
+    if user is not None and user.is_authenticated:
+        user_id, csrf_token = user.pk, request.META.get('CSRF_COOKIE', '')
+    source = '|'.join((request.get_full_path(), str(user_id), csrf_token,
+                       request.META.get('HTTP_ACCEPT', ''), generations))
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    return etag, get_modified(scopes)
+
+
+def conditional_response(request, scopes, handler):
+    """Ответить 304, если у клиента актуальная версия, иначе вызвать
+    handler() и добавить к успешному ответу ETag и Last-Modified.
+
+    Все запросы страницы должны выполняться внутри handler(): сразу после
+    изменения областей они идут в основную базу (см. fresh_reads).
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return handler()
+    etag, last_modified = get_validators(request, scopes)
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is None:
+        with fresh_reads(last_modified):
+            response = handler()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # клиент может хранить ответ, но должен проверять его актуальность
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _rendered(response):
+    """Отрендерить отложенный ответ шаблона, чтобы запросы шаблона
+    выполнились сразу."""
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    return response
+
+
+class ConditionalPageMixin:
+    """ Класс ConditionalPageMixin отвечает на условные GET-запросы
+    (If-None-Match, If-Modified-Since) кодом 304 без построения страницы.
+
+    Валидаторы вычисляются по областям get_page_cache_scopes() (см.
+    get_validators), поэтому должны идти в MRO раньше
+    AnonymousPageCacheMixin и самого представления.
+
+    Методы класса
+    --------
+    get_page_cache_scopes() -- возвращает области, от которых зависит
+        страница.
+    """
+
+    def get_page_cache_scopes(self):
+        """Вернуть список областей, от которых зависит страница."""
+        return [feed_scope()]
+
+    def dispatch(self, request, *args, **kwargs):
+        return conditional_response(
+            request, self.get_page_cache_scopes(),
+            lambda: _rendered(super(ConditionalPageMixin, self).dispatch(
+                request, *args, **kwargs)))
+
+
+class AnonymousPageCacheMixin:
+    """ Класс AnonymousPageCacheMixin кэширует страницы для анонимных
+    пользователей.
+
+    Ключ страницы содержит поколения областей (лента, сообщество, автор,
+    пост), от которых она зависит, поэтому изменение соответствующих
+    записей делает страницу недействительной без фиксированного TTL.
+    Запросы авторизованных пользователей кэш не используют. Страница,
+    области которой только что изменились, строится по основной базе
+    (см. fresh_reads).
+
+    Методы класса
+    --------
+    get_page_cache_scopes() -- возвращает области, от которых зависит
+        страница.
+    """
+
+    def get_page_cache_scopes(self):
+        """Вернуть список областей, от которых зависит страница."""
+        return [feed_scope()]
+
+    def dispatch(self, request, *args, **kwargs):
+        if (not getattr(settings, 'PAGE_CACHE_ENABLED', True)
+                or request.method != 'GET'
+                or request.user.is_authenticated):
+            return super().dispatch(request, *args, **kwargs)
+        scopes = self.get_page_cache_scopes()
+        key = page_key(request, scopes)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        with fresh_reads(get_modified(list(COMMON_SCOPES) + scopes)):
+            response = _rendered(super().dispatch(request, *args, **kwargs))
+        if response.status_code == 200:
+            cache.set(key, (response.content, response['Content-Type']),
+                      PAGE_TIMEOUT)
+        return response
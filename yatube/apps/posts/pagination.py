@@ -0,0 +1,247 @@
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(values):
+    """Закодировать значения ключа сортировки в строку курсора."""
+    payload = json.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Раскодировать курсор в список из size значений ключа сортировки."""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Некорректный курсор')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Некорректный курсор')
+    return values
+
+
+class KeysetPage:
+    """ Класс KeysetPage описывает страницу keyset-пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page в части, используемой
+    шаблонами, но вместо номеров страниц хранит курсоры соседних страниц.
+
+    Атрибуты объекта
+    --------
+    object_list : list
+        записи страницы
+    next_cursor : str
+        курсор следующей (более старой) страницы или None
+    previous_cursor : str
+        курсор предыдущей (более новой) страницы или None
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """ Класс KeysetPaginator разбивает выборку на страницы по ключу
+    сортировки (keyset/seek-пагинация).
+
+    Страница выбирается условием WHERE по значениям ключа последней
+    записи предыдущей страницы, поэтому стоимость запроса не зависит от
+    глубины страницы и не требуется COUNT(*).
+
+    Атрибуты объекта
+    --------
+    queryset : QuerySet
+        исходная выборка
+    per_page : int
+        число записей на странице
+    ordering : Tuple[str]
+        поля ключа сортировки, последнее поле должно быть уникальным.
+
+    Методы класса
+    --------
+    page(after, before) -- возвращает страницу после курсора after или перед
+        курсором before.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-pub_date', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    @property
+    def fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _cursor_for(self, obj):
+        return encode_cursor(getattr(obj, field) for field in self.fields)
+
+    def _seek(self, values, reverse):
+        """Вернуть условие для записей, следующих за ключом values."""
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            equal = {name: value for name, value in
+                     zip(self.fields[:index], values[:index])}
+            conditions.append(Q(**equal, **{
+                f'{self.fields[index]}__{lookup}': values[index]}))
+        return reduce(lambda left, right: left | right, conditions)
+
+    def page(self, after=None, before=None):
+        """Вернуть страницу KeysetPage.
+
+        after -- курсор, после которого выбираются более старые записи,
+        before -- курсор, перед которым выбираются более новые записи.
+        """
+        reverse = before is not None
+        cursor = before if reverse else after
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith('-')
+                             else f'-{field}' for field in ordering)
+        queryset = self.queryset.order_by(*ordering)
+        if cursor is not None:
+            values = decode_cursor(cursor, len(self.fields))
+            try:
+                queryset = queryset.filter(self._seek(values, reverse))
+                object_list = list(queryset[:self.per_page + 1])
+            except (TypeError, ValueError, ValidationError):
+                raise InvalidCursor('Некорректный курсор')
+        else:
+            object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if reverse:
+            object_list.reverse()
+        if not object_list:
+            return KeysetPage(object_list, None, None)
+        first, last = object_list[0], object_list[-1]
+        next_cursor = previous_cursor = None
+        if has_more or reverse:
+            next_cursor = self._cursor_for(last)
+        if cursor is not None and (has_more or not reverse):
+            previous_cursor = self._cursor_for(first)
+        return KeysetPage(object_list, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """ Класс KeysetPaginationMixin включает keyset-пагинацию в ListView.
+
+    Режим включается настройкой FEED_PAGINATION = 'keyset', иначе
+    используется стандартная постраничная пагинация Django. Курсоры
+    передаются в параметрах запроса after и before.
+
+    Атрибуты класса
+    --------
+    keyset_ordering : Tuple[str]
+        поля ключа сортировки ленты.
+    """
+
+    keyset_ordering = ('-pub_date', '-id')
+
+    def is_keyset_pagination(self):
+        """Вернуть True, если включена keyset-пагинация."""
+        return getattr(settings, 'FEED_PAGINATION', 'offset') == 'keyset'
+
+    def paginate_queryset(self, queryset, page_size):
+        """Разбить выборку на страницы по курсору из запроса."""
+        if not self.is_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        try:
+            page = paginator.page(after=self.request.GET.get('after'),
+                                  before=self.request.GET.get('before'))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+def estimate_table_rows(model, using='default'):
+    """Вернуть оценку числа строк таблицы модели без COUNT(*) или None.
+
+    На PostgreSQL берется статистика планировщика pg_class.reltuples, на
+    SQLite -- максимальный rowid, который получается по индексу первичного
+    ключа и превышает точное число строк на число удаленных записей.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s',
+                           [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Класс EstimatedCountPaginator используется для постраничного вывода
+    больших таблиц без точного COUNT(*).
+
+    Родительский класс -- Paginator.
+
+    Для выборки без условий число записей оценивается по статистике СУБД
+    (см. estimate_table_rows), если оценка больше exact_count_limit. Для
+    отфильтрованной выборки записи считаются точно, но не дальше
+    exact_count_limit: последние страницы большой выборки недоступны, ее
+    нужно сузить поиском.
+
+    Атрибуты класса
+    --------
+    exact_count_limit : int
+        предел точного подсчета записей
+    """
+
+    exact_count_limit = getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000)
+
+    @cached_property
+    def count(self):
+        """Вернуть точное или оценочное число записей."""
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_count_limit:
+                return estimate
+        return queryset.values('pk')[:self.exact_count_limit].count()
@@ -0,0 +1,308 @@
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .. import services
+from ..db import immediate_atomic
+from ..models import Follow, Like, Post, User
+
+logger = logging.getLogger(__name__)
+
+# Максимальное число элементов в одном запросе пакетной операции
+BULK_MAX_ITEMS = getattr(settings, 'API_BULK_MAX_ITEMS', 100)
+
+
+def get_bulk_items(request):
+    """Вернуть список элементов пакетного запроса.
+
+    Тело запроса должно быть непустым массивом не длиннее BULK_MAX_ITEMS,
+    иначе весь пакет отклоняется с ошибкой 400.
+    """
+    items = request.data
+    if not isinstance(items, list) or not items:
+        raise ValidationError('Ожидается непустой массив элементов')
+    if len(items) > BULK_MAX_ITEMS:
+        raise ValidationError(
+            f'В одном запросе не больше {BULK_MAX_ITEMS} элементов')
+    return items
+
+
+def item_result(code, data=None, errors=None):
+    """Вернуть результат обработки одного элемента пакета."""
+    result = {'status': code}
+    if data is not None:
+        result['data'] = data
+    if errors is not None:
+        result['errors'] = errors
+    return result
+
+
+def bulk_response(results):
+    """Вернуть ответ пакетной операции с результатами по элементам.
+
+    Результаты идут в порядке элементов запроса. Код ответа 200, если все
+    элементы обработаны успешно, иначе 207 (Multi-Status).
+    """
+    failed = sum(result['status'] >= 400 for result in results)
+    return Response(
+        {'results': results, 'succeeded': len(results) - failed,
+         'failed': failed},
+        status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK)
+
+
+def _int_field(item, field):
+    """Вернуть целое значение поля элемента или None."""
+    value = item.get(field) if isinstance(item, dict) else None
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def create_posts(request, serializer_class, items):
+    """Создать посты пользователя в одной транзакции.
+
+    Каждый пост проверяется сериализатором и сохраняется в собственной
+    точке сохранения: ошибка проверки (400) или сохранения (500, например
+    нарушение ограничения БД или ошибка записи изображения) одного
+    элемента не отменяет остальные. Посты
+    сохраняются по одному, а не через bulk_create, так как на SQLite
+    bulk_create не возвращает первичные ключи, нужные ответу и обработчикам
+    post_save (поисковый индекс, статистика, ленты подписчиков).
+    """
+    results = []
+    context = {'request': request}
+    with immediate_atomic():
+        for item in items:
+            serializer = serializer_class(data=item, context=context)
+            if not serializer.is_valid():
+                results.append(item_result(status.HTTP_400_BAD_REQUEST,
+                                           errors=serializer.errors))
+                continue
+            try:
+                with transaction.atomic():
+                    serializer.save(author=request.user)
+            except (DatabaseError, OSError):
+                logger.exception('Не удалось сохранить пост пакета')
+                results.append(item_result(
+                    status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    errors={'detail': 'Не удалось сохранить пост'}))
+                continue
+            results.append(item_result(status.HTTP_201_CREATED,
+                                       data=serializer.data))
+    return results
+
+
+def delete_posts(request, items):
+    """Удалить посты пользователя в одной транзакции.
+
+    Посты выбираются одним запросом; чужие посты не удаляются (403).
+    Удаление идет через Post.delete(), чтобы очистить миниатюры, а
+    счетчики, индекс и кэш обновляют обработчики post_delete.
+    """
+    ids = [_int_field(item, 'id') for item in items]
+    posts = Post.objects.in_bulk([pk for pk in ids if pk is not None])
+    results = []
+    deleted = set()
+    with immediate_atomic():
+        for pk in ids:
+            post = posts.get(pk)
+            if pk is None:
+                results.append(item_result(
+                    status.HTTP_400_BAD_REQUEST,
+                    errors={'id': ['Укажите числовой id поста']}))
+            elif post is None or pk in deleted:
+                results.append(item_result(status.HTTP_404_NOT_FOUND))
+            elif post.author_id != request.user.pk:
+                results.append(item_result(status.HTTP_403_FORBIDDEN))
+            else:
+                post.delete()
+                deleted.add(pk)
+                results.append(item_result(status.HTTP_204_NO_CONTENT,
+                                           data={'id': pk}))
+    return results
+
+
+def _check_post_items(request, items):
+    """Проверить элементы пакета лайков.
+
+    Вернуть список пар (id поста или None, результат с ошибкой или None)
+    и множество id постов, уже лайкнутых пользователем. Существование
+    постов и лайков проверяется двумя запросами на весь пакет.
+    """
+    ids = [_int_field(item, 'post') for item in items]
+    wanted = {pk for pk in ids if pk is not None}
+    existing = set(Post.objects.filter(pk__in=wanted).values_list(
+        'pk', flat=True))
+    liked = set(Like.objects.filter(
+        user=request.user, post_id__in=existing).values_list(
+        'post_id', flat=True))
+    checked = []
+    for pk in ids:
+        if pk is None:
+            checked.append((None, item_result(
+                status.HTTP_400_BAD_REQUEST,
+                errors={'post': ['Укажите числовой id поста']})))
+        elif pk not in existing:
+            checked.append((None, item_result(status.HTTP_404_NOT_FOUND)))
+        else:
+            checked.append((pk, None))
+    return checked, liked
+
+
+def create_likes(request, items):
+    """Лайкнуть посты одним bulk_create.
+
+    Уникальность (unique_like) проверяется одним запросом по всему пакету
+    и внутри пакета; представление выполняется в транзакции BEGIN
+    IMMEDIATE (WriteTransactionMixin), поэтому между проверкой и вставкой
+    лайки не меняются. bulk_create не вызывает post_save, поэтому счетчики
+    постов и кэш страниц обновляются здесь одним UPDATE на весь пакет.
+    """
+    checked, liked = _check_post_items(request, items)
+    results, created = [], []
+    for pk, error in checked:
+        if error is not None:
+            results.append(error)
+        elif pk in liked:
+            results.append(item_result(
+                status.HTTP_409_CONFLICT,
+                errors={'post': ['Этот пост уже лайкнут']}))
+        else:
+            liked.add(pk)
+            created.append(pk)
+            results.append(item_result(status.HTTP_201_CREATED,
+                                       data={'post': pk}))
+    if created:
+        with immediate_atomic():
+            Like.objects.bulk_create(
+                [Like(user=request.user, post_id=pk) for pk in created],
+                ignore_conflicts=True)
+            services.likes_changed(created, 1)
+    return results
+
+
+def delete_likes(request, items):
+    """Снять лайки с постов в одной транзакции.
+
+    Лайки удаляются одним DELETE без сигналов post_delete, счетчики
+    постов и кэш страниц обновляются одним UPDATE на весь пакет.
+    """
+    checked, liked = _check_post_items(request, items)
+    results, removed = [], []
+    for pk, error in checked:
+        if error is not None:
+            results.append(error)
+        elif pk not in liked or pk in removed:
+            results.append(item_result(status.HTTP_404_NOT_FOUND))
+        else:
+            removed.append(pk)
+            results.append(item_result(status.HTTP_204_NO_CONTENT,
+                                       data={'post': pk}))
+    if removed:
+        with immediate_atomic():
+            services.delete_rows(Like, user_id=request.user.pk,
+                                 post_id=removed)
+            services.likes_changed(removed, -1)
+    return results
+
+
+def _check_follow_items(request, items):
+    """Проверить элементы пакета подписок.
+
+    Вернуть список пар (автор или None, результат с ошибкой или None) и
+    множество id авторов, на которых пользователь уже подписан. Авторы и
+    подписки ищутся двумя запросами на весь пакет.
+    """
+    names = [item.get('following') if isinstance(item, dict) else None
+             for item in items]
+    authors = {user.username: user for user in User.objects.filter(
+        username__in={name for name in names if isinstance(name, str)})}
+    following = set(Follow.objects.filter(
+        user=request.user,
+        author__in=[user.pk for user in authors.values()]).values_list(
+        'author_id', flat=True))
+    checked = []
+    for name in names:
+        author = authors.get(name) if isinstance(name, str) else None
+        if not isinstance(name, str) or not name:
+            checked.append((None, item_result(
+                status.HTTP_400_BAD_REQUEST,
+                errors={'following': ['Укажите имя автора']})))
+        elif author is None:
+            checked.append((None, item_result(status.HTTP_404_NOT_FOUND)))
+        else:
+            checked.append((author, None))
+    return checked, following
+
+
+def create_follows(request, items):
+    """Подписаться на авторов одним bulk_create.
+
+    Уникальность (unique_following) проверяется одним запросом по всему
+    пакету и внутри пакета; представление выполняется в транзакции BEGIN
+    IMMEDIATE (WriteTransactionMixin), поэтому между проверкой и вставкой
+    подписки не меняются. Статистика авторов, кэш страниц и ленты
+    подписчика обновляются здесь, так как bulk_create не вызывает
+    post_save.
+    """
+    checked, following = _check_follow_items(request, items)
+    results, created = [], []
+    for author, error in checked:
+        if error is not None:
+            results.append(error)
+        elif author.pk == request.user.pk:
+            results.append(item_result(
+                status.HTTP_400_BAD_REQUEST,
+                errors={'following': ['Нельзя подписываться на самого '
+                                      'себя']}))
+        elif author.pk in following:
+            results.append(item_result(
+                status.HTTP_409_CONFLICT,
+                errors={'following': ['Такая подписка уже есть']}))
+        else:
+            following.add(author.pk)
+            created.append(author.pk)
+            results.append(item_result(status.HTTP_201_CREATED,
+                                       data={'following': author.username}))
+    if created:
+        user_id = request.user.pk
+        with immediate_atomic():
+            Follow.objects.bulk_create(
+                [Follow(user_id=user_id, author_id=pk) for pk in created],
+                ignore_conflicts=True)
+            services.follows_changed(user_id, created, 1)
+    return results
+
+
+def delete_follows(request, items):
+    """Отписаться от авторов в одной транзакции.
+
+    Подписки удаляются одним DELETE без сигналов post_delete, статистика
+    и кэш обновляются одним UPDATE на весь пакет, посты авторов убираются
+    из ленты подписчика.
+    """
+    checked, following = _check_follow_items(request, items)
+    results, removed = [], []
+    for author, error in checked:
+        if error is not None:
+            results.append(error)
+        elif author.pk not in following or author.pk in removed:
+            results.append(item_result(status.HTTP_404_NOT_FOUND))
+        else:
+            removed.append(author.pk)
+            results.append(item_result(status.HTTP_204_NO_CONTENT,
+                                       data={'following': author.username}))
+    if removed:
+        user_id = request.user.pk
+        with immediate_atomic():
+            services.delete_rows(Follow, user_id=user_id,
+                                 author_id=removed)
+            services.follows_changed(user_id, removed, -1)
+    return results
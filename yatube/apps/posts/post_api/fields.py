@@ -0,0 +1,151 @@
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import permissions, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+
+def requested_names(request, param):
+    """Вернуть множество имен из параметра запроса вида ?param=a,b или
+    None, если параметр не передан.
+
+    Параметры учитываются только в безопасных запросах: при создании и
+    изменении объекта сериализатору нужны все поля.
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """ Класс DynamicFieldsMixin добавляет сериализатору параметры запроса
+    ?fields= (оставить только перечисленные поля) и ?expand= (заменить
+    ссылки вложенными объектами).
+
+    Параметры применяются только к сериализатору верхнего уровня
+    (в том числе к элементам списка). Неизвестные имена игнорируются.
+
+    Атрибуты класса
+    --------
+    expandable_fields : Dict[str, Callable[[], Field]]
+        фабрики полей, подставляемых при раскрытии по имени. Связанные
+        объекты должны загружаться представлением заранее (см.
+        ExpandRelatedMixin), чтобы раскрытие не порождало запросов на
+        каждый объект.
+    """
+
+    expandable_fields = {}
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        """Вернуть поля с учетом параметров fields и expand."""
+        fields = super().get_fields()
+        if not self._is_root():
+            return fields
+        request = self.context.get('request')
+        expand = requested_names(request, 'expand') or set()
+        for name in expand & set(self.expandable_fields):
+            fields[name] = self.expandable_fields[name]()
+        only = requested_names(request, 'fields')
+        if only:
+            for name in set(fields) - only - expand:
+                del fields[name]
+        return fields
+
+
+class ExpandRelatedMixin:
+    """ Класс ExpandRelatedMixin загружает связанные объекты, раскрываемые
+    параметром ?expand=, вместе с основной выборкой (select_related).
+
+    Атрибуты класса
+    --------
+    expand_related : Dict[str, Tuple[str]]
+        пути select_related для каждого раскрываемого имени
+    """
+
+    expand_related = {}
+
+    def get_queryset(self):
+        """Вернуть выборку с присоединенными раскрываемыми объектами."""
+        queryset = super().get_queryset()
+        expand = requested_names(self.request, 'expand') or set()
+        related = [path for name in sorted(expand & set(self.expand_related))
+                   for path in self.expand_related[name]]
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset
+
+
+# Поля, значение которых выводится без преобразования, если атрибут модели
+# берется напрямую (source без точек и не '*')
+_PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField,
+                 serializers.BooleanField)
+
+
+class FastRepresentationMixin:
+    """ Класс FastRepresentationMixin ускоряет вывод объектов сериализатором.
+
+    Для каждого поля один раз на экземпляр сериализатора (при many=True --
+    на весь список) строится функция чтения значения: простые поля модели
+    читаются напрямую, для PrimaryKeyRelatedField берется значение
+    столбца *_id без обращения к связанному объекту, остальные поля
+    выводятся штатным to_representation(). Результат совпадает с выводом
+    ModelSerializer, но без OrderedDict и поиска атрибутов на каждое поле
+    каждого объекта.
+
+    Атрибуты класса
+    --------
+    fast_representation : bool
+        включает быстрый вывод (False -- штатный вывод DRF)
+    """
+
+    fast_representation = True
+
+    def _field_reader(self, field):
+        """Вернуть функцию чтения представления поля из объекта."""
+        source = field.source
+        simple = source != '*' and '.' not in source
+        if simple and type(field) in _PLAIN_FIELDS and not isinstance(
+                field, serializers.ChoiceField):
+            return attrgetter(source)
+        if (simple and isinstance(field, serializers.PrimaryKeyRelatedField)
+                and field.pk_field is None):
+            try:
+                return attrgetter(
+                    self.Meta.model._meta.get_field(source).attname)
+            except FieldDoesNotExist:
+                pass
+
+        def read(instance):
+            attribute = field.get_attribute(instance)
+            check = (attribute.pk if isinstance(attribute, PKOnlyObject)
+                     else attribute)
+            return None if check is None else field.to_representation(
+                attribute)
+        return read
+
+    def to_representation(self, instance):
+        """Вернуть представление объекта."""
+        if not self.fast_representation:
+            return super().to_representation(instance)
+        readers = self.__dict__.get('_fast_readers')
+        if readers is None:
+            readers = self._fast_readers = [
+                (field.field_name, self._field_reader(field))
+                for field in self._readable_fields]
+        ret = {}
+        for name, read in readers:
+            try:
+                ret[name] = read(instance)
+            except SkipField:
+                continue
+        return ret
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from ..pagination import KeysetPaginator
+
+
+class KeysetCursorPagination(BasePagination):
+    """ Класс KeysetCursorPagination реализует курсорную пагинацию API.
+
+    Родительский класс -- BasePagination.
+
+    Страницы выбираются условием по ключу сортировки представления
+    (атрибут keyset_ordering, по умолчанию (-pub_date, -id)), поэтому
+    COUNT(*) не выполняется, а новые записи не сдвигают уже выданные
+    страницы и не приводят к дубликатам.
+
+    Атрибуты класса
+    --------
+    page_size : int
+        размер страницы по умолчанию
+    max_page_size : int
+        максимальный размер страницы, запрошенный клиентом
+    page_size_query_param : str
+        параметр запроса с размером страницы
+    after_query_param, before_query_param : str
+        параметры запроса с курсорами более старой и более новой страниц.
+    """
+
+    page_size = api_settings.PAGE_SIZE or 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    after_query_param = 'after'
+    before_query_param = 'before'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def get_page_size(self, request):
+        """Вернуть размер страницы, ограниченный max_page_size."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, 'keyset_ordering', self.ordering)
+        paginator = KeysetPaginator(queryset, self.get_page_size(request),
+                                    ordering)
+        try:
+            self.page = paginator.page(
+                after=request.query_params.get(self.after_query_param),
+                before=request.query_params.get(self.before_query_param))
+        except InvalidPage:
+            raise NotFound(self.invalid_cursor_message)
+        return list(self.page)
+
+    def _link(self, param, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        for name in (self.after_query_param, self.before_query_param):
+            url = remove_query_param(url, name)
+        return replace_query_param(url, param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.after_query_param, self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.before_query_param,
+                          self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': description,
+                'schema': {'type': schema_type},
+            }
+            for name, description, schema_type in (
+                (self.after_query_param, 'Курсор более старой страницы',
+                 'string'),
+                (self.before_query_param, 'Курсор более новой страницы',
+                 'string'),
+                (self.page_size_query_param,
+                 f'Размер страницы, не больше {self.max_page_size}',
+                 'integer'),
+            )
+        ]
+
+
+class SearchPagination(PageNumberPagination):
+    """ Класс SearchPagination реализует постраничный вывод результатов
+    поиска.
+
+    Родительский класс -- PageNumberPagination.
+
+    Результаты упорядочены по релевантности, а не по ключу, допускающему
+    курсорную пагинацию, поэтому страницы выбираются по номеру.
+
+    Атрибуты класса
+    --------
+    page_size : int
+        размер страницы по умолчанию
+    max_page_size : int
+        максимальный размер страницы, запрошенный клиентом
+    page_size_query_param : str
+        параметр запроса с размером страницы
+    """
+
+    page_size = api_settings.PAGE_SIZE or 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
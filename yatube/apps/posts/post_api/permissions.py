@@ -18,3 +18,22 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         """Определить и вернуть право на поступивший запрос."""
         return (request.method in permissions.SAFE_METHODS or
                 obj.author == request.user)
+
+
+class IsOwnerOrReadOnly(permissions.BasePermission):
+    """
+    Класс IsOwnerOrReadOnly используется для установки ограничений на
+    изменение записей (лайков) только поставившими их пользователями.
+
+    Родительский класс -- permissions.BasePermission.
+
+    Методы класса
+    --------
+    has_object_permission(self, request, view, obj) -- определяет права на
+    обработку объекта.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        """Определить и вернуть право на поступивший запрос."""
+        return (request.method in permissions.SAFE_METHODS or
+                obj.user == request.user)
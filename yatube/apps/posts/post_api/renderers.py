@@ -0,0 +1,73 @@
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+# Значения, которые orjson и msgpack не сериализуют сами (ленивые строки,
+# Decimal, даты и т.п.), преобразуются так же, как в JSONRenderer DRF
+_default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """ Класс ORJSONRenderer сериализует ответы API в JSON через orjson.
+
+    Родительский класс -- JSONRenderer.
+
+    Результат совпадает с JSONRenderer DRF (компактный вывод, экранирование
+    U+2028/U+2029), но строится в несколько раз быстрее. Ответы с
+    отступами (Accept: application/json; indent=N и браузерная версия API)
+    формирует родительский класс.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """ Класс ORJSONParser разбирает тело запроса в формате JSON через
+    orjson.
+
+    Родительский класс -- JSONParser.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Разобрать тело запроса и вернуть данные."""
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """ Класс MessagePackRenderer сериализует ответы API в MessagePack.
+
+    Родительский класс -- BaseRenderer.
+
+    Выбирается заголовком Accept: application/msgpack или параметром
+    ?format=msgpack.
+    """
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
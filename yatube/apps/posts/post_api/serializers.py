@@ -1,42 +1,144 @@
+from django.db import models
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
 
-from ..models import Comment, Follow, Group, Like, Post, User
+from .fields import DynamicFieldsMixin, FastRepresentationMixin
+from ..models import AuthorStats, Comment, Follow, Group, Like, Post, User
+from ..thumbnails import get_image_variants
 
 
-class PostSerializer(serializers.ModelSerializer):
-    """ Класс PostSerializer описывает сериализатор модели постов.
+class AuthorSerializer(serializers.ModelSerializer):
+    """ Класс AuthorSerializer описывает сериализатор профиля автора,
+    подставляемого при ?expand=author.
+
+    Родительский класс -- serializers.ModelSerializer.
+    """
+
+    class Meta:
+        fields = ('id', 'username', 'first_name', 'last_name')
+        model = User
+
+
+class AuthorStatsSerializer(serializers.ModelSerializer):
+    """ Класс AuthorStatsSerializer описывает сериализатор статистики
+    автора, подставляемой при ?expand=stats.
 
     Родительский класс -- serializers.ModelSerializer.
+    """
+
+    class Meta:
+        fields = ('posts_count', 'followers_count', 'following_count')
+        model = AuthorStats
+
+
+class GroupSerializer(FastRepresentationMixin, serializers.ModelSerializer):
+    """ Класс GroupSerializer описывает сериализатор модели сообществ.
+
+    Родительский класс -- FastRepresentationMixin,
+    serializers.ModelSerializer.
+    """
+
+    class Meta:
+        fields = ('id', 'title', 'slug')
+        model = Group
+        read_only_fields = ['slug', ]
+
+
+# Раскрываемые по ?expand= поля постов и комментариев: сообщество, профиль
+# и статистика автора
+EXPANDABLE_AUTHOR_FIELDS = {
+    'author': lambda: AuthorSerializer(read_only=True),
+    'stats': lambda: AuthorStatsSerializer(source='author.stats',
+                                           read_only=True, allow_null=True),
+}
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """ Класс PostListSerializer выводит список постов, загружая варианты
+    изображений всех постов списка одним запросом к кэшу.
+
+    Родительский класс -- serializers.ListSerializer.
+    """
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.Manager)
+                     else data)
+        if 'image_variants' in self.child.fields:
+            self.child.loaded_image_variants = get_image_variants(posts)
+        return super().to_representation(posts)
+
+
+class PostSerializer(FastRepresentationMixin, DynamicFieldsMixin,
+                     serializers.ModelSerializer):
+    """ Класс PostSerializer описывает сериализатор модели постов.
+
+    Родительский класс -- FastRepresentationMixin, DynamicFieldsMixin,
+    serializers.ModelSerializer.
 
     Атрибуты класса
     --------
     author : str
         Юзернейм автора.
+    image_variants : List[dict]
+        Адаптивные варианты изображения (MIME-тип, ширина, высота, адрес).
+    loaded_image_variants : Dict[int, List[dict]]
+        Варианты изображений постов списка, загруженные PostListSerializer.
+    expandable_fields : Dict[str, Callable[[], Field]]
+        Поля, раскрываемые параметром ?expand= (group, author, stats).
     """
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username')
+    image_variants = serializers.SerializerMethodField()
+
+    expandable_fields = dict(
+        EXPANDABLE_AUTHOR_FIELDS,
+        group=lambda: GroupSerializer(read_only=True, allow_null=True))
+
+    loaded_image_variants = None
 
     class Meta:
         fields = '__all__'
         model = Post
-
-
-class CommentSerializer(serializers.ModelSerializer):
+        list_serializer_class = PostListSerializer
+
+    def get_image_variants(self, obj):
+        """Вернуть варианты изображения с абсолютными адресами.
+
+        Варианты берутся из загруженных списком (см. PostListSerializer),
+        для отдельного поста -- из кэша (см. thumbnails.get_image_variants).
+        """
+        if not obj.image:
+            return []
+        variants = (self.loaded_image_variants or {}).get(obj.pk)
+        if variants is None:
+            variants = get_image_variants([obj])[obj.pk]
+        request = self.context.get('request')
+        if request is None:
+            return variants
+        return [dict(variant, url=request.build_absolute_uri(variant['url']))
+                for variant in variants]
+
+
+class CommentSerializer(FastRepresentationMixin, DynamicFieldsMixin,
+                        serializers.ModelSerializer):
     """ Класс CommentSerializer описывает сериализатор модели комментариев.
 
-    Родительский класс -- serializers.ModelSerializer.
+    Родительский класс -- FastRepresentationMixin, DynamicFieldsMixin,
+    serializers.ModelSerializer.
 
     Атрибуты класса
     --------
     author : str
         Юзернейм автора.
+    expandable_fields : Dict[str, Callable[[], Field]]
+        Поля, раскрываемые параметром ?expand= (author, stats).
     """
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username')
 
+    expandable_fields = EXPANDABLE_AUTHOR_FIELDS
+
     class Meta:
         fields = '__all__'
         model = Comment
@@ -48,6 +150,9 @@ class FollowSerializer(serializers.ModelSerializer):
     Родительский класс -- serializers.ModelSerializer.
     Переопределенные методы -- validate.
 
+    Уникальность подписки не проверяется отдельным запросом: подписку
+    создает services.follow() одним INSERT, пропускающим дубликат.
+
     Атрибуты класса
     --------
     user : str
@@ -61,6 +166,7 @@ class FollowSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault())
 
     following = serializers.SlugRelatedField(
+        source='author',
         queryset=User.objects.all(),
         slug_field='username'
     )
@@ -68,54 +174,36 @@ class FollowSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'user', 'following')
         model = Follow
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=['user', 'following'],
-                message='Такая подписка уже есть'
-            )
-        ]
 
     def validate(self, data):
-        if data['user'] == data['following']:
+        if data['user'] == data['author']:
             raise serializers.ValidationError(
                 'Нельзя подписываться на самого себя')
         return data
 
 
-class GroupSerializer(serializers.ModelSerializer):
-    """ Класс GroupSerializer описывает сериализатор модели сообществ.
-
-    Родительский класс -- serializers.ModelSerializer.
-    """
-
-    class Meta:
-        fields = ('id', 'title', 'slug')
-        model = Group
-        read_only_fields = ['slug', ]
-
-
 class LikeSerializer(serializers.ModelSerializer):
     """ Класс LikeSerializer описывает сериализатор модели лайков.
 
     Родительский класс -- serializers.ModelSerializer.
 
+    Все поля только для чтения: пост берется из адреса запроса, а лайк
+    создает services.like() одним INSERT, пропускающим дубликат.
+
     Атрибуты класса
     --------
+    user : str
+        Юзернейм поставившего лайк.
     author : str
-        Юзернейм автора.
+        Юзернейм автора поста.
     """
-    author = serializers.SlugRelatedField(
-        queryset=User.objects.all(),
-        slug_field='username')
+    user = serializers.SlugRelatedField(slug_field='username',
+                                        read_only=True)
+    author = serializers.SlugRelatedField(source='post.author',
+                                          slug_field='username',
+                                          read_only=True)
 
     class Meta:
         fields = ('id', 'user', 'author', 'post')
+        read_only_fields = ('post',)
         model = Like
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Follow.objects.all(),
-                fields=['user', 'post'],
-                message='Этот пост уже лайкнут'
-            )
-        ]
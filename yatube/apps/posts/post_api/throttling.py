@@ -0,0 +1,153 @@
+import math
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """ Класс SlidingWindowThrottle ограничивает частоту запросов к API
+    скользящим окном по двум счетчикам.
+
+    Родительский класс -- SimpleRateThrottle.
+
+    Вместо списка отметок времени всех запросов за окно (как в
+    SimpleRateThrottle) на ключ хранятся два целых числа: запросы в текущем
+    и в предыдущем фиксированном окне. Число запросов за последние duration
+    секунд оценивается как previous * (доля предыдущего окна, попадающая в
+    скользящее) + current. Счетчик увеличивается атомарным cache.incr,
+    поэтому лимит соблюдается для всех процессов, использующих общий кэш.
+
+    Частота берется из DEFAULT_THROTTLE_RATES по области запроса:
+    user_read, user_write, anon_read или anon_write. Состояние лимита
+    сохраняется в запросе для заголовков X-RateLimit-* (см.
+    RateLimitHeadersMiddleware).
+
+    Методы класса
+    --------
+    get_scope(self, request, view) -- возвращает область лимита запроса.
+    get_cache_key(self, request, view) -- возвращает ключ счетчиков.
+    allow_request(self, request, view) -- учитывает запрос и решает, можно
+        ли его выполнить.
+    wait(self) -- возвращает время до следующего разрешенного запроса.
+    """
+
+    def __init__(self):
+        # частота зависит от запроса и определяется в allow_request
+        pass
+
+    def get_scope(self, request, view):
+        """Вернуть область лимита: чтение или запись, пользователь или
+        аноним."""
+        kind = 'read' if request.method in SAFE_METHODS else 'write'
+        if request.user and request.user.is_authenticated:
+            return f'user_{kind}'
+        return f'anon_{kind}'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def estimate(self):
+        """Вернуть оценку числа запросов за последние duration секунд."""
+        weight = (self.duration - self.elapsed) / self.duration
+        return self.previous * weight + self.current
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+        current_key = f'{self.key}_{window}'
+        previous_key = f'{self.key}_{window - 1}'
+        counts = self.cache.get_many([current_key, previous_key])
+        self.previous = counts.get(previous_key, 0)
+        self.current = counts.get(current_key, 0)
+        allowed = self.estimate() + 1 <= self.num_requests
+        if allowed:
+            # счетчик окна нужен, пока окно текущее или предыдущее
+            self.cache.add(current_key, 0, 2 * self.duration)
+            try:
+                self.current = self.cache.incr(current_key)
+            except ValueError:
+                # запись вытеснена из кэша между add и incr
+                self.cache.set(current_key, 1, 2 * self.duration)
+                self.current = 1
+            if self.estimate() > self.num_requests:
+                # лимит исчерпали одновременные запросы других процессов
+                self.current = self.cache.decr(current_key)
+                allowed = False
+        self.record(request)
+        return allowed
+
+    def record(self, request):
+        """Сохранить в запросе лимит, остаток и время до конца окна, если
+        остаток меньше, чем у уже проверенных ограничений."""
+        remaining = max(0, math.floor(self.num_requests - self.estimate()))
+        request = getattr(request, '_request', request)
+        state = getattr(request, 'rate_limit', None)
+        if state is None or remaining < state[1]:
+            request.rate_limit = (self.num_requests, remaining,
+                                  math.ceil(self.duration - self.elapsed))
+
+    def wait(self):
+        """Вернуть число секунд, через которое оценка с учетом нового
+        запроса перестанет превышать лимит."""
+        limit = self.num_requests - 1
+        if self.current <= limit:
+            if not self.previous:
+                # место освободилось после отказа одновременному запросу
+                return 0
+            # вклад предыдущего окна убывает со сдвигом скользящего окна
+            moment = (1 - (limit - self.current) / self.previous) \
+                * self.duration
+            return max(0, moment - self.elapsed)
+        # в следующем окне текущий счетчик станет предыдущим
+        moment = (1 - limit / self.current) * self.duration
+        return self.duration - self.elapsed + moment
+
+
+class TokenRateThrottle(SlidingWindowThrottle):
+    """ Класс TokenRateThrottle ограничивает частоту выдачи токенов JWT с
+    одного адреса (область token), защищая подбор паролей.
+
+    Родительский класс -- SlidingWindowThrottle.
+    """
+
+    def get_scope(self, request, view):
+        return 'token'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope,
+                                    'ident': self.get_ident(request)}
+
+
+class RateLimitHeadersMiddleware:
+    """ Класс RateLimitHeadersMiddleware добавляет к ответам API заголовки
+    X-RateLimit-Limit, X-RateLimit-Remaining и X-RateLimit-Reset (секунд до
+    конца текущего окна) по состоянию, сохраненному SlidingWindowThrottle.
+    Заголовок Retry-After ответа 429 устанавливает DRF.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        state = getattr(request, 'rate_limit', None)
+        if state is not None:
+            limit, remaining, reset = state
+            response['X-RateLimit-Limit'] = str(limit)
+            response['X-RateLimit-Remaining'] = str(remaining)
+            response['X-RateLimit-Reset'] = str(reset)
+        return response
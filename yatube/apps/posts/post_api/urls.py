@@ -7,22 +7,25 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
-from .views import (CommentViewSet, FollowViewSet, GroupViewSet, LikeViewSet,
-                    PostViewSet)
+from .throttling import TokenRateThrottle
+from .views import (CommentViewSet, ExportView, FollowViewSet, GroupViewSet,
+                    LikeBulkViewSet, LikeViewSet, PostViewSet)
 
 router = DefaultRouter()
 router.register('posts', PostViewSet)
 router.register('group', GroupViewSet)
 router.register('follow', FollowViewSet, basename='Follow')
+router.register('likes', LikeBulkViewSet, basename='Likes-bulk')
 router.register(r'posts/(?P<post_id>\d+)/comments', CommentViewSet,
                 basename='Comments')
 router.register(r'posts/(?P<post_id>\d+)/likes', LikeViewSet, basename='Likes')
 
 urlpatterns = [
-    path('v1/token/', TokenObtainPairView.as_view(),
-         name='token_obtain_pair'),
-    path('v1/token/refresh/', TokenRefreshView.as_view(),
-         name='token_refresh'),
+    path('v1/token/', TokenObtainPairView.as_view(
+        throttle_classes=[TokenRateThrottle]), name='token_obtain_pair'),
+    path('v1/token/refresh/', TokenRefreshView.as_view(
+        throttle_classes=[TokenRateThrottle]), name='token_refresh'),
+    path('v1/export/', ExportView.as_view(), name='export'),
     path('v1/', include(router.urls)),
     path('v1/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('v1/doc/',
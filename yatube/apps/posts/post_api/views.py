@@ -1,53 +1,168 @@
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as django_filters
 from rest_framework import filters, mixins, viewsets
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
-from .permissions import IsAuthorOrReadOnly
+from . import bulk
+from .fields import ExpandRelatedMixin, requested_names
+from .pagination import SearchPagination
+from .permissions import IsAuthorOrReadOnly, IsOwnerOrReadOnly
 from .serializers import (CommentSerializer, FollowSerializer, GroupSerializer,
                           LikeSerializer, PostSerializer)
+from ..db import WriteTransactionMixin
+from ..export import gzip_stream, iter_ndjson, parse_kinds, parse_since
 from ..models import Comment, Follow, Group, Like, Post
+from ..page_cache import conditional_response, feed_scope, post_scope
+from ..search import search_posts
+from ..services import follow, like, unlike
 
 
-class CreateAndListViewSet(mixins.CreateModelMixin,
+class CreateAndListViewSet(WriteTransactionMixin,
+                           mixins.CreateModelMixin,
                            mixins.ListModelMixin,
                            GenericViewSet):
     """ Класс CreateAndListViewSet используется для обеспечения `create()` и
-    `list()`.
+    `list()`; создание выполняется в транзакции BEGIN IMMEDIATE.
     """
     pass
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class ConditionalGetMixin:
+    """ Класс ConditionalGetMixin отвечает на условные запросы списка и
+    объекта (If-None-Match, If-Modified-Since) кодом 304, не выполняя
+    выборку.
+
+    Валидаторы строятся по поколениям областей кэша страниц (см.
+    page_cache.get_validators), которые увеличиваются при изменении
+    данных. Запросы с раскрытием ?expand= полей из uncached_expand
+    (профиль и статистика авторов всех объектов страницы, не входящие в
+    области) обрабатываются без условного ответа.
+
+    Атрибуты класса
+    --------
+    uncached_expand : Tuple[str]
+        имена раскрытий, отключающие условный ответ.
+
+    Методы класса
+    --------
+    get_list_scopes() -- возвращает области, от которых зависит список.
+    get_object_scopes() -- возвращает области, от которых зависит объект.
+    """
+
+    uncached_expand = ('author', 'stats')
+
+    def is_conditional(self, request):
+        """Вернуть True, если ответ можно проверять валидаторами."""
+        expand = requested_names(request, 'expand') or set()
+        return not expand & set(self.uncached_expand)
+
+    def get_list_scopes(self):
+        """Вернуть области, от которых зависит список."""
+        return [feed_scope()]
+
+    def get_object_scopes(self):
+        """Вернуть области, от которых зависит объект."""
+        return self.get_list_scopes()
+
+    def list(self, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return super().list(request, *args, **kwargs)
+        return conditional_response(
+            request, self.get_list_scopes(),
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request, self.get_object_scopes(),
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs))
+
+
+# Пути select_related для раскрытия ?expand= у постов и комментариев
+EXPAND_AUTHOR_RELATED = {
+    'author': ('author',),
+    'stats': ('author__stats',),
+}
+
+
+class PostViewSet(WriteTransactionMixin, ConditionalGetMixin,
+                  ExpandRelatedMixin, viewsets.ModelViewSet):
     """ Класс PostViewSet используется для обработки api-запросов на операции
     CRUD модели Post.
 
-    Родительский класс -- viewsets.ModelViewSet.
+    Родительский класс -- WriteTransactionMixin, ConditionalGetMixin,
+    ExpandRelatedMixin, viewsets.ModelViewSet.
     Переопределенные атрибуты -- queryset, serializer_class, permission_classes.
+    Параметры запроса -- fields (список полей), expand (group, author, stats).
     Переопределенные методы -- perform_create.
+    Дополнительные действия -- search (полнотекстовый поиск по параметру q),
+    bulk (пакетное создание и удаление постов).
     """
     queryset = Post.objects.select_related('author').all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthorOrReadOnly]
+    keyset_ordering = ('-pub_date', '-id')
+    expand_related = dict(EXPAND_AUTHOR_RELATED, group=('group',))
 
     filter_backends = [django_filters.DjangoFilterBackend]
     filterset_fields = ['group', ]
 
+    def get_object_scopes(self):
+        return [post_scope(self.kwargs['pk'])]
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=False, pagination_class=SearchPagination)
+    def search(self, request):
+        """Вернуть посты, подходящие под запрос q, по релевантности."""
+        queryset = search_posts(request.query_params.get('q', ''),
+                                self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated])
+    def bulk(self, request):
+        """Создать посты из массива или удалить посты по массиву {id}."""
+        items = bulk.get_bulk_items(request)
+        if request.method == 'DELETE':
+            return bulk.bulk_response(bulk.delete_posts(request, items))
+        return bulk.bulk_response(
+            bulk.create_posts(request, self.get_serializer_class(), items))
+
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(WriteTransactionMixin, ConditionalGetMixin,
+                     ExpandRelatedMixin, viewsets.ModelViewSet):
     """ Класс CommentViewSet используется для обработки api-запросов на операции
     CRUD модели Comment.
 
-    Родительский класс -- viewsets.ModelViewSet.
+    Родительский класс -- WriteTransactionMixin, ConditionalGetMixin,
+    ExpandRelatedMixin, viewsets.ModelViewSet.
     Переопределенные атрибуты -- queryset, serializer_class, permission_classes.
     Переопределенные методы -- perform_create, get_queryset.
+    Параметры запроса -- fields (список полей), expand (author, stats).
     """
+    queryset = Comment.objects.select_related('author')
     serializer_class = CommentSerializer
     permission_classes = [IsAuthorOrReadOnly]
+    keyset_ordering = ('-created', '-id')
+    expand_related = EXPAND_AUTHOR_RELATED
+
+    def get_list_scopes(self):
+        return [post_scope(self.kwargs['post_id'])]
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -55,41 +170,89 @@ class CommentViewSet(viewsets.ModelViewSet):
     def get_queryset(self, post_id=None):
         post_id = self.kwargs.get("post_id")
         post = get_object_or_404(Post, id=post_id)
-        return Comment.objects.filter(post=post)
+        return super().get_queryset().filter(post=post)
 
 
-class GroupViewSet(CreateAndListViewSet):
+class GroupViewSet(ConditionalGetMixin, CreateAndListViewSet):
     """
     Класс GroupViewSet используется для обработки api-запросов на операции
     CRUD модели Group.
 
-    Родительский класс -- viewsets.ModelViewSet.
+    Родительский класс -- ConditionalGetMixin, CreateAndListViewSet.
     Переопределенные атрибуты -- queryset, serializer_class, permission_classes.
     """
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
     permission_classes = [AllowAny]
+    keyset_ordering = ('slug', 'id')
+
+    def get_list_scopes(self):
+        return ['groups']
+
 
+def already_exists(message):
+    """Вернуть ошибку 400 о повторном создании лайка или подписки в
+    формате ошибок уровня объекта."""
+    return ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]})
 
-class LikeViewSet(viewsets.ModelViewSet):
+
+class LikeViewSet(WriteTransactionMixin,
+                  mixins.CreateModelMixin,
+                  mixins.RetrieveModelMixin,
+                  mixins.DestroyModelMixin,
+                  mixins.ListModelMixin,
+                  GenericViewSet):
     """
-    Класс LikeViewSet используется для обработки api-запросов на операции
-    CRUD модели Like.
+    Класс LikeViewSet используется для обработки api-запросов на создание,
+    просмотр и удаление лайков поста.
 
-    Родительский класс -- viewsets.ModelViewSet.
+    Родительский класс -- WriteTransactionMixin, GenericViewSet.
     Переопределенные атрибуты -- serializer_class, permission_classes.
-    Переопределенные методы -- perform_create, get_queryset.
+    Переопределенные методы -- perform_create, perform_destroy,
+    get_queryset.
     """
     serializer_class = LikeSerializer
-    permission_classes = [IsAuthorOrReadOnly]
+    permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+    keyset_ordering = ('-id',)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        """Поставить лайк через services.like(); повторный лайк -- 400."""
+        post_id = get_object_or_404(Post.objects.values_list('pk', flat=True),
+                                    pk=self.kwargs['post_id'])
+        if not like(self.request.user, post_id):
+            raise already_exists('Этот пост уже лайкнут')
+        serializer.instance = self.get_queryset().get(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        """Снять лайк через services.unlike()."""
+        unlike(instance.user, instance.post_id)
 
     def get_queryset(self, post_id=None):
         post_id = self.kwargs.get("post_id")
         post = get_object_or_404(Post, id=post_id)
-        return Like.objects.filter(post=post)
+        return Like.objects.select_related('user', 'post__author').filter(
+            post=post)
+
+
+class LikeBulkViewSet(WriteTransactionMixin, GenericViewSet):
+    """
+    Класс LikeBulkViewSet используется для обработки пакетных api-запросов
+    на создание и удаление лайков.
+
+    Родительский класс -- WriteTransactionMixin, GenericViewSet.
+    Переопределенные атрибуты -- serializer_class, permission_classes.
+    Дополнительные действия -- bulk (элементы вида {"post": id}).
+    """
+    serializer_class = LikeSerializer
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['post', 'delete'])
+    def bulk(self, request):
+        """Лайкнуть посты или снять с них лайки."""
+        items = bulk.get_bulk_items(request)
+        if request.method == 'DELETE':
+            return bulk.bulk_response(bulk.delete_likes(request, items))
+        return bulk.bulk_response(bulk.create_likes(request, items))
 
 
 class FollowViewSet(CreateAndListViewSet):
@@ -100,13 +263,69 @@ class FollowViewSet(CreateAndListViewSet):
     Родительский класс -- viewsets.ModelViewSet.
     Переопределенные атрибуты -- serializer_class, permission_classes,
     filter_backends.
-    Переопределенные методы -- get_queryset.
+    Переопределенные методы -- get_queryset, perform_create.
+    Дополнительные действия -- bulk (элементы вида {"following": username}).
     """
     serializer_class = FollowSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-id',)
 
     filter_backends = [filters.SearchFilter]
-    search_fields = ['user__username', ]
+    search_fields = ['author__username', ]
 
     def get_queryset(self):
-        return Follow.objects.filter(following=self.request.user)
+        return Follow.objects.select_related('user', 'author').filter(
+            user=self.request.user)
+
+    def perform_create(self, serializer):
+        """Подписаться через services.follow(); повторная подписка --
+        400."""
+        user = serializer.validated_data['user']
+        author = serializer.validated_data['author']
+        if not follow(user, author.pk):
+            raise already_exists('Такая подписка уже есть')
+        serializer.instance = Follow.objects.select_related(
+            'user', 'author').get(user=user, author=author)
+
+    @action(detail=False, methods=['post', 'delete'])
+    def bulk(self, request):
+        """Подписаться на авторов или отписаться от них."""
+        items = bulk.get_bulk_items(request)
+        if request.method == 'DELETE':
+            return bulk.bulk_response(bulk.delete_follows(request, items))
+        return bulk.bulk_response(bulk.create_follows(request, items))
+
+
+class ExportView(APIView):
+    """
+    Класс ExportView отдает администратору потоковую выгрузку данных в
+    формате NDJSON (см. команду export).
+
+    Родительский класс -- APIView.
+    Переопределенные атрибуты -- permission_classes, schema (потоковый ответ
+    не описывается сериализатором, эндпоинт не входит в схему API).
+    Параметры запроса -- kinds (виды данных через запятую), since (дата
+    начала выгрузки), compress=gzip (сжать ответ).
+    """
+    permission_classes = [IsAdminUser]
+    schema = None
+
+    def get(self, request):
+        """Вернуть выгрузку потоком, не собирая ее в памяти."""
+        params = request.query_params
+        try:
+            kinds = parse_kinds(params.get('kinds'))
+            since = (parse_since(params['since']) if params.get('since')
+                     else None)
+        except ValueError as exc:
+            raise ValidationError(str(exc))
+        stream = iter_ndjson(kinds, since)
+        if params.get('compress') == 'gzip':
+            response = StreamingHttpResponse(
+                gzip_stream(stream), content_type='application/gzip')
+            response['Content-Disposition'] = (
+                'attachment; filename="export.ndjson.gz"')
+        else:
+            response = StreamingHttpResponse(
+                stream, content_type='application/x-ndjson')
+        return response
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .db import SAFE_METHODS
+
+# Cookie с моментом, до которого чтения пользователя идут в основную базу
+PRIMARY_COOKIE = 'db_primary_until'
+# Ключ кэша с тем же закреплением для авторизованного пользователя
+PIN_PREFIX = 'dbpin:'
+
+_state = threading.local()
+
+
+def replicas():
+    """Вернуть псевдонимы реплик для чтения из DATABASE_REPLICAS."""
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    """Вернуть время в секундах, в течение которого после записи чтения
+    идут в основную базу."""
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+@contextmanager
+def use_primary():
+    """Направить чтения блока в основную базу."""
+    pinned = getattr(_state, 'pinned', False)
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = pinned or getattr(_state, 'wrote', False)
+
+
+def _user_pinned():
+    """Проверить закрепление пользователя запроса в общем кэше.
+
+    Пользователь проверяется один раз, когда он известен: после
+    AuthenticationMiddleware или аутентификации DRF, заменяющей
+    request.user. Чтение сессии при определении пользователя идет без
+    проверки.
+    """
+    user = getattr(getattr(_state, 'request', None), 'user', None)
+    if user is None or user is _state.checked_user:
+        return False
+    _state.checked_user = user
+    return bool(user.is_authenticated
+                and cache.get(f'{PIN_PREFIX}{user.pk}'))
+
+
+class PrimaryReplicaRouter:
+    """ Класс PrimaryReplicaRouter направляет запись в основную базу
+    (default), а чтение в HTTP-запросах -- в случайную реплику из
+    DATABASE_REPLICAS.
+
+    Чтение идет в основную базу, если запрос изменяющий (POST, PUT,
+    PATCH, DELETE), если в этом запросе уже была запись и в течение
+    REPLICA_PIN_SECONDS после записи пользователя (cookie
+    db_primary_until, а для авторизованного пользователя еще и ключ в
+    общем кэше, см. ReplicaRoutingMiddleware) -- так пользователь,
+    опубликовавший пост, поставивший лайк или подписавшийся, сразу видит
+    результат, даже если реплика отстает, в том числе с другого
+    устройства. Чтения внутри use_primary() (заполнение кэша страниц
+    после изменения данных, см. page_cache) тоже идут в основную базу.
+    Вне HTTP-запросов (команды управления, фоновые задачи) чтение всегда
+    идет в основную базу.
+
+    Методы класса
+    --------
+    db_for_read(model, **hints) -- возвращает базу для чтения.
+    db_for_write(model, **hints) -- возвращает основную базу и закрепляет
+        чтения запроса за ней.
+    allow_relation(obj1, obj2, **hints) -- разрешает связи объектов
+        основной базы и реплик.
+    allow_migrate(db, app_label, model_name=None, **hints) -- запрещает
+        миграции реплик: они копируются с основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        pool = replicas()
+        if not pool or not getattr(_state, 'active', False):
+            return DEFAULT_DB_ALIAS
+        if not _state.pinned and _user_pinned():
+            _state.pinned = True
+        if _state.pinned:
+            return DEFAULT_DB_ALIAS
+        return random.choice(pool)
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, 'active', False):
+            _state.pinned = _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """ Класс ReplicaRoutingMiddleware включает чтение из реплик на время
+    HTTP-запроса и после записи выставляет cookie db_primary_until, а
+    авторизованному пользователю -- ключ dbpin:<id> в общем кэше, чтобы
+    следующие запросы пользователя (в том числе с других устройств и
+    клиентов API без cookie) REPLICA_PIN_SECONDS читали основную базу.
+    Ставится первым в MIDDLEWARE, чтобы охватить и сессии.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+        try:
+            until = float(request.COOKIES.get(PRIMARY_COOKIE, 0))
+        except ValueError:
+            until = 0
+        _state.active, _state.wrote = True, False
+        _state.request, _state.checked_user = request, None
+        _state.pinned = (request.method not in SAFE_METHODS
+                         or until > time.time())
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                seconds = pin_seconds()
+                response.set_cookie(PRIMARY_COOKIE,
+                                    str(int(time.time() + seconds)),
+                                    max_age=seconds, httponly=True,
+                                    samesite='Lax')
+                user = getattr(request, 'user', None)
+                if user is not None and user.is_authenticated:
+                    cache.set(f'{PIN_PREFIX}{user.pk}', 1, seconds)
+            return response
+        finally:
+            _state.active = _state.pinned = _state.wrote = False
+            _state.request = _state.checked_user = None
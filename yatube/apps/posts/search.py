@@ -0,0 +1,118 @@
+import html
+import re
+
+from django.db import connection
+from django.utils.html import strip_tags
+
+from .models import Post
+
+# Виртуальная таблица FTS5 с очищенным текстом постов, rowid = id поста.
+# Создается миграцией 0019_post_search только на SQLite со сборкой FTS5,
+# на остальных СУБД поиск выполняется через icontains
+SEARCH_TABLE = 'posts_post_search'
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_available = set()
+
+
+def search_available():
+    """Проверить, что таблица полнотекстового поиска есть в текущей БД."""
+    key = connection.settings_dict['NAME']
+    if key in _available:
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    if SEARCH_TABLE in connection.introspection.table_names():
+        _available.add(key)
+        return True
+    return False
+
+
+def clean_text(text):
+    """Вернуть текст поста без HTML-разметки Summernote."""
+    return html.unescape(strip_tags(text or '')).strip()
+
+
+def build_match_query(query):
+    """Преобразовать пользовательский запрос в выражение MATCH FTS5.
+
+    Слова запроса берутся в кавычки, поэтому операторы и спецсимволы FTS5
+    во вводе пользователя не интерпретируются; последнее слово ищется по
+    префиксу. Вернуть пустую строку, если в запросе нет слов.
+    """
+    words = _WORD_RE.findall(query or '')
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post_id, text):
+    """Добавить или обновить текст поста в поисковом индексе."""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                       [post_id])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post_id, clean_text(text)])
+
+
+def unindex_post(post_id):
+    """Удалить пост из поискового индекса."""
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                       [post_id])
+
+
+def rebuild_index():
+    """Заново проиндексировать все посты. Вернуть число записей."""
+    if not search_available():
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        posts = Post.objects.order_by('pk').values_list('pk', 'text')
+        batch = []
+        for pk, text in posts.iterator():
+            batch.append((pk, clean_text(text)))
+            if len(batch) >= 500:
+                total += _insert(cursor, batch)
+                batch = []
+        total += _insert(cursor, batch)
+    return total
+
+
+def _insert(cursor, rows):
+    if rows:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text) VALUES (%s, %s)', rows)
+    return len(rows)
+
+
+def search_posts(query, queryset=None):
+    """Вернуть посты, подходящие под запрос, по убыванию релевантности.
+
+    На SQLite поиск идет по индексу FTS5 и упорядочивается по bm25, иначе
+    по вхождению подстроки в текст с сортировкой по дате публикации.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    match = build_match_query(query)
+    if not match:
+        return queryset.none()
+    if not search_available():
+        return queryset.filter(text__icontains=query.strip()).order_by(
+            '-pub_date', '-id')
+    return queryset.extra(
+        tables=[SEARCH_TABLE],
+        where=[f'{SEARCH_TABLE}.rowid = {Post._meta.db_table}.id',
+               f'{SEARCH_TABLE} MATCH %s'],
+        params=[match],
+        select={'search_rank': f'{SEARCH_TABLE}.rank'},
+        order_by=['search_rank', '-id'],
+    )
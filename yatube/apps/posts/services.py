@@ -0,0 +1,138 @@
+from django.db import connections, router
+from django.db.models import AutoField
+
+from . import page_cache, timeline
+from .db import immediate_atomic
+from .counters import adjust_author_stats, adjust_post_counters
+from .models import Follow, Like
+
+
+def insert_ignore(obj):
+    """Вставить объект одним INSERT, пропуская нарушение уникальности.
+
+    На SQLite выполняется INSERT OR IGNORE, на PostgreSQL --
+    INSERT ... ON CONFLICT DO NOTHING, на MySQL -- INSERT IGNORE. Сигналы
+    post_save не отправляются. Вернуть True, если строка добавлена.
+    """
+    model = type(obj)
+    using = router.db_for_write(model, instance=obj)
+    connection = connections[using]
+    ops = connection.ops
+    fields = [field for field in model._meta.concrete_fields
+              if not isinstance(field, AutoField)]
+    values = [field.get_db_prep_save(field.pre_save(obj, True), connection)
+              for field in fields]
+    columns = ', '.join(ops.quote_name(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    sql = (f'{ops.insert_statement(ignore_conflicts=True)} '
+           f'{ops.quote_name(model._meta.db_table)} ({columns}) '
+           f'VALUES ({placeholders}) '
+           f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        return cursor.rowcount == 1
+
+
+def delete_rows(model, **filters):
+    """Удалить строки model одним DELETE по равенству полей filters (имена
+    полей или столбцов, например user_id=1); для списка значений
+    проверяется вхождение (post_id=[1, 2]). Сигналы post_delete не
+    отправляются. Вернуть число удаленных строк.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    ops = connection.ops
+    conditions, values = [], []
+    for name, value in filters.items():
+        column = ops.quote_name(model._meta.get_field(name).column)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = list(value)
+            placeholders = ', '.join(['%s'] * len(value))
+            conditions.append(f'{column} IN ({placeholders})')
+            values.extend(value)
+        else:
+            conditions.append(f'{column} = %s')
+            values.append(value)
+    sql = (f'DELETE FROM {ops.quote_name(model._meta.db_table)} '
+           f'WHERE {" AND ".join(conditions)}')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        return cursor.rowcount
+
+
+def likes_changed(post_ids, delta):
+    """Обновить счетчики лайков постов post_ids на delta и сбросить кэш их
+    страниц. Общие побочные эффекты лайка для сигналов, services и
+    пакетных операций API."""
+    if post_ids:
+        adjust_post_counters(list(post_ids), likes=delta)
+        page_cache.invalidate_posts(post_ids)
+
+
+def follows_changed(user_id, author_ids, delta):
+    """Обновить статистику подписчика user_id и авторов author_ids на
+    delta, сбросить кэш их страниц и заполнить ленту подписчика постами
+    новых авторов или убрать из нее посты бывших. Общие побочные эффекты
+    подписки для сигналов, services и пакетных операций API."""
+    if not author_ids:
+        return
+    author_ids = list(author_ids)
+    adjust_author_stats(author_ids, followers=delta)
+    adjust_author_stats(user_id, following=delta * len(author_ids))
+    page_cache.invalidate_users(*author_ids, user_id)
+    for author_id in author_ids:
+        if delta > 0:
+            timeline.backfill(user_id, author_id)
+        else:
+            timeline.prune(user_id, author_id)
+
+
+def like(user, post_id):
+    """Поставить лайк посту.
+
+    Лайк добавляется одним INSERT без предварительной проверки, поэтому
+    одновременные запросы (двойной щелчок) не создают дубликатов и не
+    падают на ограничении уникальности. Счетчик поста и кэш страниц
+    обновляются, только если лайк действительно добавлен. Вернуть True,
+    если состояние изменилось.
+    """
+    with immediate_atomic(using=router.db_for_write(Like)):
+        changed = insert_ignore(Like(user=user, post_id=post_id))
+        if changed:
+            likes_changed([post_id], 1)
+    return changed
+
+
+def unlike(user, post_id):
+    """Снять лайк с поста одним DELETE. Вернуть True, если лайк был."""
+    with immediate_atomic(using=router.db_for_write(Like)):
+        changed = bool(delete_rows(Like, user_id=user.pk, post_id=post_id))
+        if changed:
+            likes_changed([post_id], -1)
+    return changed
+
+
+def follow(user, author_id):
+    """Подписать пользователя на автора.
+
+    Подписка добавляется одним INSERT без предварительной проверки.
+    Статистика, кэш страниц и лента подписчика обновляются, только если
+    подписка действительно добавлена. Вернуть True, если состояние
+    изменилось. Проверка подписки на самого себя -- на вызывающей стороне.
+    """
+    with immediate_atomic(using=router.db_for_write(Follow)):
+        changed = insert_ignore(Follow(user=user, author_id=author_id))
+        if changed:
+            follows_changed(user.pk, [author_id], 1)
+    return changed
+
+
+def unfollow(user, author_id):
+    """Отписать пользователя от автора одним DELETE. Вернуть True, если
+    подписка была."""
+    with immediate_atomic(using=router.db_for_write(Follow)):
+        changed = bool(delete_rows(Follow, user_id=user.pk,
+                                   author_id=author_id))
+        if changed:
+            follows_changed(user.pk, [author_id], -1)
+    return changed
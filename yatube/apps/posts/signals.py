@@ -0,0 +1,127 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import page_cache, search, services, timeline
+from .background import run_in_background
+from .counters import (adjust_author_stats, adjust_post_counters,
+                       bump_post_versions)
+from .models import AuthorStats, Comment, Follow, Group, Like, Post, User
+from .thumbnails import generate_post_thumbnails
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    """Увеличить счетчик комментариев поста при создании комментария и
+    сбросить кэш страниц поста при любом изменении комментария."""
+    if created:
+        adjust_post_counters(instance.post_id, comments=1)
+    page_cache.invalidate_post(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Уменьшить счетчик комментариев поста при удалении комментария."""
+    adjust_post_counters(instance.post_id, comments=-1)
+    page_cache.invalidate_post(instance.post_id)
+
+
+@receiver(post_save, sender=Like)
+def like_created(sender, instance, created, **kwargs):
+    """Увеличить счетчик лайков поста при создании лайка."""
+    if created:
+        services.likes_changed([instance.post_id], 1)
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    """Уменьшить счетчик лайков поста при удалении лайка."""
+    services.likes_changed([instance.post_id], -1)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    """Запомнить сообщество, изображение и текст редактируемого поста до
+    сохранения."""
+    if not instance._state.adding:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group__slug', 'image', 'text').first()
+        if previous is not None:
+            (instance._previous_group_slug,
+             instance._previous_image,
+             instance._previous_text) = previous
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """Сбросить кэш страниц поста, обновить поисковый индекс, запустить
+    генерацию миниатюр нового изображения и разослать новый пост в ленты
+    подписчиков.
+
+    Первая пачка записывается сразу, остальные -- в фоне, чтобы публикация
+    у автора с большим числом подписчиков не блокировала запрос.
+    """
+    page_cache.invalidate_post(instance.pk)
+    previous_group = getattr(instance, '_previous_group_slug', None)
+    if previous_group:
+        page_cache.invalidate(page_cache.group_scope(previous_group))
+    if created or instance.text != getattr(instance, '_previous_text', None):
+        search.index_post(instance.pk, instance.text)
+    if instance.image and instance.image.name != getattr(
+            instance, '_previous_image', None):
+        run_in_background(generate_post_thumbnails, instance.pk)
+    if created:
+        adjust_author_stats(instance.author_id, posts=1)
+        rest = timeline.fan_out_post(instance.pk, max_batches=1)
+        if rest is not None:
+            run_in_background(timeline.fan_out_post, instance.pk, rest)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Обновить статистику и заполнить ленту подписчика последними постами
+    автора."""
+    if created:
+        services.follows_changed(instance.user_id, [instance.author_id], 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Обновить статистику и убрать посты автора из ленты бывшего
+    подписчика."""
+    services.follows_changed(instance.user_id, [instance.author_id], -1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """Уменьшить число записей в статистике автора, удалить пост из
+    поискового индекса и сбросить кэш страниц, на которых выводился пост."""
+    adjust_author_stats(instance.author_id, posts=-1)
+    search.unindex_post(instance.pk)
+    group_slug = instance.group.slug if instance.group_id else None
+    page_cache.invalidate(*page_cache.post_scopes(
+        instance.pk, instance.author.username, group_slug))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Создать пустую статистику для нового пользователя и сбросить кэш
+    профиля при изменении данных пользователя."""
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+    elif update_fields is None or set(update_fields) != {'last_login'}:
+        page_cache.invalidate(page_cache.user_scope(instance.username))
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, **kwargs):
+    """Увеличить версию постов сообщества, карточки которых выводят его
+    название, и сбросить кэш страниц."""
+    if not created:
+        bump_post_versions(group=instance)
+    page_cache.invalidate('groups')
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    """Сбросить кэш страниц, выводивших удаленное сообщество."""
+    page_cache.invalidate('groups')
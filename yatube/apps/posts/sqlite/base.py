@@ -0,0 +1,48 @@
+from django.db.backends.sqlite3 import base
+
+# Параметры OPTIONS этого бэкенда; остальные передаются в sqlite3.connect
+PROFILE_OPTIONS = ('pragmas', 'immediate_writes')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """ Класс DatabaseWrapper -- бэкенд SQLite с профилем для продакшена
+    (ENGINE 'apps.posts.sqlite').
+
+    Родительский класс -- django.db.backends.sqlite3.base.DatabaseWrapper.
+
+    Параметры OPTIONS
+    --------
+    pragmas : dict
+        прагмы, выполняемые при открытии каждого соединения (journal_mode,
+        synchronous, mmap_size, cache_size, busy_timeout, temp_store)
+    immediate_writes : bool
+        начинать транзакции apps.posts.db.immediate_atomic командой BEGIN
+        IMMEDIATE.
+
+    Атрибуты класса
+    --------
+    begin_immediate : bool
+        следующая транзакция начнется с BEGIN IMMEDIATE; устанавливается
+        immediate_atomic на время входа в transaction.atomic.
+    """
+
+    begin_immediate = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in PROFILE_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.begin_immediate:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,62 @@
+// Лайки и подписки без перезагрузки страницы: ссылка с атрибутом
+// data-switch отправляет POST на data-switch-url и обновляет кнопку и
+// счетчик по ответу. Токен CSRF берется из мета-тега base.html. Если
+// запрос не удался (например, пользователь не авторизован), выполняется
+// обычный переход по ссылке, а если кнопка уже переключалась на месте --
+// перезагрузка страницы.
+(function ($) {
+    function byId(id) {
+        return $(document.getElementById(id));
+    }
+
+    function setActive(link, active) {
+        link.attr('data-active', active ? '1' : '0');
+        link.data('switched', true);
+    }
+
+    var handlers = {
+        like: function (link, data) {
+            setActive(link, data.liked);
+            link.find('img').attr({
+                src: link.attr(data.liked ? 'data-icon-on' : 'data-icon-off'),
+                alt: data.liked ? 'liked' : 'like'
+            });
+            byId('likes_count_' + data.post).text('(' + data.likes_count + ')');
+        },
+        follow: function (link, data) {
+            setActive(link, data.following);
+            link.toggleClass('btn-light', data.following)
+                .toggleClass('btn-primary', !data.following)
+                .text(data.following ? 'Отписаться' : 'Подписаться');
+            byId('followers_count_' + data.author).text(data.followers_count);
+        }
+    };
+
+    $(document).on('click', 'a[data-switch]', function (event) {
+        var link = $(this);
+        var handler = handlers[link.attr('data-switch')];
+        if (!handler || link.data('busy')) {
+            return;
+        }
+        event.preventDefault();
+        link.data('busy', true);
+        $.ajax({
+            url: link.attr('data-switch-url'),
+            method: 'POST',
+            data: {active: link.attr('data-active') === '1' ? '0' : '1'},
+            headers: {'X-CSRFToken': $('meta[name=csrf-token]').attr('content')},
+            dataType: 'json'
+        }).done(function (data) {
+            handler(link, data);
+        }).fail(function () {
+            // после переключения на месте ссылка ведет к прежнему действию
+            if (link.data('switched')) {
+                window.location.reload();
+            } else {
+                window.location = link.attr('href');
+            }
+        }).always(function () {
+            link.data('busy', false);
+        });
+    });
+})(jQuery);
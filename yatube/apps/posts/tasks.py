@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Базовая задержка перед повтором и её верхняя граница, секунд
+RETRY_BASE_DELAY = getattr(settings, 'TASKS_RETRY_BASE_DELAY', 5)
+RETRY_MAX_DELAY = getattr(settings, 'TASKS_RETRY_MAX_DELAY', 60 * 60)
+# Задача в состоянии running дольше этого времени считается брошенной
+# упавшим обработчиком и снова выдаётся в работу
+VISIBILITY_TIMEOUT = getattr(settings, 'TASKS_VISIBILITY_TIMEOUT', 10 * 60)
+MAX_ATTEMPTS = getattr(settings, 'TASKS_MAX_ATTEMPTS', 5)
+
+
+def task_name(func):
+    """Вернуть импортируемый путь к функции задачи."""
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, run_at=None, max_attempts=None, **kwargs):
+    """Поставить вызов func(*args, **kwargs) в очередь.
+
+    Запись создаётся в текущей транзакции, поэтому задача станет видна
+    обработчикам только вместе с изменениями, которые её породили.
+    Аргументы должны сериализоваться в JSON.
+    """
+    return Task.objects.create(
+        name=task_name(func),
+        args=json.dumps({'args': args, 'kwargs': kwargs}),
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or MAX_ATTEMPTS,
+    )
+
+
+def worker_id():
+    """Вернуть идентификатор текущего обработчика."""
+    return (f'{socket.gethostname()}:{os.getpid()}:'
+            f'{threading.current_thread().name}')[:100]
+
+
+def claim(worker=None):
+    """Взять в работу первую доступную задачу и вернуть её.
+
+    Задача захватывается условным UPDATE по прежнему состоянию, поэтому
+    конкурирующие обработчики не получат одну и ту же задачу. Брошенная
+    задача (running дольше VISIBILITY_TIMEOUT) выдаётся снова, только если
+    попытки не исчерпаны, иначе получает состояние failed. Вернуть None,
+    если очередь пуста.
+    """
+    worker = worker or worker_id()
+    now = timezone.now()
+    abandoned = Q(status=Task.RUNNING,
+                  started__lt=now - timedelta(seconds=VISIBILITY_TIMEOUT))
+    _fail_exhausted(abandoned, now)
+    available = (
+        Q(status=Task.PENDING, run_at__lte=now)
+        | abandoned & Q(attempts__lt=F('max_attempts'))
+    )
+    candidates = (Task.objects.filter(available)
+                  .order_by('run_at', 'id')
+                  .values_list('pk', 'status', 'attempts')[:10])
+    for pk, status, attempts in candidates:
+        claimed = Task.objects.filter(
+            pk=pk, status=status, attempts=attempts
+        ).update(status=Task.RUNNING, worker=worker, started=now,
+                 attempts=F('attempts') + 1)
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def _fail_exhausted(abandoned, now):
+    """Перевести брошенные задачи с исчерпанными попытками в состояние
+    failed. Запись выполняется, только если такие задачи есть."""
+    exhausted = Task.objects.filter(abandoned,
+                                    attempts__gte=F('max_attempts'))
+    if exhausted.exists():
+        exhausted.update(status=Task.FAILED, finished=now,
+                         last_error='Обработчик не завершил задачу за '
+                                    f'{VISIBILITY_TIMEOUT} с')
+
+
+def ack(task):
+    """Отметить задачу выполненной."""
+    Task.objects.filter(pk=task.pk).update(
+        status=Task.DONE, finished=timezone.now(), last_error='')
+
+
+def retry_delay(attempts):
+    """Вернуть задержку перед следующей попыткой, экспоненциальную по
+    числу уже выполненных попыток."""
+    return min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0),
+               RETRY_MAX_DELAY)
+
+
+def fail(task, error):
+    """Зафиксировать ошибку задачи.
+
+    Пока попытки не исчерпаны, задача возвращается в очередь с
+    экспоненциальной задержкой, иначе получает состояние failed.
+    """
+    now = timezone.now()
+    if task.attempts >= task.max_attempts:
+        changes = {'status': Task.FAILED, 'finished': now}
+    else:
+        changes = {'status': Task.PENDING,
+                   'run_at': now + timedelta(
+                       seconds=retry_delay(task.attempts))}
+    Task.objects.filter(pk=task.pk).update(last_error=error, **changes)
+
+
+def execute(task):
+    """Выполнить задачу и подтвердить её либо зафиксировать ошибку.
+
+    Вернуть True, если задача выполнена успешно.
+    """
+    try:
+        func = import_string(task.name)
+        payload = json.loads(task.args)
+        func(*payload.get('args', ()), **payload.get('kwargs', {}))
+    except Exception:
+        logger.exception('Фоновая задача %s (%s) завершилась с ошибкой',
+                         task.pk, task.name)
+        fail(task, traceback.format_exc())
+        return False
+    ack(task)
+    return True
+
+
+def run_next(worker=None):
+    """Взять и выполнить одну задачу. Вернуть False, если очередь пуста."""
+    task = claim(worker)
+    if task is None:
+        return False
+    execute(task)
+    return True
+
+
+def purge(older_than):
+    """Удалить выполненные задачи, завершённые раньше older_than секунд
+    назад. Вернуть число удалённых задач."""
+    border = timezone.now() - timedelta(seconds=older_than)
+    deleted, _ = Task.objects.filter(status=Task.DONE,
+                                     finished__lt=border).delete()
+    return deleted
+
+
+def _duration(end, start):
+    return ExpressionWrapper(F(end) - F(start), output_field=DurationField())
+
+
+def queue_stats(window=60 * 60):
+    """Вернуть метрики очереди.
+
+    Глубина очереди считается по состояниям задач, задержка ожидания
+    (от постановки до начала) и время выполнения усредняются по задачам,
+    завершённым за последние window секунд, в разрезе имён задач.
+    """
+    depth = dict.fromkeys((status for status, _ in Task.STATUS_CHOICES), 0)
+    depth.update(Task.objects.values_list('status')
+                 .annotate(total=Count('pk')).order_by())
+    border = timezone.now() - timedelta(seconds=window)
+    latency = (Task.objects
+               .filter(status=Task.DONE, finished__gte=border)
+               .values('name')
+               .annotate(total=Count('pk'),
+                         wait=Avg(_duration('started', 'created')),
+                         run=Avg(_duration('finished', 'started')))
+               .order_by('name'))
+    return {'depth': depth, 'latency': list(latency)}
@@ -3,6 +3,7 @@ import io
 import tempfile
 
 from PIL import Image
+from django.core.cache import cache
 from django.core.files import File
 from django.test import TestCase, Client
 from django.test import override_settings
@@ -35,6 +36,7 @@ class TestingStand(TestCase):
     Методы класса
     --------
     setUpClass() -- создает фикстуру с тестовой БД и клиентами.
+    setUp() -- очищает кэш перед каждым тестом.
     """
 
     @classmethod
@@ -113,3 +115,9 @@ class TestingStand(TestCase):
         # Авторизуем пользователей
         cls.authorized_client.force_login(cls.user1)
         cls.authorized_client_alter.force_login(cls.user2)
+
+    def setUp(self):
+        """Очистить кэш, чтобы закэшированные страницы не переходили между
+        тестами. Кэш тестов -- временный файл (см. TEST_RUNNER), кэш сайта
+        не затрагивается."""
+        cache.clear()
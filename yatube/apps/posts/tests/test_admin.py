@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .fixtures import TestingStand
+from ..models import Comment, Follow, Post
+from ..pagination import EstimatedCountPaginator, estimate_table_rows
+
+User = get_user_model()
+
+
+class AdminChangeListTest(TestingStand):
+    """ Класс AdminChangeListTest используется для тестирования списков
+    записей в админ-панели.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    setUpClass() -- создает суперпользователя и записи.
+    test_queries_do_not_grow_with_rows() -- проверяет, что число запросов
+        списка не зависит от числа строк.
+    test_search_by_username() -- проверяет поиск комментариев и подписок по
+        имени пользователя.
+    test_post_search_uses_index() -- проверяет поиск постов.
+    test_estimated_count() -- проверяет оценку числа записей.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        for number in range(5):
+            author = User.objects.create(username=f'admin_test_{number}')
+            post = Post.objects.create(text=f'Пост {number}', author=author,
+                                       group=cls.group1)
+            Comment.objects.create(post=post, author=author, text='Текст')
+            Follow.objects.create(user=author, author=cls.user1)
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(AdminChangeListTest.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Проверить отсутствие запроса на каждую строку списка."""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                url = f'/admin/posts/{model}/'
+                before = self.count_queries(url)
+                author = User.objects.create(username=f'extra_{model}')
+                post = Post.objects.create(text='Еще', author=author,
+                                           group=self.group2)
+                Comment.objects.create(post=post, author=author, text='Еще')
+                Follow.objects.create(user=author, author=self.user2)
+                self.assertEqual(self.count_queries(url), before)
+
+    def test_search_by_username(self):
+        """Проверить поиск по точному имени пользователя."""
+        response = self.client.get('/admin/posts/comment/',
+                                   {'q': 'admin_test_1'})
+        self.assertEqual(
+            [comment.author.username
+             for comment in response.context['cl'].result_list],
+            ['admin_test_1'])
+        # пять подписок на test_user_1 и одна его подписка из TestingStand
+        response = self.client.get('/admin/posts/follow/',
+                                   {'q': self.user1.username})
+        self.assertEqual(response.context['cl'].result_count, 6)
+
+    def test_post_search_uses_index(self):
+        """Проверить поиск постов по полнотекстовому индексу."""
+        response = self.client.get('/admin/posts/post/', {'q': 'пост 3'})
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Пост 3'])
+
+    def test_estimated_count(self):
+        """Проверить оценку и предел подсчета записей."""
+        total = Post.objects.count()
+        self.assertGreaterEqual(estimate_table_rows(Post), total)
+        paginator = EstimatedCountPaginator(Post.objects.order_by('pk'), 2)
+        paginator.exact_count_limit = 3
+        self.assertEqual(paginator.count, estimate_table_rows(Post))
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group1).order_by('pk'), 2)
+        paginator.exact_count_limit = 3
+        self.assertEqual(paginator.count, 3)
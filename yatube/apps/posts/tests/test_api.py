@@ -0,0 +1,423 @@
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+import msgpack
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .fixtures import TestingStand
+from ..models import (AuthorStats, Comment, Follow, Like, Post, TimelineEntry,
+                      User)
+from ..post_api import bulk
+from ..post_api.renderers import ORJSONParser, ORJSONRenderer
+from ..post_api.serializers import CommentSerializer, PostSerializer
+from ..post_api.pagination import KeysetCursorPagination
+
+
+class PostsAPIPaginationTests(TestingStand):
+    """ Класс PostsAPIPaginationTests используется для тестирования курсорной
+    пагинации API.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    setUpClass() -- добавляет посты и создает API-клиента.
+    test_posts_are_paginated() -- проверяет, что список постов разбит на
+        страницы и переходы по ссылкам next/previous.
+    test_page_size_is_limited() -- проверяет ограничение размера страницы.
+    test_new_posts_do_not_duplicate() -- проверяет, что новые посты не
+        приводят к дубликатам при продолжении обхода.
+    test_follow_list_is_paginated() -- проверяет пагинацию списка подписок.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Добавить 25 постов, всего в базе 27 записей."""
+        super().setUpClass()
+        for number in range(25):
+            Post.objects.create(text=f'Пост {number}', author=cls.user1)
+        cls.api_client = APIClient()
+
+    def get_ids(self, response):
+        return [item['id'] for item in response.data['results']]
+
+    def test_posts_are_paginated(self):
+        """Проверить переходы по ссылкам next и previous."""
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        response = self.api_client.get('/api/v1/posts/')
+        self.assertEqual(self.get_ids(response), expected[:20])
+        self.assertIsNone(response.data['previous'])
+        response = self.api_client.get(response.data['next'])
+        self.assertEqual(self.get_ids(response), expected[20:])
+        self.assertIsNone(response.data['next'])
+        response = self.api_client.get(response.data['previous'])
+        self.assertEqual(self.get_ids(response), expected[:20])
+
+    def test_page_size_is_limited(self):
+        """Проверить, что page_size не превышает max_page_size."""
+        response = self.api_client.get('/api/v1/posts/', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        max_page_size = KeysetCursorPagination.max_page_size
+        response = self.api_client.get('/api/v1/posts/',
+                                       {'page_size': max_page_size + 1})
+        self.assertLessEqual(len(response.data['results']), max_page_size)
+
+    def test_new_posts_do_not_duplicate(self):
+        """Проверить, что продолжение обхода после новых постов не дает
+        дубликатов."""
+        response = self.api_client.get('/api/v1/posts/', {'page_size': 10})
+        seen = self.get_ids(response)
+        Post.objects.create(text='Свежий пост', author=self.user2)
+        while response.data['next']:
+            response = self.api_client.get(response.data['next'])
+            seen += self.get_ids(response)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), Post.objects.count() - 1)
+
+    def test_follow_list_is_paginated(self):
+        """Проверить, что список подписок возвращается постранично."""
+        api_client = APIClient()
+        api_client.force_authenticate(self.user1)
+        response = api_client.get('/api/v1/follow/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['following'] for item in
+                          response.data['results']], [self.user2.username])
+
+
+class BulkAPITests(TestingStand):
+    """ Класс BulkAPITests используется для тестирования пакетных операций
+    API.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    setUp() -- создает авторизованного API-клиента.
+    test_bulk_posts() -- проверяет пакетное создание и удаление постов.
+    test_bulk_likes() -- проверяет пакетные лайки, счетчики и результаты
+        по элементам.
+    test_bulk_follows() -- проверяет пакетные подписки, статистику и ленту.
+    test_bulk_post_save_error() -- проверяет, что ошибка сохранения
+        одного поста не отменяет пакет.
+    test_batch_is_validated() -- проверяет ограничения пакета.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(self.user1)
+
+    def send(self, method, url, items):
+        return getattr(self.api_client, method)(url, items, format='json')
+
+    def statuses(self, response):
+        return [result['status'] for result in response.data['results']]
+
+    def test_bulk_posts(self):
+        """Проверить создание и удаление постов пакетом."""
+        response = self.send('post', '/api/v1/posts/bulk/', [
+            {'text': 'Первый', 'group': self.group1.pk},
+            {'text': ''},
+            {'text': 'Второй'},
+        ])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [201, 400, 201])
+        created = [result['data']['id'] for result in response.data['results']
+                   if result['status'] == 201]
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=created).values_list(
+                'author', flat=True)), [self.user1.pk] * 2)
+        response = self.send('delete', '/api/v1/posts/bulk/', [
+            {'id': created[0]}, {'id': self.post2.pk}, {'id': 'x'},
+            {'id': created[0]}])
+        self.assertEqual(self.statuses(response), [204, 403, 400, 404])
+        self.assertFalse(Post.objects.filter(pk=created[0]).exists())
+        self.assertTrue(Post.objects.filter(pk=self.post2.pk).exists())
+
+    def test_bulk_likes(self):
+        """Проверить лайки пакетом."""
+        Like.objects.create(user=self.user1, post=self.post1)
+        response = self.send('post', '/api/v1/likes/bulk/', [
+            {'post': self.post2.pk}, {'post': self.post1.pk},
+            {'post': self.post2.pk}, {'post': 0}])
+        self.assertEqual(self.statuses(response), [201, 409, 409, 404])
+        self.post2.refresh_from_db()
+        self.assertEqual(self.post2.likes_count, 1)
+        self.assertTrue(Like.objects.filter(user=self.user1,
+                                            post=self.post2).exists())
+        response = self.send('delete', '/api/v1/likes/bulk/', [
+            {'post': self.post1.pk}, {'post': self.post2.pk}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['succeeded'], 2)
+        self.assertFalse(Like.objects.filter(user=self.user1).exists())
+        self.post1.refresh_from_db()
+        self.post2.refresh_from_db()
+        self.assertEqual((self.post1.likes_count, self.post2.likes_count),
+                         (1, 0))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_bulk_follows(self):
+        """Проверить подписки пакетом."""
+        author = User.objects.create(username='bulk_author')
+        Post.objects.create(text='Пост автора', author=author)
+        response = self.send('post', '/api/v1/follow/bulk/', [
+            {'following': author.username},
+            {'following': self.user2.username},
+            {'following': self.user1.username},
+            {'following': 'nobody'}, {}])
+        self.assertEqual(self.statuses(response), [201, 409, 400, 404, 400])
+        self.assertTrue(Follow.objects.filter(user=self.user1,
+                                              author=author).exists())
+        self.assertEqual(AuthorStats.objects.get(pk=author.pk)
+                         .followers_count, 1)
+        self.assertEqual(AuthorStats.objects.get(pk=self.user1.pk)
+                         .following_count, 2)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user1, post__author=author).exists())
+        response = self.send('delete', '/api/v1/follow/bulk/', [
+            {'following': author.username}])
+        self.assertEqual(self.statuses(response), [204])
+        self.assertEqual(AuthorStats.objects.get(pk=self.user1.pk)
+                         .following_count, 1)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.user1, post__author=author).exists())
+
+    def test_bulk_post_save_error(self):
+        """Проверить, что ошибка сохранения одного поста не отменяет
+        остальные."""
+        save = PostSerializer.save
+
+        def failing_save(serializer, **kwargs):
+            if serializer.validated_data['text'] == 'Сбой':
+                raise OSError('диск заполнен')
+            return save(serializer, **kwargs)
+
+        with mock.patch.object(PostSerializer, 'save', failing_save), \
+                self.assertLogs('apps.posts.post_api.bulk', 'ERROR'):
+            response = self.send('post', '/api/v1/posts/bulk/', [
+                {'text': 'Сбой'}, {'text': 'Сохранится'}])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [500, 201])
+        self.assertFalse(Post.objects.filter(text='Сбой').exists())
+        self.assertTrue(Post.objects.filter(text='Сохранится').exists())
+
+    def test_batch_is_validated(self):
+        """Проверить отказ для пустого, слишком большого пакета и гостя."""
+        url = '/api/v1/likes/bulk/'
+        self.assertEqual(self.send('post', url, {}).status_code, 400)
+        self.assertEqual(self.send('post', url, []).status_code, 400)
+        items = [{'post': self.post1.pk}] * (bulk.BULK_MAX_ITEMS + 1)
+        self.assertEqual(self.send('post', url, items).status_code, 400)
+        response = APIClient().post(url, [{'post': self.post1.pk}],
+                                    format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class FieldsAndExpandAPITests(TestingStand):
+    """ Класс FieldsAndExpandAPITests используется для тестирования
+    параметров запроса fields и expand.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_fields_trim_output() -- проверяет отбор полей.
+    test_expand_related_objects() -- проверяет раскрытие связанных объектов.
+    test_expand_uses_batched_queries() -- проверяет, что число запросов не
+        зависит от числа объектов.
+    test_parameters_ignored_on_write() -- проверяет, что при создании
+        параметры не влияют на проверку данных.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.api_client = APIClient()
+
+    def get_posts(self, **params):
+        return self.api_client.get('/api/v1/posts/', params).data['results']
+
+    def test_fields_trim_output(self):
+        """Проверить, что fields оставляет только перечисленные поля."""
+        for item in self.get_posts(fields='id,pub_date,unknown'):
+            self.assertEqual(set(item), {'id', 'pub_date'})
+        response = self.api_client.get(
+            f'/api/v1/posts/{self.post1.pk}/comments/', {'fields': 'text'})
+        self.assertEqual(response.data['results'],
+                         [{'text': self.comment1.text}])
+
+    def test_expand_related_objects(self):
+        """Проверить раскрытие сообщества, автора и статистики."""
+        posts = {item['id']: item for item in self.get_posts(
+            fields='id', expand='group,author,stats')}
+        post = posts[self.post1.pk]
+        self.assertEqual(post['group'], {'id': self.group1.pk,
+                                         'title': self.group1.title,
+                                         'slug': self.group1.slug})
+        self.assertEqual(post['author']['username'], self.user1.username)
+        self.assertEqual(post['stats'], {'posts_count': 1,
+                                         'followers_count': 0,
+                                         'following_count': 1})
+        plain = {item['id']: item for item in self.get_posts()}
+        self.assertEqual(plain[self.post1.pk]['author'], self.user1.username)
+        self.assertNotIn('stats', plain[self.post1.pk])
+
+    def test_expand_uses_batched_queries(self):
+        """Проверить отсутствие запросов на каждый объект."""
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.get_posts(fields='id', expand='group,author,stats')
+            return len(queries)
+
+        before = count_queries()
+        for number in range(3):
+            author = User.objects.create(username=f'expand_{number}')
+            Post.objects.create(text='Пост', author=author,
+                                group=self.group2)
+        self.assertEqual(count_queries(), before)
+
+    def test_parameters_ignored_on_write(self):
+        """Проверить создание комментария с параметром fields."""
+        self.api_client.force_authenticate(self.user2)
+        response = self.api_client.post(
+            f'/api/v1/posts/{self.post1.pk}/comments/?fields=id',
+            {'text': 'Новый', 'post': self.post1.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Comment.objects.filter(text='Новый').exists())
+
+
+class ConditionalGetAPITests(TestingStand):
+    """ Класс ConditionalGetAPITests используется для тестирования условных
+    запросов к API.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_lists_answer_not_modified() -- проверяет ответ 304 для списков
+        постов, сообществ и комментариев.
+    test_changes_produce_new_etag() -- проверяет смену ETag при изменении.
+    test_expanded_authors_not_conditional() -- проверяет отсутствие
+        валидаторов при раскрытии авторов.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.api_client = APIClient()
+
+    def urls(self):
+        return ['/api/v1/posts/', '/api/v1/group/',
+                f'/api/v1/posts/{self.post1.pk}/',
+                f'/api/v1/posts/{self.post1.pk}/comments/']
+
+    def test_lists_answer_not_modified(self):
+        """Проверить 304 без выполнения выборки."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.api_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.api_client.get(url,
+                                                   HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_produce_new_etag(self):
+        """Проверить, что комментарий и новое сообщество меняют ETag."""
+        etags = {url: self.api_client.get(url)['ETag'] for url in self.urls()}
+        Comment.objects.create(post=self.post1, author=self.user2,
+                               text='Еще комментарий')
+        self.group1.title = 'Новое название'
+        self.group1.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_expanded_authors_not_conditional(self):
+        """Проверить, что ответ с раскрытыми автором или статистикой не
+        получает ETag, а раскрытие сообщества -- получает."""
+        for url in ('/api/v1/posts/?expand=author',
+                    f'/api/v1/posts/{self.post1.pk}/?expand=stats'):
+            with self.subTest(url=url):
+                response = self.api_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('ETag'))
+        response = self.api_client.get('/api/v1/posts/?expand=group')
+        self.assertTrue(response.has_header('ETag'))
+
+
+class RenderersAPITests(TestingStand):
+    """ Класс RenderersAPITests используется для тестирования быстрых
+    рендереров, парсера и сериализаторов API.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_orjson_matches_json_renderer() -- проверяет совпадение вывода с
+        JSONRenderer DRF.
+    test_orjson_parser() -- проверяет разбор тела запроса.
+    test_fast_serializer_matches_drf() -- проверяет совпадение быстрого
+        вывода сериализаторов со штатным.
+    test_msgpack_renderer() -- проверяет выбор MessagePack по Accept.
+    test_benchmark_command() -- проверяет команду сравнения скорости.
+    """
+
+    def test_orjson_matches_json_renderer(self):
+        """Проверить, что вывод совпадает с JSONRenderer побайтно."""
+        data = {'text': 'Юникод \u2028 строка', 'number': 1.5,
+                'decimal': Decimal('2.50'), 'items': [1, None, True],
+                3: 'числовой ключ'}
+        self.assertEqual(ORJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+        indented = ORJSONRenderer().render(
+            data, 'application/json; indent=2')
+        self.assertEqual(json.loads(indented)['number'], 1.5)
+
+    def test_orjson_parser(self):
+        """Проверить разбор JSON и ошибку на некорректном теле."""
+        parser = ORJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"a": "б"}'.encode())),
+                         {'a': 'б'})
+        with self.assertRaises(Exception):
+            parser.parse(io.BytesIO(b'{'))
+        client = APIClient()
+        client.force_authenticate(self.user1)
+        response = client.post('/api/v1/posts/', b'{',
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_fast_serializer_matches_drf(self):
+        """Проверить совпадение быстрого и штатного вывода."""
+        cases = [(PostSerializer, Post.objects.all()),
+                 (CommentSerializer, Comment.objects.all())]
+        for serializer_class, queryset in cases:
+            standard = type('Standard', (serializer_class,),
+                            {'fast_representation': False})
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertEqual(
+                    json.loads(JSONRenderer().render(
+                        serializer_class(queryset, many=True).data)),
+                    json.loads(JSONRenderer().render(
+                        standard(queryset, many=True).data)))
+
+    def test_msgpack_renderer(self):
+        """Проверить ответ в формате MessagePack."""
+        response = APIClient().get('/api/v1/group/',
+                                   HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(len(data['results']), 2)
+
+    def test_benchmark_command(self):
+        """Проверить, что команда сравнения выполняется."""
+        output = io.StringIO()
+        call_command('benchmark_api_renderers', items=10, repeat=1,
+                     stdout=output)
+        self.assertIn('ORJSONRenderer', output.getvalue())
@@ -0,0 +1,154 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from ..cache_backend import SQLiteCache
+
+
+def _increment(location, count):
+    cache = SQLiteCache(location, {})
+    for _ in range(count):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    """ Класс SQLiteCacheTest используется для тестирования бэкенда кэша в
+    файле SQLite.
+
+    Родительский класс -- SimpleTestCase.
+
+    Методы класса
+    --------
+    test_set_get_delete() -- проверяет основные операции.
+    test_expiration() -- проверяет истечение срока и таймаут 0.
+    test_add() -- проверяет, что add не перезаписывает живую запись.
+    test_many() -- проверяет get_many, set_many и delete_many.
+    test_incr() -- проверяет incr и decr для целых и дробных значений.
+    test_incr_across_processes() -- проверяет атомарность incr в
+        нескольких процессах.
+    test_shared_between_instances() -- проверяет общий файл у разных
+        экземпляров.
+    test_lru_eviction() -- проверяет вытеснение давно не читавшихся записей.
+    test_benchmark_command() -- проверяет вывод команды benchmark_cache.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.db')
+        self.cache = self.create()
+
+    def create(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        """Проверить запись, чтение, наличие и удаление ключей."""
+        cache = self.cache
+        cache.set('page', {'html': '<p>Пост</p>', 'version': 1})
+        self.assertEqual(cache.get('page'),
+                         {'html': '<p>Пост</p>', 'version': 1})
+        self.assertTrue(cache.has_key('page'))
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(cache.get('missing', 'default'), 'default')
+        self.assertTrue(cache.delete('page'))
+        self.assertFalse(cache.delete('page'))
+        self.assertFalse(cache.has_key('page'))
+
+    def test_expiration(self):
+        """Проверить, что истекшие записи не читаются, а таймаут 0 не
+        сохраняет запись."""
+        cache = self.cache
+        cache.set('short', 1, timeout=0.05)
+        cache.set('zero', 1, timeout=0)
+        cache.set('forever', 1, timeout=None)
+        self.assertIsNone(cache.get('zero'))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('short'))
+        self.assertFalse(cache.touch('short'))
+        self.assertEqual(cache.get('forever'), 1)
+        self.assertTrue(cache.touch('forever', timeout=60))
+
+    def test_add(self):
+        """Проверить, что add записывает только отсутствующий ключ."""
+        cache = self.cache
+        self.assertTrue(cache.add('key', 'first'))
+        self.assertFalse(cache.add('key', 'second'))
+        self.assertEqual(cache.get('key'), 'first')
+        cache.set('expired', 'old', timeout=0.05)
+        time.sleep(0.1)
+        self.assertTrue(cache.add('expired', 'new'))
+        self.assertEqual(cache.get('expired'), 'new')
+
+    def test_many(self):
+        """Проверить пакетные операции, в том числе больше одной пачки."""
+        cache = self.cache
+        data = {f'key{number}': number for number in range(1200)}
+        self.assertEqual(cache.set_many(data), [])
+        self.assertEqual(cache.get_many([*data, 'missing']), data)
+        cache.delete_many(list(data)[:1000])
+        self.assertEqual(len(cache.get_many(data)), 200)
+
+    def test_incr(self):
+        """Проверить incr и decr для целых и дробных значений."""
+        cache = self.cache
+        cache.set('count', 10)
+        self.assertEqual(cache.incr('count'), 11)
+        self.assertEqual(cache.decr('count', 5), 6)
+        self.assertEqual(cache.get('count'), 6)
+        cache.set('ratio', 0.5)
+        self.assertEqual(cache.incr('ratio'), 1.5)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+
+    def test_incr_across_processes(self):
+        """Проверить, что приращения из разных процессов не теряются."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_increment,
+                                   args=(self.location, 200))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        self.assertEqual(self.cache.get('counter'), 800)
+
+    def test_shared_between_instances(self):
+        """Проверить, что экземпляры с одним файлом видят записи друг
+        друга."""
+        other = self.create()
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        other.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_lru_eviction(self):
+        """Проверить, что при переполнении вытесняются записи, к которым
+        дольше всего не обращались."""
+        cache = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 4,
+            'ACCESS_RESOLUTION': 0, 'CULL_CHECK_INTERVAL': 1}})
+        for number in range(4):
+            cache.set(f'key{number}', number)
+            time.sleep(0.01)
+        cache.get('key0')
+        cache.set('key4', 4)
+        self.assertEqual(sorted(cache.get_many(
+            [f'key{number}' for number in range(5)])),
+            ['key0', 'key2', 'key3', 'key4'])
+
+    def test_benchmark_command(self):
+        """Проверить, что команда сравнивает все бэкенды."""
+        out = io.StringIO()
+        call_command('benchmark_cache', operations=20, processes=2,
+                     stdout=out)
+        output = out.getvalue()
+        for name in ('LocMemCache', 'FileBasedCache', 'SQLiteCache'):
+            self.assertIn(name, output)
+        self.assertIn('incr из всех процессов: 40 из 40', output)
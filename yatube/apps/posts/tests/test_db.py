@@ -0,0 +1,101 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..db import immediate_atomic
+from ..models import Group
+
+
+class SQLiteProfileTest(TransactionTestCase):
+    """ Класс SQLiteProfileTest используется для тестирования профиля SQLite:
+    прагм соединения и транзакций BEGIN IMMEDIATE.
+
+    Родительский класс -- TransactionTestCase.
+
+    Методы класса
+    --------
+    test_pragmas_applied() -- проверяет прагмы нового соединения.
+    test_immediate_atomic() -- проверяет начало транзакции с BEGIN IMMEDIATE.
+    test_immediate_atomic_nested_and_disabled() -- проверяет вложенный блок
+        и отключение параметром immediate_writes.
+    test_write_view_transaction() -- проверяет транзакцию изменяющего
+        запроса представления.
+    test_benchmark_command() -- проверяет вывод команды benchmark_db.
+    """
+
+    def test_pragmas_applied(self):
+        """Проверить, что прагмы выполняются при открытии соединения."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = connections['default'].__class__({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+            'OPTIONS': {'pragmas': {'journal_mode': 'WAL',
+                                    'cache_size': -2048,
+                                    'busy_timeout': 1234}}}, 'profile')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            for name, value in (('journal_mode', 'wal'),
+                                ('cache_size', -2048),
+                                ('busy_timeout', 1234)):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], value)
+
+    def statements(self, queries):
+        return [query['sql'] for query in queries]
+
+    def test_immediate_atomic(self):
+        """Проверить, что внешний блок начинается с BEGIN IMMEDIATE."""
+        with CaptureQueriesContext(connection) as queries:
+            with immediate_atomic():
+                Group.objects.create(title='Группа', slug='group')
+        self.assertEqual(self.statements(queries)[0], 'BEGIN IMMEDIATE')
+        self.assertTrue(Group.objects.filter(slug='group').exists())
+        with self.assertRaises(ValueError):
+            with immediate_atomic():
+                Group.objects.create(title='Другая', slug='other')
+                raise ValueError
+        self.assertFalse(Group.objects.filter(slug='other').exists())
+
+    def test_immediate_atomic_nested_and_disabled(self):
+        """Проверить, что вложенный блок и отключенный параметр
+        immediate_writes не начинают транзакцию с BEGIN IMMEDIATE."""
+        with CaptureQueriesContext(connection) as queries:
+            with immediate_atomic():
+                with immediate_atomic():
+                    Group.objects.create(title='Группа', slug='group')
+        self.assertEqual(self.statements(queries).count('BEGIN IMMEDIATE'),
+                         1)
+        with mock.patch.dict(connection.settings_dict['OPTIONS'],
+                             immediate_writes=False):
+            with CaptureQueriesContext(connection) as queries:
+                with immediate_atomic():
+                    Group.objects.create(title='Другая', slug='other')
+        self.assertNotIn('BEGIN IMMEDIATE', self.statements(queries))
+
+    def test_write_view_transaction(self):
+        """Проверить, что POST к API выполняется в BEGIN IMMEDIATE, а GET --
+        без транзакции."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/group/')
+        self.assertNotIn('BEGIN IMMEDIATE', self.statements(queries))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/v1/group/', {
+                'title': 'Группа', 'slug': 'group'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('BEGIN IMMEDIATE', self.statements(queries))
+
+    def test_benchmark_command(self):
+        """Проверить, что команда сравнивает оба профиля."""
+        out = io.StringIO()
+        call_command('benchmark_db', workers=2, operations=10, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('Без настройки: 2 процесса(ов)'))
+        self.assertTrue(lines[1].startswith('С профилем: 2 процесса(ов)'))
@@ -0,0 +1,121 @@
+import datetime as dt
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .fixtures import TestingStand
+from .. import export
+from ..models import Post, User
+
+
+def parse_ndjson(data):
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+class ExportTest(TestingStand):
+    """ Класс ExportTest используется для тестирования выгрузки данных в
+    NDJSON.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_records_in_dependency_order() -- проверяет состав и порядок записей.
+    test_chunks_cover_table() -- проверяет чтение таблицы пачками.
+    test_since_and_kinds() -- проверяет инкрементальную выгрузку и выбор
+        видов данных.
+    test_command_gzip() -- проверяет команду export со сжатием в файл.
+    test_api_requires_admin() -- проверяет доступ к эндпоинту выгрузки.
+    test_api_stream() -- проверяет потоковый ответ эндпоинта.
+    """
+
+    def test_records_in_dependency_order(self):
+        """Проверить, что записи ссылаются только на выгруженные раньше."""
+        records = parse_ndjson(b''.join(export.iter_ndjson()))
+        types = [record['type'] for record in records]
+        self.assertEqual(types, sorted(types, key=[
+            'user', 'group', 'post', 'comment', 'like', 'follow'].index))
+        post = next(record for record in records
+                    if record['type'] == 'post'
+                    and record['id'] == self.post1.pk)
+        self.assertEqual(post['author'], self.user1.username)
+        self.assertEqual(post['group'], self.group1.slug)
+        self.assertEqual(post['text'], self.post1.text)
+        self.assertIn({'type': 'follow', 'user': self.user1.username,
+                       'author': self.user2.username}, records)
+
+    def test_chunks_cover_table(self):
+        """Проверить, что пачки выдают все строки ровно один раз."""
+        rows = list(export.iter_rows('users', chunk_size=1))
+        self.assertEqual([row['username'] for row in rows],
+                         list(User.objects.order_by('pk').values_list(
+                             'username', flat=True)))
+
+    def test_since_and_kinds(self):
+        """Проверить фильтр по дате и выбор видов данных."""
+        since = timezone.make_aware(dt.datetime(2020, 11, 1))
+        Post.objects.filter(pk=self.post1.pk).update(
+            pub_date=since - dt.timedelta(days=1))
+        records = list(export.iter_rows('posts', since))
+        self.assertIn(self.post2.pk, [record['id'] for record in records])
+        self.assertNotIn(self.post1.pk, [record['id'] for record in records])
+        self.assertEqual(export.parse_kinds('follows, users'),
+                         ['users', 'follows'])
+        with self.assertRaises(ValueError):
+            export.parse_kinds('passwords')
+        self.assertEqual(export.parse_since('2020-11-01'), since)
+        with self.assertRaises(ValueError):
+            export.parse_since('вчера')
+
+    def test_command_gzip(self):
+        """Проверить сжатую выгрузку командой в файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.ndjson.gz')
+            call_command('export', output=path, gzip=True, kinds='groups',
+                         stderr=io.StringIO())
+            with gzip.open(path) as source:
+                records = parse_ndjson(source.read())
+        self.assertEqual({record['slug'] for record in records},
+                         {self.group1.slug, self.group2.slug})
+        output = io.StringIO()
+        call_command('export', kinds='comments', stdout=output)
+        self.assertEqual(
+            parse_ndjson(output.getvalue().encode())[0]['text'],
+            self.comment1.text)
+        with self.assertRaises(CommandError):
+            call_command('export', since='вчера')
+
+    def test_api_requires_admin(self):
+        """Проверить, что выгрузка доступна только администратору."""
+        client = APIClient()
+        self.assertEqual(client.get('/api/v1/export/').status_code, 401)
+        client.force_authenticate(self.user1)
+        self.assertEqual(client.get('/api/v1/export/').status_code, 403)
+
+    def test_api_stream(self):
+        """Проверить потоковый ответ в NDJSON и gzip."""
+        admin = User.objects.create(username='admin', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get('/api/v1/export/', {'kinds': 'likes'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = parse_ndjson(b''.join(response.streaming_content))
+        self.assertEqual([(record['user'], record['post'])
+                          for record in records],
+                         [(self.user2.username, self.post1.pk)])
+        response = client.get('/api/v1/export/',
+                              {'kinds': 'users', 'compress': 'gzip'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        records = parse_ndjson(gzip.decompress(
+            b''.join(response.streaming_content)))
+        self.assertIn('admin', [record['username'] for record in records])
+        response = client.get('/api/v1/export/', {'kinds': 'passwords'})
+        self.assertEqual(response.status_code, 400)
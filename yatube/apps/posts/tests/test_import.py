@@ -0,0 +1,152 @@
+import io
+import os
+import tempfile
+
+import orjson
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .fixtures import TestingStand
+from .. import export, search
+from ..importer import Importer
+from ..models import AuthorStats, Comment, Follow, Like, Post, TimelineEntry
+
+
+def ndjson(*records):
+    return [orjson.dumps(record) for record in records]
+
+
+class ImportTest(TestingStand):
+    """ Класс ImportTest используется для тестирования пакетной загрузки
+    данных из NDJSON.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_import_and_rebuild() -- проверяет загрузку записей всех видов и
+        перестроение производных данных.
+    test_dates_kept() -- проверяет даты из выгрузки у записей без id и
+        лайков.
+    test_duplicates_skipped() -- проверяет повторную загрузку выгрузки.
+    test_invalid_records() -- проверяет учет ошибочных записей.
+    test_batches() -- проверяет число запросов на пачку.
+    test_command() -- проверяет команду import.
+    """
+
+    def records(self):
+        return ndjson(
+            {'type': 'user', 'username': 'legacy', 'email': 'l@example.com',
+             'date_joined': '2019-01-01T00:00:00+00:00'},
+            {'type': 'group', 'title': 'Архив', 'slug': 'archive',
+             'description': 'Старые посты'},
+            {'type': 'post', 'id': 500, 'author': 'legacy',
+             'group': 'archive', 'text': 'Перенесенный тюльпан',
+             'pub_date': '2019-02-03T04:05:06+00:00'},
+            {'type': 'comment', 'id': 700, 'post': 500,
+             'author': self.user1.username, 'text': 'Старый комментарий',
+             'created': '2019-02-04T00:00:00+00:00'},
+            {'type': 'like', 'user': self.user1.username, 'post': 500},
+            {'type': 'follow', 'user': self.user1.username,
+             'author': 'legacy'},
+        )
+
+    def test_import_and_rebuild(self):
+        """Проверить загрузку и однократное перестроение."""
+        importer = Importer()
+        importer.load_lines(self.records())
+        importer.flush()
+        importer.finish()
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.author.username, 'legacy')
+        self.assertEqual(post.group.slug, 'archive')
+        self.assertEqual(post.pub_date.year, 2019)
+        self.assertEqual((post.likes_count, post.comments_count), (1, 1))
+        self.assertEqual(Comment.objects.get(pk=700).created.year, 2019)
+        self.assertFalse(post.author.has_usable_password())
+        stats = AuthorStats.objects.get(user=post.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user1, post=post).exists())
+        if search.search_available():
+            self.assertIn(post, search.search_posts('тюльпан'))
+        self.assertEqual(importer.stats['posts'],
+                         {'created': 1, 'skipped': 0, 'failed': 0})
+
+    def test_dates_kept(self):
+        """Проверить, что даты из выгрузки сохраняются у записей без id и
+        у лайков, а поле модели остается auto_now_add."""
+        importer = Importer()
+        importer.load_lines(ndjson(
+            {'type': 'post', 'author': self.user1.username,
+             'text': 'Пост без id', 'pub_date': '2018-05-06T00:00:00+00:00'},
+            {'type': 'like', 'user': self.user1.username,
+             'post': self.post1.pk, 'created': '2018-05-07T00:00:00+00:00'},
+        ))
+        importer.flush()
+        importer.finish()
+        post = Post.objects.get(text='Пост без id')
+        self.assertEqual(post.pub_date.year, 2018)
+        like = Like.objects.get(user=self.user1, post=self.post1)
+        self.assertEqual(like.created.year, 2018)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_duplicates_skipped(self):
+        """Проверить, что повторная загрузка ничего не дублирует."""
+        counts = [model.objects.count()
+                  for model in (Post, Comment, Like, Follow)]
+        importer = Importer()
+        importer.load_lines(export.iter_ndjson())
+        importer.flush()
+        importer.finish()
+        self.assertEqual([model.objects.count()
+                          for model in (Post, Comment, Like, Follow)],
+                         counts)
+        self.assertFalse(any(kind['created']
+                             for kind in importer.stats.values()))
+        self.assertEqual(importer.stats['posts']['skipped'], 2)
+
+    def test_invalid_records(self):
+        """Проверить, что ошибочные записи пропускаются с сообщением."""
+        importer = Importer()
+        importer.load_lines([b'{', b'', b'{"type": "secret"}'] + ndjson(
+            {'type': 'post', 'author': 'nobody', 'text': 'Текст'},
+            {'type': 'post', 'author': self.user1.username},
+            {'type': 'like', 'user': self.user1.username, 'post': 999999},
+            {'type': 'follow', 'user': 'same', 'author': 'same'},
+        ))
+        importer.flush()
+        importer.finish()
+        self.assertEqual(importer.malformed, 2)
+        self.assertEqual(importer.stats['posts']['failed'], 2)
+        self.assertEqual(importer.stats['likes']['failed'], 1)
+        self.assertEqual(importer.stats['follows']['failed'], 1)
+        self.assertEqual(len(importer.errors), 6)
+
+    def test_batches(self):
+        """Проверить, что пачка постов сохраняется фиксированным числом
+        запросов."""
+        records = ndjson(*[{'type': 'post', 'id': 1000 + number,
+                            'author': self.user1.username,
+                            'text': f'Пост {number}'}
+                           for number in range(50)])
+        importer = Importer(batch_size=100)
+        importer.load_lines(records)
+        with CaptureQueriesContext(connection) as queries:
+            importer.flush()
+        self.assertLessEqual(len(queries), 6)
+        self.assertEqual(Post.objects.filter(pk__gte=1000).count(), 50)
+
+    def test_command(self):
+        """Проверить команду import с отчетом о скорости."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'legacy.ndjson')
+            with open(path, 'wb') as target:
+                target.write(b'\n'.join(self.records()))
+            output = io.StringIO()
+            call_command('import', path, batch_size=2, stdout=output,
+                         stderr=io.StringIO())
+        self.assertIn('posts: создано 1', output.getvalue())
+        self.assertIn('записей/с', output.getvalue())
+        self.assertTrue(Post.objects.filter(pk=500).exists())
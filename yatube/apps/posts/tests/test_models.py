@@ -1,4 +1,16 @@
-from .fixtures import TestingStand
+import io
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .fixtures import TestingStand, get_sample_image_file
+from ..models import (POST_IMAGE_FORMATS, POST_IMAGE_WIDTHS, POST_THUMBNAILS,
+                      AuthorStats, Comment, Follow, Like, Post)
+from ..thumbnails import generate_post_thumbnails
 
 
 class GroupModelTest(TestingStand):
@@ -246,3 +258,186 @@ class LikeModelTest(TestingStand):
         like = LikeModelTest.like1
         expected_object_name = f'{like.user} оценил пост {like.post_id}'
         self.assertEquals(expected_object_name, str(like))
+
+
+class PostCountersTest(TestingStand):
+    """ Класс PostCountersTest используется для тестирования денормализованных
+    счетчиков модели Post.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_counters_follow_likes() -- проверяет, что likes_count изменяется при
+        создании и удалении лайка.
+    test_counters_follow_comments() -- проверяет, что comments_count изменяется
+        при создании и удалении комментария.
+    test_rebuild_counters_repairs_drift() -- проверяет, что команда
+        rebuild_counters восстанавливает разошедшиеся счетчики.
+    """
+
+    def test_counters_follow_likes(self):
+        """Проверить, что likes_count изменяется вместе с лайками."""
+        post = PostCountersTest.post1
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 1)
+        like = Like.objects.create(user=PostCountersTest.user1, post=post)
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 2)
+        like.delete()
+        Like.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 0)
+
+    def test_counters_follow_comments(self):
+        """Проверить, что comments_count изменяется вместе с комментариями."""
+        post = PostCountersTest.post2
+        comment = Comment.objects.create(post=post,
+                                         author=PostCountersTest.user1,
+                                         text='Второй комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_rebuild_counters_repairs_drift(self):
+        """Проверить, что rebuild_counters восстанавливает счетчики."""
+        post = PostCountersTest.post1
+        Post.objects.filter(pk=post.pk).update(likes_count=10,
+                                               comments_count=0)
+        call_command('rebuild_counters', stdout=io.StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+
+class AuthorStatsTest(TestingStand):
+    """ Класс AuthorStatsTest используется для тестирования модели
+    AuthorStats.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_stats_follow_posts_and_follows() -- проверяет, что статистика
+        изменяется при создании и удалении постов и подписок.
+    test_rebuild_counters_restores_stats() -- проверяет, что команда
+        rebuild_counters создает и исправляет статистику.
+    """
+
+    def get_stats(self, user):
+        return AuthorStats.objects.values_list(
+            'posts_count', 'followers_count', 'following_count').get(
+            pk=user.pk)
+
+    def test_stats_follow_posts_and_follows(self):
+        """Проверить, что статистика следует за постами и подписками."""
+        user1, user2 = AuthorStatsTest.user1, AuthorStatsTest.user2
+        self.assertEqual(self.get_stats(user1), (1, 0, 1))
+        self.assertEqual(self.get_stats(user2), (1, 1, 0))
+        post = Post.objects.create(text='Еще пост', author=user2)
+        Follow.objects.create(user=user2, author=user1)
+        self.assertEqual(self.get_stats(user1), (1, 1, 1))
+        self.assertEqual(self.get_stats(user2), (2, 1, 1))
+        post.delete()
+        Follow.objects.filter(user=user1).delete()
+        self.assertEqual(self.get_stats(user1), (1, 1, 0))
+        self.assertEqual(self.get_stats(user2), (1, 0, 1))
+
+    def test_rebuild_counters_restores_stats(self):
+        """Проверить, что rebuild_counters восстанавливает статистику."""
+        user1, user2 = AuthorStatsTest.user1, AuthorStatsTest.user2
+        AuthorStats.objects.filter(pk=user1.pk).delete()
+        AuthorStats.objects.filter(pk=user2.pk).update(posts_count=7)
+        call_command('rebuild_counters', stdout=io.StringIO())
+        self.assertEqual(self.get_stats(user1), (1, 0, 1))
+        self.assertEqual(self.get_stats(user2), (1, 1, 0))
+
+
+class PostThumbnailsTest(TestingStand):
+    """ Класс PostThumbnailsTest используется для тестирования генерации
+    миниатюр при сохранении поста.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_thumbnails_generated_on_save() -- проверяет, что после сохранения
+        поста миниатюры берутся из хранилища без обработки изображения.
+    test_generate_thumbnails_command() -- проверяет, что команда
+        generate_thumbnails восстанавливает удаленные миниатюры.
+    test_image_variants() -- проверяет адаптивные варианты изображения.
+    test_api_reads_stored_variants() -- проверяет, что API выводит варианты
+        из кэша без обращения к sorl.
+    """
+
+    def assert_thumbnails_ready(self, post):
+        with mock.patch.object(default.engine, 'get_image',
+                               side_effect=AssertionError):
+            for geometry, options in POST_THUMBNAILS:
+                with self.subTest(options=options):
+                    get_thumbnail(post.image, geometry, **options)
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir(),
+                       BACKGROUND_TASKS_EAGER=True)
+    def test_thumbnails_generated_on_save(self):
+        """Проверить, что миниатюры созданы при сохранении поста."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=PostThumbnailsTest.user1,
+            image=get_sample_image_file('thumbnail_test.png'))
+        self.assert_thumbnails_ready(post)
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
+    def test_generate_thumbnails_command(self):
+        """Проверить, что generate_thumbnails создает миниатюры."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=PostThumbnailsTest.user1,
+            image=get_sample_image_file('thumbnail_command.png'))
+        default.kvstore.delete(ImageFile(post.image))
+        call_command('generate_thumbnails', processes=1,
+                     stdout=io.StringIO())
+        self.assert_thumbnails_ready(post)
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir(),
+                       BACKGROUND_TASKS_EAGER=True)
+    def test_image_variants(self):
+        """Проверить форматы и размеры вариантов изображения."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=PostThumbnailsTest.user1,
+            image=get_sample_image_file('variants_test.png'))
+        variants = post.get_image_variants()
+        self.assertEqual(
+            [(variant['type'], variant['width']) for variant in variants],
+            [(mime_type, width) for _, mime_type, _ in POST_IMAGE_FORMATS
+             for width in POST_IMAGE_WIDTHS])
+        for variant in variants:
+            with self.subTest(variant=variant):
+                extension = variant['type'].split('/')[1]
+                extension = {'jpeg': 'jpg'}.get(extension, extension)
+                self.assertTrue(variant['url'].endswith(f'.{extension}'))
+        webp, jpeg = post.get_image_sources()
+        self.assertEqual(webp['type'], 'image/webp')
+        self.assertIn(f'{POST_IMAGE_WIDTHS[0]}w', webp['srcset'])
+        self.assertEqual(jpeg['src'], variants[-1]['url'])
+        self.assertEqual(Post(text='Без картинки').get_image_variants(), [])
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir(),
+                       BACKGROUND_TASKS_EAGER=True)
+    def test_api_reads_stored_variants(self):
+        """Проверить, что список постов API берет варианты изображений,
+        сохраненные при генерации миниатюр, а не вызывает get_thumbnail."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=PostThumbnailsTest.user1,
+            image=get_sample_image_file('api_variants.png'))
+        generate_post_thumbnails(PostThumbnailsTest.post2.pk)
+        with mock.patch('apps.posts.models.get_thumbnail',
+                        side_effect=AssertionError):
+            response = self.guest_client.get('/api/v1/posts/')
+        self.assertEqual(response.status_code, 200)
+        item = next(item for item in response.data['results']
+                    if item['id'] == post.pk)
+        self.assertEqual(len(item['image_variants']),
+                         len(POST_IMAGE_FORMATS) * len(POST_IMAGE_WIDTHS))
+        self.assertTrue(item['image_variants'][0]['url'].startswith(
+            'http://testserver/'))
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..models import Group, User
+from ..routers import PRIMARY_COOKIE, PrimaryReplicaRouter
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTest(TransactionTestCase):
+    """ Класс ReplicaRoutingTest используется для тестирования
+    распределения чтений по репликам. Реплика -- копия тестовой базы в
+    файле SQLite, снятая в начале теста; записи после копирования есть
+    только в основной базе.
+
+    Родительский класс -- TransactionTestCase.
+
+    Методы класса
+    --------
+    test_router_targets() -- проверяет базы записи, миграций и чтения вне
+        запросов.
+    test_reads_from_replica() -- проверяет чтение запроса из реплики.
+    test_read_your_writes() -- проверяет чтение основной базы после
+        записи пользователя.
+    test_fresh_reads_after_change() -- проверяет чтение основной базы
+        сразу после изменения данных страницы.
+    """
+
+    def setUp(self):
+        Group.objects.create(title='Старая', slug='old')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'replica.sqlite3')
+        primary = connections['default']
+        primary.ensure_connection()
+        with sqlite3.connect(path) as target:
+            primary.connection.backup(target)
+        connections.databases[REPLICA] = {
+            **primary.settings_dict, 'NAME': path, 'OPTIONS': {}}
+        self.addCleanup(self.drop_replica)
+        Group.objects.create(title='Новая', slug='new')
+
+    def drop_replica(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    def slugs(self, client):
+        response = client.get('/api/v1/group/')
+        self.assertEqual(response.status_code, 200)
+        return {group['slug'] for group in response.data['results']}
+
+    def test_router_targets(self):
+        """Проверить, что запись и миграции идут в основную базу, а чтение
+        вне HTTP-запроса не уходит в реплику."""
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_write(Group), 'default')
+        self.assertEqual(router.db_for_read(Group), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'posts'))
+        self.assertIsNone(router.allow_migrate('default', 'posts'))
+        self.assertEqual(Group.objects.count(), 2)
+
+    def test_reads_from_replica(self):
+        """Проверить, что чтение запроса идет в реплику и не закрепляет
+        пользователя за основной базой."""
+        client = APIClient()
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.assertEqual(self.slugs(client), {'old'})
+        self.assertNotIn(PRIMARY_COOKIE, client.cookies)
+
+    def test_read_your_writes(self):
+        """Проверить, что после записи пользователь читает основную базу,
+        в том числе другим клиентом без cookie, а остальные -- реплику."""
+        user = User(pk=10 ** 6, username='writer')
+        client, other_client = APIClient(), APIClient()
+        client.force_authenticate(user)
+        other_client.force_authenticate(user)
+        response = client.post('/api/v1/group/', {'title': 'Своя'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        # отключаем чтение основной базы после смены поколения областей
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.assertEqual(self.slugs(client), {'old', 'new', 'svoya'})
+            self.assertEqual(self.slugs(other_client),
+                             {'old', 'new', 'svoya'})
+            self.assertEqual(self.slugs(APIClient()), {'old'})
+            client.post('/api/v1/group/', {'title': 'Еще одна'})
+            self.assertEqual(self.slugs(client), {'old'})
+
+    def test_fresh_reads_after_change(self):
+        """Проверить, что сразу после изменения областей страница и ее
+        валидаторы строятся по основной базе, а затем -- по реплике."""
+        client = APIClient()
+        self.assertEqual(self.slugs(client), {'old', 'new'})
+        self.assertNotIn(PRIMARY_COOKIE, client.cookies)
+        with mock.patch('time.time', return_value=time.time() + 60):
+            self.assertEqual(self.slugs(client), {'old'})
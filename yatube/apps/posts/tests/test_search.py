@@ -0,0 +1,99 @@
+import io
+from unittest import mock
+
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .fixtures import TestingStand
+from .. import search
+from ..models import Post
+
+
+class PostSearchTest(TestingStand):
+    """ Класс PostSearchTest используется для тестирования полнотекстового
+    поиска по постам.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    setUpClass() -- добавляет посты с разметкой Summernote.
+    test_index_follows_post_changes() -- проверяет синхронизацию индекса при
+        создании, изменении и удалении поста.
+    test_markup_and_operators_are_ignored() -- проверяет, что разметка не
+        индексируется, а операторы FTS5 в запросе не интерпретируются.
+    test_results_are_ranked() -- проверяет сортировку по релевантности.
+    test_fallback_without_index() -- проверяет поиск без индекса FTS5.
+    test_api_search() -- проверяет эндпоинт /api/v1/posts/search/.
+    test_search_page() -- проверяет страницу поиска.
+    test_rebuild_search_index() -- проверяет команду rebuild_search_index.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.rare = Post.objects.create(
+            text='<p>Тюльпаны <b>цветут</b> весной</p>', author=cls.user1)
+        cls.often = Post.objects.create(
+            text='<p>Тюльпаны, тюльпаны и еще раз тюльпаны</p>',
+            author=cls.user2)
+
+    def find(self, query):
+        return list(search.search_posts(query).values_list('pk', flat=True))
+
+    def test_index_follows_post_changes(self):
+        """Проверить обновление индекса при изменении поста."""
+        post = Post.objects.create(text='Редкое слово кукушка',
+                                   author=PostSearchTest.user1)
+        self.assertEqual(self.find('кукушка'), [post.pk])
+        post.text = 'Теперь про соловья'
+        post.save()
+        self.assertEqual(self.find('кукушка'), [])
+        self.assertEqual(self.find('соловья'), [post.pk])
+        post.delete()
+        self.assertEqual(self.find('соловья'), [])
+
+    def test_markup_and_operators_are_ignored(self):
+        """Проверить очистку разметки и экранирование запроса."""
+        self.assertEqual(self.find('b'), [])
+        self.assertEqual(self.find('цветут "весной('),
+                         [PostSearchTest.rare.pk])
+        self.assertEqual(self.find('цве'), [PostSearchTest.rare.pk])
+        self.assertEqual(self.find('  ***  '), [])
+
+    def test_results_are_ranked(self):
+        """Проверить, что более релевантный пост идет первым."""
+        self.assertEqual(self.find('тюльпаны'), [PostSearchTest.often.pk,
+                                                 PostSearchTest.rare.pk])
+
+    def test_fallback_without_index(self):
+        """Проверить поиск подстроки без индекса FTS5."""
+        with mock.patch.object(search, 'search_available',
+                               return_value=False):
+            self.assertEqual(self.find('цветут'), [PostSearchTest.rare.pk])
+
+    def test_api_search(self):
+        """Проверить выдачу и пагинацию поиска в API."""
+        response = APIClient().get('/api/v1/posts/search/',
+                                   {'q': 'тюльпаны', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([item['id'] for item in response.data['results']],
+                         [PostSearchTest.often.pk])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_search_page(self):
+        """Проверить страницу поиска."""
+        response = self.guest_client.get(reverse('search'), {'q': 'весной'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']),
+                         [PostSearchTest.rare])
+        self.assertEqual(response.context['query'], 'весной')
+
+    def test_rebuild_search_index(self):
+        """Проверить, что команда восстанавливает индекс."""
+        search.unindex_post(PostSearchTest.rare.pk)
+        self.assertEqual(self.find('весной'), [])
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        self.assertEqual(self.find('весной'), [PostSearchTest.rare.pk])
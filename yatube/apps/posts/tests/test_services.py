@@ -0,0 +1,120 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .fixtures import TestingStand
+from .. import services
+from ..models import AuthorStats, Follow, Like, Post, TimelineEntry, User
+
+
+class ServicesTest(TestingStand):
+    """ Класс ServicesTest используется для тестирования общих операций с
+    лайками и подписками.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_like_changes_state_once() -- проверяет, что повторный лайк не
+        меняет счетчик.
+    test_unlike_changes_state_once() -- проверяет повторное снятие лайка.
+    test_duplicate_like_single_insert() -- проверяет, что дубликат стоит
+        одного INSERT без SELECT.
+    test_follow_and_unfollow() -- проверяет статистику и ленту подписчика.
+    test_api_likes() -- проверяет создание и удаление лайков через API.
+    test_api_duplicate_follow() -- проверяет повторную подписку через API.
+    test_admin_follow() -- проверяет создание подписки в админ-панели.
+    """
+
+    def likes_count(self, post):
+        return Post.objects.values_list('likes_count', flat=True).get(
+            pk=post.pk)
+
+    def test_like_changes_state_once(self):
+        """Проверить, что счетчик меняется только при реальном лайке."""
+        post = ServicesTest.post2
+        self.assertTrue(services.like(ServicesTest.user1, post.pk))
+        self.assertFalse(services.like(ServicesTest.user1, post.pk))
+        self.assertEqual(self.likes_count(post), 1)
+        self.assertEqual(Like.objects.filter(post=post).count(), 1)
+
+    def test_unlike_changes_state_once(self):
+        """Проверить, что повторное снятие лайка не уменьшает счетчик."""
+        post = ServicesTest.post1
+        self.assertTrue(services.unlike(ServicesTest.user2, post.pk))
+        self.assertFalse(services.unlike(ServicesTest.user2, post.pk))
+        self.assertEqual(self.likes_count(post), 0)
+
+    def test_duplicate_like_single_insert(self):
+        """Проверить, что повторный лайк -- один INSERT без обновлений."""
+        post = ServicesTest.post1
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(services.like(ServicesTest.user2, post.pk))
+        statements = [query['sql'] for query in queries
+                      if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
+
+    def test_follow_and_unfollow(self):
+        """Проверить статистику и ленту при подписке и отписке."""
+        user1, user2 = ServicesTest.user1, ServicesTest.user2
+        self.assertFalse(services.follow(user1, user2.pk))
+        self.assertTrue(services.follow(user2, user1.pk))
+        self.assertEqual(AuthorStats.objects.get(user=user1).followers_count,
+                         1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=user2, post=ServicesTest.post1).exists())
+        self.assertTrue(services.unfollow(user2, user1.pk))
+        self.assertFalse(services.unfollow(user2, user1.pk))
+        self.assertEqual(AuthorStats.objects.get(user=user1).followers_count,
+                         0)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=user2, post=ServicesTest.post1).exists())
+
+    def test_api_likes(self):
+        """Проверить лайк, повторный лайк и удаление через API."""
+        post = ServicesTest.post2
+        url = f'/api/v1/posts/{post.pk}/likes/'
+        client = APIClient()
+        self.assertEqual(client.post(url).status_code, 401)
+        client.force_authenticate(ServicesTest.user1)
+        response = client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user'], ServicesTest.user1.username)
+        self.assertEqual(response.data['author'], post.author.username)
+        duplicate = client.post(url)
+        self.assertEqual(duplicate.status_code, 400)
+        self.assertEqual(duplicate.data['non_field_errors'],
+                         ['Этот пост уже лайкнут'])
+        like_url = f'{url}{response.data["id"]}/'
+        other = APIClient()
+        other.force_authenticate(ServicesTest.user2)
+        self.assertEqual(other.delete(like_url).status_code, 403)
+        self.assertEqual(client.delete(like_url).status_code, 204)
+        self.assertEqual(self.likes_count(post), 0)
+
+    def test_api_duplicate_follow(self):
+        """Проверить ответ на повторную подписку через API."""
+        client = APIClient()
+        client.force_authenticate(ServicesTest.user1)
+        response = client.post('/api/v1/follow/', {
+            'following': ServicesTest.user2.username}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['non_field_errors'],
+                         ['Такая подписка уже есть'])
+        response = client.post('/api/v1/follow/', {
+            'following': ServicesTest.user1.username}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_follow(self):
+        """Проверить создание подписки в админ-панели."""
+        admin = User.objects.create(username='admin', is_staff=True,
+                                    is_superuser=True)
+        self.client.force_login(admin)
+        response = self.client.post('/admin/posts/follow/add/', {
+            'user': admin.pk, 'author': ServicesTest.user1.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Follow.objects.filter(
+            user=admin, author=ServicesTest.user1).exists())
+        self.assertEqual(AuthorStats.objects.get(user=admin).following_count,
+                         1)
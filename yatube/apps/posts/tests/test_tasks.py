@@ -0,0 +1,135 @@
+import io
+import threading
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from .fixtures import TestingStand
+from .. import tasks
+from ..management.commands.run_tasks import _work
+from ..models import Post, Task
+
+calls = []
+
+
+def record(value, suffix=''):
+    """Тестовая задача: запомнить аргументы вызова."""
+    calls.append(f'{value}{suffix}')
+
+
+def explode():
+    """Тестовая задача, всегда завершающаяся ошибкой."""
+    raise RuntimeError('boom')
+
+
+class TaskQueueTest(TestingStand):
+    """ Класс TaskQueueTest используется для тестирования очереди фоновых
+    задач.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_task_is_executed_once() -- проверяет, что задача выполняется
+        обработчиком ровно один раз.
+    test_failed_task_is_retried_with_backoff() -- проверяет повторы с
+        экспоненциальной задержкой и состояние failed.
+    test_stale_running_task_is_reclaimed() -- проверяет, что брошенная
+        обработчиком задача снова выдаётся в работу.
+    test_stale_task_without_attempts_fails() -- проверяет, что брошенная
+        задача с исчерпанными попытками получает состояние failed.
+    test_post_delete_enqueues_thumbnail_cleanup() -- проверяет, что
+        удаление миниатюр поставлено в очередь.
+    test_queue_stats() -- проверяет метрики очереди.
+    """
+
+    def setUp(self):
+        super().setUp()
+        Task.objects.all().delete()
+        calls.clear()
+
+    def test_task_is_executed_once(self):
+        """Проверить, что обработчик выполняет задачу один раз."""
+        task = tasks.enqueue(record, 'a', suffix='!')
+        self.assertIsNone(task.started)
+        self.assertEqual(_work(threading.Event(), True, 0, 0), 1)
+        task.refresh_from_db()
+        self.assertEqual(calls, ['a!'])
+        self.assertEqual(task.status, Task.DONE)
+        self.assertEqual(task.attempts, 1)
+        self.assertIsNone(tasks.claim())
+
+    def test_failed_task_is_retried_with_backoff(self):
+        """Проверить повторы упавшей задачи."""
+        task = tasks.enqueue(explode, max_attempts=2)
+        before = timezone.now()
+        self.assertTrue(tasks.run_next())
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.PENDING)
+        self.assertIn('boom', task.last_error)
+        self.assertGreaterEqual(
+            task.run_at,
+            before + timedelta(seconds=tasks.retry_delay(1)))
+        self.assertFalse(tasks.run_next(), 'Повтор выдан до задержки')
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        self.assertTrue(tasks.run_next())
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+        self.assertEqual(tasks.retry_delay(3), 4 * tasks.retry_delay(1))
+
+    def test_stale_running_task_is_reclaimed(self):
+        """Проверить повторную выдачу зависшей задачи."""
+        task = tasks.enqueue(record, 'b')
+        self.assertEqual(tasks.claim('dead-worker').pk, task.pk)
+        self.assertIsNone(tasks.claim())
+        Task.objects.filter(pk=task.pk).update(
+            started=timezone.now() - timedelta(
+                seconds=tasks.VISIBILITY_TIMEOUT + 1))
+        self.assertTrue(tasks.run_next())
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.DONE)
+        self.assertEqual(calls, ['b'])
+
+    def test_stale_task_without_attempts_fails(self):
+        """Проверить, что зависшая задача с исчерпанными попытками не
+        выдаётся снова."""
+        task = tasks.enqueue(record, 'c', max_attempts=1)
+        self.assertEqual(tasks.claim('dead-worker').pk, task.pk)
+        Task.objects.filter(pk=task.pk).update(
+            started=timezone.now() - timedelta(
+                seconds=tasks.VISIBILITY_TIMEOUT + 1))
+        self.assertFalse(tasks.run_next())
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 1)
+        self.assertIsNotNone(task.finished)
+        self.assertEqual(calls, [])
+
+    def test_post_delete_enqueues_thumbnail_cleanup(self):
+        """Проверить, что удаление миниатюр выполняется в очереди."""
+        post = Post.objects.create(text='Пост', author=TaskQueueTest.user1,
+                                   image='posts/missing.png')
+        Task.objects.all().delete()
+        post.delete()
+        self.assertEqual(
+            list(Task.objects.values_list('name', 'args')),
+            [('apps.posts.thumbnails.delete_image_thumbnails',
+              '{"args": ["posts/missing.png"], "kwargs": {}}')])
+
+    def test_queue_stats(self):
+        """Проверить глубину очереди и задержки."""
+        tasks.enqueue(record, 'c')
+        tasks.enqueue(record, 'd', run_at=timezone.now() + timedelta(days=1))
+        tasks.run_next()
+        stats = tasks.queue_stats()
+        self.assertEqual(stats['depth'], {Task.PENDING: 1, Task.RUNNING: 0,
+                                          Task.DONE: 1, Task.FAILED: 0})
+        [latency] = stats['latency']
+        self.assertEqual(latency['name'], tasks.task_name(record))
+        self.assertEqual(latency['total'], 1)
+        self.assertIsInstance(latency['run'], timedelta)
+        output = io.StringIO()
+        call_command('task_stats', stdout=output)
+        self.assertIn('pending: 1', output.getvalue())
@@ -0,0 +1,116 @@
+import multiprocessing
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .fixtures import TestingStand
+from ..post_api.throttling import SlidingWindowThrottle
+
+RATES = {'user_read': '3/min', 'user_write': '2/min', 'anon_read': '10/min',
+         'anon_write': '2/min', 'token': '2/min'}
+
+
+def _anonymous_request():
+    request = Request(APIRequestFactory().get('/api/v1/posts/'))
+    request.user = AnonymousUser()
+    return request
+
+
+def _attempts(count, results):
+    throttle = SlidingWindowThrottle()
+    results.put(sum(throttle.allow_request(_anonymous_request(), None)
+                    for _ in range(count)))
+
+
+@mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', RATES)
+class ThrottlingTest(TestingStand):
+    """ Класс ThrottlingTest используется для тестирования ограничения
+    частоты запросов к API.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_headers_and_limit() -- проверяет заголовки X-RateLimit-* и ответ 429.
+    test_reads_and_writes_separate() -- проверяет раздельные лимиты чтения
+        и записи.
+    test_token_scope() -- проверяет отдельный лимит выдачи токенов.
+    test_sliding_window() -- проверяет учет запросов предыдущего окна.
+    test_limit_across_processes() -- проверяет лимит при одновременных
+        запросах нескольких процессов.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(ThrottlingTest.user1)
+
+    def test_headers_and_limit(self):
+        """Проверить остаток лимита в заголовках и ответ 429."""
+        for remaining in (2, 1, 0):
+            response = self.client.get('/api/v1/group/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-RateLimit-Limit'], '3')
+            self.assertEqual(response['X-RateLimit-Remaining'],
+                             str(remaining))
+            self.assertLessEqual(int(response['X-RateLimit-Reset']), 60)
+        response = self.client.get('/api/v1/group/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertLessEqual(int(response['Retry-After']), 120)
+
+    def test_reads_and_writes_separate(self):
+        """Проверить, что запись не расходует лимит чтения."""
+        url = f'/api/v1/posts/{ThrottlingTest.post2.pk}/likes/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 429)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Remaining'], '2')
+        self.assertEqual(APIClient().get(url)['X-RateLimit-Remaining'], '9')
+
+    def test_token_scope(self):
+        """Проверить, что выдача токенов ограничена отдельно."""
+        client = APIClient()
+        data = {'username': 'nobody', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(client.post('/api/v1/token/', data).status_code,
+                             401)
+        self.assertEqual(client.post('/api/v1/token/', data).status_code,
+                         429)
+        self.assertEqual(client.get('/api/v1/group/').status_code, 200)
+
+    def test_sliding_window(self):
+        """Проверить, что запросы предыдущего окна учитываются с весом
+        оставшейся доли окна."""
+        throttle = SlidingWindowThrottle()
+        request = _anonymous_request()
+        with mock.patch.object(throttle, 'timer', return_value=6000 - 1):
+            allowed = [throttle.allow_request(request, None)
+                       for _ in range(11)]
+        self.assertEqual(allowed.count(True), 10)
+        # через 45 секунд в окне осталась четверть предыдущего окна
+        with mock.patch.object(throttle, 'timer', return_value=6000 + 45):
+            allowed = [throttle.allow_request(request, None)
+                       for _ in range(10)]
+            self.assertEqual(allowed.count(True), 7)
+            # оценка 2.5 + 7 опустится до 9 через 3 секунды
+            self.assertAlmostEqual(throttle.wait(), 3)
+
+    def test_limit_across_processes(self):
+        """Проверить, что процессы с общим кэшем вместе не превышают
+        лимит."""
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [context.Process(target=_attempts, args=(6, results))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        allowed = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        self.assertEqual(allowed, 10)
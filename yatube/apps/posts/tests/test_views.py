@@ -1,12 +1,21 @@
 import re
+import time
+from unittest import mock
 
 from django import forms
+from django.conf import settings
 from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from .fixtures import TestingStand
-from ..models import Follow, Post
+from .. import cards
+from ..cards import get_card_stats, reset_card_stats
+from ..models import Follow, Like, Post, TimelineEntry, User
+from ..services import unfollow
 
 
 class PostsPagesTests(TestingStand):
@@ -250,3 +259,395 @@ class PostsPagesTests(TestingStand):
         self.assertNotEqual(len(response.content.decode()),
                             len(response3.content.decode()),
                             'Очистка кэша главной страницы не работает')
+
+
+class FollowTimelineTests(TestingStand):
+    """ Класс FollowTimelineTests используется для тестирования
+    материализованной ленты подписок.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_follow_index_uses_timeline() -- проверяет, что лента подписок
+        содержит посты авторов, на которых подписан пользователь.
+    test_new_post_fans_out() -- проверяет, что новый пост попадает в ленты
+        подписчиков, в том числе пачками в фоне.
+    test_unfollow_prunes_timeline() -- проверяет, что при отписке посты автора
+        удаляются из ленты.
+    """
+
+    def test_follow_index_uses_timeline(self):
+        """Проверить, что лента подписок строится по TimelineEntry."""
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertEqual(list(response.context['posts']),
+                         [FollowTimelineTests.post2])
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_new_post_fans_out(self):
+        """Проверить, что новый пост рассылается всем подписчикам."""
+        user3 = User.objects.create(username='test_user_3')
+        Follow.objects.create(user=user3, author=FollowTimelineTests.user2)
+        with mock.patch('apps.posts.timeline.FANOUT_BATCH_SIZE', 1):
+            post = Post.objects.create(text='Новый пост',
+                                       author=FollowTimelineTests.user2)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post=post).values_list(
+                'user_id', flat=True)),
+            {FollowTimelineTests.user1.id, user3.id})
+
+    def test_unfollow_prunes_timeline(self):
+        """Проверить, что при отписке посты автора удаляются из ленты."""
+        user = FollowTimelineTests.user1
+        Follow.objects.filter(user=user,
+                              author=FollowTimelineTests.user2).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=user).exists())
+
+
+class KeysetPaginationTests(TestingStand):
+    """ Класс KeysetPaginationTests используется для тестирования
+    keyset-пагинации HTML-лент.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    setUpClass() -- добавляет посты, чтобы лента заняла две страницы.
+    test_pages_follow_cursors() -- проверяет переходы "старее/новее" по
+        курсорам.
+    test_follow_feed_pages() -- проверяет курсоры ленты подписок.
+    test_no_count_query() -- проверяет, что лента не выполняет COUNT(*).
+    test_invalid_cursor() -- проверяет, что некорректный курсор дает 404.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Добавить 12 постов, всего в ленте 14 записей."""
+        super().setUpClass()
+        for number in range(12):
+            Post.objects.create(text=f'Пост {number}', author=cls.user2)
+
+    @override_settings(FEED_PAGINATION='keyset')
+    def test_pages_follow_cursors(self):
+        """Проверить переходы по курсорам after и before."""
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        response = self.guest_client.get(reverse('index'))
+        first_page = response.context['page_obj']
+        self.assertEqual(list(response.context['posts']), expected[:10])
+        self.assertFalse(first_page.has_previous())
+        response = self.guest_client.get(
+            reverse('index'), {'after': first_page.next_cursor})
+        second_page = response.context['page_obj']
+        self.assertEqual(list(response.context['posts']), expected[10:])
+        self.assertFalse(second_page.has_next())
+        response = self.guest_client.get(
+            reverse('index'), {'before': second_page.previous_cursor})
+        self.assertEqual(list(response.context['posts']), expected[:10])
+
+    @override_settings(FEED_PAGINATION='keyset')
+    def test_follow_feed_pages(self):
+        """Проверить переход по курсору в ленте подписок."""
+        expected = list(Post.objects.filter(
+            author=KeysetPaginationTests.user2).order_by('-pub_date', '-id'))
+        response = self.authorized_client.get(reverse('follow_index'))
+        self.assertEqual(list(response.context['posts']), expected[:10])
+        response = self.authorized_client.get(
+            reverse('follow_index'),
+            {'after': response.context['page_obj'].next_cursor})
+        self.assertEqual(list(response.context['posts']), expected[10:])
+
+    @override_settings(FEED_PAGINATION='keyset')
+    def test_no_count_query(self):
+        """Проверить, что keyset-лента не считает записи."""
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('index'))
+        self.assertFalse(any('COUNT(' in query['sql']
+                             for query in queries.captured_queries))
+
+    @override_settings(FEED_PAGINATION='keyset')
+    def test_invalid_cursor(self):
+        """Проверить, что некорректный курсор возвращает код 404."""
+        response = self.guest_client.get(reverse('index'), {'after': 'xxx'})
+        self.assertEqual(response.status_code, 404)
+
+
+class LikeFeedTests(TestingStand):
+    """ Класс LikeFeedTests используется для тестирования признака лайка и
+    ленты понравившихся постов.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_is_user_liked_in_feed() -- проверяет признак is_user_liked в ленте.
+    test_like_feed_ordered_by_like_time() -- проверяет, что лента
+        понравившегося упорядочена по времени лайка.
+    """
+
+    def test_is_user_liked_in_feed(self):
+        """Проверить признак is_user_liked для авторизованного клиента."""
+        response = self.authorized_client_alter.get(reverse('index'))
+        liked = {post.id: bool(post.is_user_liked)
+                 for post in response.context['posts']}
+        self.assertEqual(liked, {LikeFeedTests.post1.id: True,
+                                 LikeFeedTests.post2.id: False})
+
+    def test_like_feed_ordered_by_like_time(self):
+        """Проверить, что последний лайк оказывается первым в ленте."""
+        Like.objects.create(user=LikeFeedTests.user2, post=LikeFeedTests.post2)
+        Like.objects.filter(user=LikeFeedTests.user2,
+                            post=LikeFeedTests.post1).delete()
+        Like.objects.create(user=LikeFeedTests.user2, post=LikeFeedTests.post1)
+        response = self.authorized_client_alter.get(reverse('like_index'))
+        self.assertEqual(list(response.context['posts']),
+                         [LikeFeedTests.post1, LikeFeedTests.post2])
+        self.assertTrue(all(post.is_user_liked
+                            for post in response.context['posts']))
+
+
+class PostCardCacheTests(TestingStand):
+    """ Класс PostCardCacheTests используется для тестирования кэша карточек
+    постов.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_cards_are_cached() -- проверяет попадания в кэш при повторном
+        запросе ленты и промах после лайка.
+    test_viewer_parts_are_spliced() -- проверяет, что кнопки лайка и
+        редактирования выводятся для текущего пользователя.
+    """
+
+    def setUp(self):
+        cache.clear()
+        reset_card_stats()
+
+    def test_cards_are_cached(self):
+        """Проверить попадания в кэш и промах после изменения версии."""
+        # рендер не пишет счетчики в общий кэш, они копятся в процессе
+        with mock.patch.object(cards, '_flushed_at', time.monotonic()):
+            self.authorized_client.get(reverse('index'))
+        self.assertEqual(cache.get(cards.MISSES_KEY), 0)
+        self.assertEqual(get_card_stats(), (0, 2))
+        self.authorized_client.get(reverse('index'))
+        self.assertEqual(get_card_stats(), (2, 2))
+        Like.objects.create(user=PostCardCacheTests.user1,
+                            post=PostCardCacheTests.post2)
+        self.authorized_client.get(reverse('index'))
+        self.assertEqual(get_card_stats(), (3, 3))
+
+    def test_viewer_parts_are_spliced(self):
+        """Проверить кнопки лайка и редактирования для разных клиентов."""
+        post = PostCardCacheTests.post1
+        edit_url = reverse('post_edit', args=[post.author.username, post.id])
+        unlike_url = reverse('post_unlike',
+                             args=[post.author.username, post.id])
+        html = self.authorized_client.get(reverse('index')).content.decode()
+        self.assertIn(edit_url, html)
+        self.assertNotIn(unlike_url, html)
+        html = self.authorized_client_alter.get(
+            reverse('index')).content.decode()
+        self.assertNotIn(edit_url, html)
+        self.assertIn(unlike_url, html)
+
+
+class AnonymousPageCacheTests(TestingStand):
+    """ Класс AnonymousPageCacheTests используется для тестирования кэша
+    страниц для анонимных пользователей.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_anonymous_page_is_cached() -- проверяет, что повторный запрос
+        страницы не обращается к БД.
+    test_page_invalidated_on_change() -- проверяет сброс кэша при изменении
+        связанных записей.
+    test_authenticated_bypasses_cache() -- проверяет, что авторизованный
+        пользователь не получает страницу из кэша.
+    """
+
+    def test_anonymous_page_is_cached(self):
+        """Проверить, что закэшированная страница не обращается к БД."""
+        url = reverse('group_posts',
+                      kwargs={'slug': AnonymousPageCacheTests.group1.slug})
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_page_invalidated_on_change(self):
+        """Проверить, что лайк, комментарий и подписка сбрасывают кэш."""
+        post = AnonymousPageCacheTests.post2
+        user = AnonymousPageCacheTests.user2
+        urls = [reverse('index'),
+                reverse('group_posts', kwargs={'slug': post.group.slug}),
+                reverse('profile', args=[user.username]),
+                reverse('post', args=[user.username, post.id])]
+        changes = [
+            lambda: Like.objects.create(user=user, post=post),
+            lambda: post.comments.create(author=user, text='Комментарий'),
+        ]
+        for change in changes:
+            pages = [self.guest_client.get(url).content for url in urls]
+            change()
+            for url, page in zip(urls, pages):
+                with self.subTest(url=url):
+                    self.assertNotEqual(self.guest_client.get(url).content,
+                                        page)
+        page = self.guest_client.get(urls[2]).content
+        Follow.objects.create(user=user, author=AnonymousPageCacheTests.user1)
+        self.assertNotEqual(self.guest_client.get(urls[2]).content, page)
+
+    def test_authenticated_bypasses_cache(self):
+        """Проверить, что авторизованный пользователь видит свежую ленту."""
+        self.guest_client.get(reverse('index'))
+        response = self.authorized_client.get(reverse('index'))
+        self.assertIsNotNone(response.context)
+
+
+class ConditionalGetTests(TestingStand):
+    """ Класс ConditionalGetTests используется для тестирования условных
+    GET-запросов к страницам.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_not_modified_without_queries() -- проверяет ответ 304 без запросов
+        к БД.
+    test_etag_changes_on_update() -- проверяет смену ETag при изменении
+        данных страницы.
+    test_etag_depends_on_user() -- проверяет, что ETag зависит от
+        пользователя.
+    test_follow_feed_etag_changes_on_unfollow() -- проверяет смену ETag
+        ленты подписок при отписке.
+    test_etag_depends_on_csrf_token() -- проверяет, что ETag зависит от
+        CSRF-токена.
+    """
+
+    def test_not_modified_without_queries(self):
+        """Проверить 304 по If-None-Match и If-Modified-Since."""
+        for url in (reverse('index'), reverse(
+                'profile', args=[ConditionalGetTests.user1.username])):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(0):
+                    cached = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached['ETag'], response['ETag'])
+                cached = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(cached.status_code, 304)
+
+    def test_etag_changes_on_update(self):
+        """Проверить, что новый комментарий меняет ETag страницы поста."""
+        post = ConditionalGetTests.post1
+        url = reverse('post', args=[post.author.username, post.id])
+        etag = self.authorized_client.get(url)['ETag']
+        post.comments.create(author=ConditionalGetTests.user2, text='Новый')
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_user(self):
+        """Проверить, что гость не получает 304 по ETag пользователя."""
+        url = reverse('index')
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_feed_etag_changes_on_unfollow(self):
+        """Проверить, что после отписки лента подписок не отвечает 304."""
+        url = reverse('follow_index')
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        unfollow(ConditionalGetTests.user1, ConditionalGetTests.user2.pk)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_csrf_token(self):
+        """Проверить, что после смены CSRF-токена страница с формами не
+        отвечает 304."""
+        url = reverse('index')
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        etag = self.authorized_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ToggleEndpointsTests(TestingStand):
+    """ Класс ToggleEndpointsTests используется для тестирования
+    JSON-эндпоинтов лайков и подписок.
+
+    Родительский класс -- TestingStand.
+
+    Методы класса
+    --------
+    test_like_toggle() -- проверяет установку и снятие лайка.
+    test_follow_toggle() -- проверяет подписку и отписку.
+    test_toggle_requires_post_and_login() -- проверяет метод и авторизацию.
+    test_cards_have_switch_attributes() -- проверяет разметку кнопок.
+    """
+
+    def test_like_toggle(self):
+        """Проверить лайк, повторный лайк и переключение без параметра."""
+        post = ToggleEndpointsTests.post2
+        url = reverse('post_like_toggle', args=[post.author.username,
+                                                post.id])
+        for _ in range(2):
+            response = self.authorized_client.post(url, {'active': '1'})
+            self.assertEqual(response.json(), {
+                'post': post.id, 'liked': True, 'likes_count': 1})
+        response = self.authorized_client.post(url)
+        self.assertEqual(response.json()['liked'], False)
+        self.assertEqual(response.json()['likes_count'], 0)
+        self.assertFalse(Like.objects.filter(
+            post=post, user=ToggleEndpointsTests.user1).exists())
+        wrong = reverse('post_like_toggle', args=['nobody', post.id])
+        self.assertEqual(self.authorized_client.post(wrong).status_code, 404)
+
+    def test_follow_toggle(self):
+        """Проверить отписку, подписку и запрет подписки на себя."""
+        user1, user2 = ToggleEndpointsTests.user1, ToggleEndpointsTests.user2
+        url = reverse('profile_follow_toggle', args=[user2.username])
+        response = self.authorized_client.post(url, {'active': '0'})
+        self.assertEqual(response.json(), {
+            'author': user2.username, 'following': False,
+            'followers_count': 0})
+        response = self.authorized_client.post(url)
+        self.assertTrue(response.json()['following'])
+        self.assertEqual(response.json()['followers_count'], 1)
+        self.assertTrue(Follow.objects.filter(user=user1,
+                                              author=user2).exists())
+        own = reverse('profile_follow_toggle', args=[user1.username])
+        self.assertEqual(self.authorized_client.post(own).status_code, 400)
+
+    def test_toggle_requires_post_and_login(self):
+        """Проверить ответы на GET и на запрос гостя."""
+        post = ToggleEndpointsTests.post1
+        url = reverse('post_like_toggle', args=[post.author.username,
+                                                post.id])
+        self.assertEqual(self.authorized_client.get(url).status_code, 405)
+        self.assertEqual(self.guest_client.post(url).status_code, 403)
+
+    def test_cards_have_switch_attributes(self):
+        """Проверить, что кнопки лайка и подписки размечены для скрипта."""
+        user2 = ToggleEndpointsTests.user2
+        response = self.authorized_client.get(
+            reverse('profile', args=[user2.username]))
+        content = response.content.decode()
+        self.assertIn(reverse('profile_follow_toggle',
+                              args=[user2.username]), content)
+        self.assertIn('data-switch="like"', content)
+        self.assertIn(f'id="likes_count_{ToggleEndpointsTests.post2.id}"',
+                      content)
+        self.assertIn('name="csrf-token"', content)
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.core.cache import cache
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .models import POST_THUMBNAILS, Post
+
+VARIANTS_PREFIX = 'post_image_variants:'
+
+
+def variants_key(name):
+    """Вернуть ключ кэша адаптивных вариантов изображения name."""
+    return VARIANTS_PREFIX + hashlib.md5(name.encode()).hexdigest()
+
+
+def get_image_variants(posts):
+    """Вернуть словарь {id поста: варианты изображения} для постов с
+    изображением (см. Post.get_image_variants).
+
+    Варианты, сохраненные generate_post_thumbnails(), читаются одним
+    запросом к кэшу; недостающие вычисляются через sorl и сохраняются.
+    """
+    keys = {post.pk: variants_key(post.image.name)
+            for post in posts if post.image}
+    stored = cache.get_many(list(keys.values()))
+    missing = {}
+    for post in posts:
+        key = keys.get(post.pk)
+        if key is not None and key not in stored:
+            stored[key] = missing[key] = post.get_image_variants()
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return {pk: stored[key] for pk, key in keys.items()}
+
+
+def generate_post_thumbnails(post_id, check_files=False):
+    """Сгенерировать все миниатюры изображения поста.
+
+    Уже созданные миниатюры берутся из key-value хранилища sorl. При
+    check_files = True миниатюры, файлы которых пропали из хранилища,
+    создаются заново. Адреса адаптивных вариантов сохраняются в кэше для
+    вывода в API (см. get_image_variants). Вернуть число обработанных
+    миниатюр.
+    """
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return 0
+    for geometry, options in POST_THUMBNAILS:
+        thumbnail = get_thumbnail(post.image, geometry, **options)
+        if check_files and not thumbnail.exists():
+            default.kvstore.delete(thumbnail)
+            get_thumbnail(post.image, geometry, **options)
+    cache.set(variants_key(post.image.name), post.get_image_variants(),
+              timeout=None)
+    return len(POST_THUMBNAILS)
+
+
+def delete_image_thumbnails(name):
+    """Удалить миниатюры изображения name, их записи в key-value
+    хранилище sorl и адреса вариантов в кэше. Сам файл изображения не
+    удаляется."""
+    delete(ImageFile(name, default.storage), delete_file=False)
+    cache.delete(variants_key(name))
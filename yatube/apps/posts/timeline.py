@@ -0,0 +1,77 @@
+from django.conf import settings
+
+from . import page_cache
+from .models import Follow, Post, TimelineEntry
+
+FANOUT_BATCH_SIZE = getattr(settings, 'TIMELINE_FANOUT_BATCH_SIZE', 500)
+BACKFILL_SIZE = getattr(settings, 'TIMELINE_BACKFILL_SIZE', 100)
+
+
+def fan_out_post(post_id, start_after=0, max_batches=None):
+    """Разослать пост в ленты подписчиков автора пачками.
+
+    Подписчики перебираются по возрастанию id начиная с start_after, каждая
+    пачка записывается одним bulk_create, после чего сбрасываются
+    валидаторы страниц ленты этих подписчиков. Если задан max_batches и
+    подписчики не закончились, вернуть id последнего обработанного
+    подписчика, иначе вернуть None.
+    """
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date').first()
+    if post is None:
+        return None
+    followers = Follow.objects.filter(author_id=post['author_id']).order_by(
+        'user_id').values_list('user_id', flat=True)
+    batches = 0
+    while True:
+        batch = list(followers.filter(user_id__gt=start_after)[
+                     :FANOUT_BATCH_SIZE])
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=post_id,
+                           pub_date=post['pub_date']) for user_id in batch],
+            ignore_conflicts=True)
+        page_cache.invalidate(*map(page_cache.timeline_scope, batch))
+        if len(batch) < FANOUT_BATCH_SIZE:
+            return None
+        start_after = batch[-1]
+        batches += 1
+        if max_batches and batches >= max_batches:
+            return start_after
+
+
+def backfill(user_id, author_id, limit=BACKFILL_SIZE):
+    """Добавить в ленту пользователя последние limit постов автора и
+    сбросить валидаторы страницы его ленты."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')
+    if limit is not None:
+        posts = posts[:limit]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True)
+    page_cache.invalidate(page_cache.timeline_scope(user_id))
+
+
+def prune(user_id, author_id):
+    """Удалить из ленты пользователя все посты автора и сбросить
+    валидаторы страницы его ленты."""
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 post__author_id=author_id).delete()
+    page_cache.invalidate(page_cache.timeline_scope(user_id))
+
+
+def rebuild_for_authors(author_ids, limit=BACKFILL_SIZE):
+    """Заполнить ленты подписчиков авторов author_ids их последними
+    постами. Уже существующие записи ленты не дублируются. Вернуть число
+    обработанных подписок."""
+    author_ids = sorted(author_ids)
+    total = 0
+    for start in range(0, len(author_ids), FANOUT_BATCH_SIZE):
+        follows = Follow.objects.filter(
+            author_id__in=author_ids[start:start + FANOUT_BATCH_SIZE]
+        ).values_list('user_id', 'author_id')
+        for user_id, author_id in follows.iterator():
+            backfill(user_id, author_id, limit)
+            total += 1
+    return total
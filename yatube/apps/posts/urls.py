@@ -23,15 +23,24 @@ urlpatterns = [
     path('<str:username>/unfollow/',
          views.ProfileUnfollowView.as_view(),
          name='profile_unfollow'),
+    path('<str:username>/follow/toggle/',
+         views.ProfileFollowToggleView.as_view(),
+         name='profile_follow_toggle'),
     path('like/',
          views.LikeIndexView.as_view(),
          name='like_index'),
+    path('search/',
+         views.SearchView.as_view(),
+         name='search'),
     path('<str:username>/<int:post_id>/like/',
          views.PostLikeView.as_view(),
          name='post_like'),
     path('<str:username>/<int:post_id>/unlike/',
          views.PostUnlikeView.as_view(),
          name='post_unlike'),
+    path('<str:username>/<int:post_id>/like/toggle/',
+         views.PostLikeToggleView.as_view(),
+         name='post_like_toggle'),
     path('<str:username>/',
          views.UserProfileView.as_view(),
          name='profile'),
@@ -1,7 +1,16 @@
-from django.db.models import BooleanField, Case, Count, Sum, Value, When
+from django.db.models import BooleanField, Exists, F, OuterRef, Value
 from django.shortcuts import get_object_or_404
 
-from .models import Follow, Post, User
+from .counters import rebuild_author_stats
+from .models import AuthorStats, Follow, Like, Post, User
+
+
+def liked_by(user):
+    """ Вернуть выражение EXISTS, истинное для постов с лайком user.
+
+    Подзапрос использует индекс unique_like (user, post) и не размножает
+    строки основной выборки, в отличие от JOIN с агрегатом."""
+    return Exists(Like.objects.filter(post=OuterRef('pk'), user=user))
 
 
 class UserProfile:
@@ -26,12 +35,13 @@ class UserProfile:
     def user_info(self):
         """ Вернуть словарь с информацией о пользователе."""
         author = self.user
+        stats = AuthorStats.objects.filter(pk=author.pk).first()
         user_info = {
             'fullname': ' '.join((author.first_name, author.last_name)),
             'username': author.username,
-            'quantity_posts': author.posts.count(),
-            'quantity_followers': author.following.count(),
-            'quantity_following': author.follower.count(),
+            'quantity_posts': stats.posts_count if stats else 0,
+            'quantity_followers': stats.followers_count if stats else 0,
+            'quantity_following': stats.following_count if stats else 0,
         }
         if not self.viewer.is_anonymous and self.viewer != author:
             user_info = {**user_info,
@@ -44,15 +54,10 @@ class UserProfile:
     @property
     def user_posts(self):
         """ Вернуть выборку постов пользователя."""
-        return self.user.posts.select_related(
-            'group').annotate(
-            count_comments=Count('comments', distinct=True),
-            count_likes=Count('likes', distinct=True),
-            is_user_liked=Sum(Case(When(likes__user=self.viewer, then=True),
-                                   default=False,
-                                   output_field=BooleanField())
-                              )
-        )
+        posts = self.user.posts.select_related('group')
+        if self.viewer is None or self.viewer.is_anonymous:
+            return posts
+        return posts.annotate(is_user_liked=liked_by(self.viewer))
 
 
 class PostQuerySet:
@@ -73,34 +78,46 @@ class PostQuerySet:
         self.user_request = user_request
 
     def get_author_with_stat(self, author):
-        """ Вернуть выборку с расшириной информацией о пользователе."""
-        author = get_object_or_404(User, username=author)
-        user_info = User.objects.annotate(
-            count_posts=Count('posts', distinct=True),
-            count_followers=Count('following', distinct=True),
-            count_following=Count('follower', distinct=True)
-        )
+        """ Вернуть пользователя с расширенной информацией.
+
+        Статистика берется из материализованной таблицы AuthorStats,
+        присоединенной к выборке пользователя по первичному ключу.
+        Отсутствующая запись статистики создается при первом обращении."""
+        author = get_object_or_404(User.objects.select_related('stats'),
+                                   username=author)
+        try:
+            stats = author.stats
+        except AuthorStats.DoesNotExist:
+            rebuild_author_stats(user_ids=[author.pk])
+            stats = AuthorStats.objects.get(pk=author.pk)
+        author.count_posts = stats.posts_count
+        author.count_followers = stats.followers_count
+        author.count_following = stats.following_count
         if not self.user_request.is_anonymous and self.user_request != author:
-            is_following = Follow.objects.filter(
+            author.is_follow_available = True
+            author.is_following = Follow.objects.filter(
                 author=author, user=self.user_request).exists()
-            user_info = user_info.annotate(
-                is_follow_available=Value(True, output_field=BooleanField()),
-                is_following=Value(is_following, output_field=BooleanField())
-            )
-        return user_info.get(username=author)
+        return author
 
     def get_posts_with_stat(self):
-        """ Вернуть выборку постов с расширинной статистикой."""
-        posts = Post.objects.select_related('group', 'author').annotate(
-            count_comments=Count('comments', distinct=True),
-            count_likes=Count('likes', distinct=True))
+        """ Вернуть выборку постов с расширинной статистикой.
+
+        Число лайков и комментариев берется из денормализованных полей
+        likes_count и comments_count."""
+        posts = Post.objects.select_related('group', 'author')
 
         if not self.user_request.is_anonymous:
-            posts = posts.annotate(
-                is_user_liked=Sum(
-                    Case(When(likes__user=self.user_request, then=True),
-                         default=False,
-                         output_field=BooleanField())
-                )
-            )
+            posts = posts.annotate(is_user_liked=liked_by(self.user_request))
         return posts
+
+    def get_liked_posts(self):
+        """ Вернуть посты, понравившиеся пользователю, в порядке лайков.
+
+        Выборка строится от таблицы Like по индексу (user, created), время и
+        id лайка доступны как liked_at и like_id."""
+        return Post.objects.select_related('group', 'author').filter(
+            likes__user=self.user_request).annotate(
+            is_user_liked=Value(True, output_field=BooleanField()),
+            liked_at=F('likes__created'),
+            like_id=F('likes__id')
+        ).order_by('-liked_at', '-like_id')
@@ -1,4 +1,6 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import F
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.views import View
@@ -7,8 +9,15 @@ from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView
 from django.views.generic.list import ListView
 
+from .db import WriteTransactionMixin
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Like, Post, User
+from .models import AuthorStats, Follow, Group, Like, Post, User
+from .page_cache import (AnonymousPageCacheMixin, ConditionalPageMixin,
+                         feed_scope, group_scope, post_scope, timeline_scope,
+                         user_scope)
+from .pagination import KeysetPaginationMixin
+from .search import search_posts
+from .services import follow, like, unfollow, unlike
 from .view_add import PostQuerySet, UserProfile
 
 
@@ -34,7 +43,8 @@ def server_error(request):
     return render(request, "misc/500.html", status=500)
 
 
-class MainIndexView(ListView):
+class MainIndexView(ConditionalPageMixin, AnonymousPageCacheMixin,
+                    KeysetPaginationMixin, ListView):
     template_name = 'index.html'
     context_object_name = 'posts'
     paginate_by = 10
@@ -51,25 +61,65 @@ class FollowIndexView(LoginRequiredMixin, MainIndexView):
     login_url = reverse_lazy('login')
     extra_context = {'type_index': 'follow',
                      'title': 'Сообщения избранных авторов'}
+    keyset_ordering = ('-feed_date', '-id')
+
+    def get_page_cache_scopes(self):
+        return [feed_scope(), timeline_scope(self.request.user.pk)]
 
     def get_queryset(self):
+        """Вернуть посты из материализованной ленты подписок."""
         return super(FollowIndexView, self).get_queryset().filter(
-            author__following__user=self.request.user)
+            timeline_entries__user=self.request.user).annotate(
+            feed_date=F('timeline_entries__pub_date')).order_by(
+            '-feed_date', '-id')
 
 
 class LikeIndexView(LoginRequiredMixin, MainIndexView):
     login_url = reverse_lazy('login')
     extra_context = {'type_index': 'like',
                      'title': 'Понравившееся'}
+    keyset_ordering = ('-liked_at', '-like_id')
+
+    def get_queryset(self):
+        """Вернуть понравившиеся посты в порядке лайков."""
+        return PostQuerySet(self.request.user).get_liked_posts()
+
+
+class SearchView(ListView):
+    """ Класс SearchView для полнотекстового поиска по постам.
+
+    Родительский класс -- ListView.
+
+    Результаты упорядочены по релевантности и разбиты на страницы по номеру.
+
+    Методы класса
+    --------
+    get_queryset() -- возвращает посты, подходящие под запрос q.
+    get_context_data() -- добавляет в контекст текст запроса.
+    """
+
+    template_name = 'search.html'
+    context_object_name = 'posts'
+    paginate_by = 10
 
     def get_queryset(self):
-        return super(LikeIndexView, self).get_queryset().filter(
-            is_user_liked=True)
+        """Вернуть найденные посты."""
+        queryset = PostQuerySet(self.request.user).get_posts_with_stat()
+        return search_posts(self.request.GET.get('q', ''), queryset)
+
+    def get_context_data(self, **kwargs):
+        """Вернуть контекст с текстом запроса."""
+        context = super(SearchView, self).get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '').strip()
+        return context
 
 
 class GroupPostsView(MainIndexView):
     template_name = 'group.html'
 
+    def get_page_cache_scopes(self):
+        return [group_scope(self.kwargs['slug'])]
+
     def get_queryset(self):
         return super(GroupPostsView, self).get_queryset().filter(
             group__slug=self.kwargs['slug'])
@@ -95,6 +145,9 @@ class UserProfileView(MainIndexView):
 
     template_name = 'profile.html'
 
+    def get_page_cache_scopes(self):
+        return [user_scope(self.kwargs['username'])]
+
     def get_queryset(self):
         author = get_object_or_404(User, username=self.kwargs['username'])
         queryset = PostQuerySet(self.request.user)
@@ -110,10 +163,11 @@ class UserProfileView(MainIndexView):
         return context
 
 
-class PostView(DetailView):
+class PostView(ConditionalPageMixin, AnonymousPageCacheMixin, DetailView):
     """ Класс PostView для просмотра пооста.
 
-    Родительский класс -- DetailView.
+    Родительский класс -- ConditionalPageMixin, AnonymousPageCacheMixin,
+    DetailView.
 
     Методы класса
     --------
@@ -124,6 +178,10 @@ class PostView(DetailView):
     template_name = 'post.html'
     pk_url_kwarg = 'post_id'
 
+    def get_page_cache_scopes(self):
+        return [post_scope(self.kwargs['post_id']),
+                user_scope(self.kwargs['username'])]
+
     def get_queryset(self):
         author = get_object_or_404(User, username=self.kwargs['username'])
         queryset = PostQuerySet(self.request.user)
@@ -142,10 +200,11 @@ class PostView(DetailView):
         return context
 
 
-class NewPostView(LoginRequiredMixin, CreateView):
+class NewPostView(LoginRequiredMixin, WriteTransactionMixin, CreateView):
     """ Класс NewPostView для представления формы создания новой записи.
 
-    Родительский класс -- LoginRequiredMixin, CreateView.
+    Родительский класс -- LoginRequiredMixin, WriteTransactionMixin,
+    CreateView.
 
     Методы класса
     --------
@@ -166,10 +225,11 @@ class NewPostView(LoginRequiredMixin, CreateView):
         return super(NewPostView, self).form_valid(form)
 
 
-class EditPostView(LoginRequiredMixin, UpdateView):
+class EditPostView(LoginRequiredMixin, WriteTransactionMixin, UpdateView):
     """ Класс EditPostView для редактирования поста.
 
-    Родительский класс -- LoginRequiredMixin, UpdateView.
+    Родительский класс -- LoginRequiredMixin, WriteTransactionMixin,
+    UpdateView.
 
     Методы класса
     --------
@@ -201,10 +261,11 @@ class EditPostView(LoginRequiredMixin, UpdateView):
         return kwargs
 
 
-class AddCommentView(LoginRequiredMixin, CreateView):
+class AddCommentView(LoginRequiredMixin, WriteTransactionMixin, CreateView):
     """ Класс AddCommentView для представления страницы с комментариями.
 
-    Родительский класс -- LoginRequiredMixin, CreateView.
+    Родительский класс -- LoginRequiredMixin, WriteTransactionMixin,
+    CreateView.
 
     Методы класса
     --------
@@ -236,7 +297,7 @@ class ProfileFollowView(LoginRequiredMixin, View):
         author = get_object_or_404(User, username=self.kwargs['username'])
         user = self.request.user
         if author != user:
-            Follow.objects.get_or_create(author=author, user=user)
+            follow(user, author.pk)
         return redirect(
             self.request.GET.get('next',
                                  reverse('profile', kwargs=self.kwargs)
@@ -250,7 +311,7 @@ class ProfileUnfollowView(LoginRequiredMixin, View):
 
     def get(self, *args, **kwargs):
         author = get_object_or_404(User, username=self.kwargs['username'])
-        Follow.objects.filter(author=author, user=self.request.user).delete()
+        unfollow(self.request.user, author.pk)
         return redirect(
             self.request.GET.get('next',
                                  reverse('profile', kwargs=self.kwargs)
@@ -264,7 +325,7 @@ class PostLikeView(LoginRequiredMixin, View):
 
     def get(self, *args, **kwargs):
         post = get_object_or_404(Post, id=self.kwargs['post_id'])
-        Like.objects.get_or_create(post=post, user=self.request.user)
+        like(self.request.user, post.pk)
         back_reference = f"{self.request.GET['next']}" \
                          f"#post_{self.kwargs['post_id']}"
         return redirect(back_reference)
@@ -276,7 +337,92 @@ class PostUnlikeView(LoginRequiredMixin, View):
 
     def get(self, *args, **kwargs):
         post = get_object_or_404(Post, id=self.kwargs['post_id'])
-        Like.objects.filter(post=post, user=self.request.user).delete()
+        unlike(self.request.user, post.pk)
         back_reference = f"{self.request.GET['next']}" \
                          f"#post_{self.kwargs['post_id']}"
         return redirect(back_reference)
+
+
+class ToggleView(LoginRequiredMixin, WriteTransactionMixin, View):
+    """ Класс ToggleView -- основа POST-эндпоинтов, которые включают или
+    выключают лайк либо подписку и возвращают новое состояние в JSON.
+
+    Родительский класс -- LoginRequiredMixin, WriteTransactionMixin, View.
+
+    Страница не перерисовывается: кнопка и счетчик обновляются на месте
+    скриптом toggle.js. Параметр active=1/0 задает нужное состояние, так что
+    повторный запрос (двойной щелчок) не отменяет первый; без параметра
+    состояние переключается. Неавторизованный пользователь получает 403.
+
+    Методы класса
+    --------
+    get_desired_state(current) -- возвращает состояние, которое нужно
+        установить.
+    """
+    raise_exception = True
+    http_method_names = ['post']
+
+    def get_desired_state(self, current=None):
+        """Вернуть нужное состояние из параметра active. Если параметр не
+        передан, вернуть состояние, противоположное current (функция без
+        аргументов, вызываемая только в этом случае)."""
+        value = self.request.POST.get('active')
+        if value is None:
+            return not current()
+        return value.lower() in ('1', 'true', 'on')
+
+
+class PostLikeToggleView(ToggleView):
+    """ Класс PostLikeToggleView ставит или снимает лайк поста.
+
+    Родительский класс -- ToggleView.
+
+    Возвращает {"post": id, "liked": bool, "likes_count": int}.
+    """
+
+    def post(self, *args, **kwargs):
+        post_id = get_object_or_404(
+            Post.objects.values_list('pk', flat=True),
+            pk=self.kwargs['post_id'], author__username=self.kwargs[
+                'username'])
+        user = self.request.user
+        liked = self.get_desired_state(Like.objects.filter(
+            post_id=post_id, user=user).exists)
+        if liked:
+            like(user, post_id)
+        else:
+            unlike(user, post_id)
+        likes_count = Post.objects.filter(pk=post_id).values_list(
+            'likes_count', flat=True).first()
+        return JsonResponse({'post': post_id, 'liked': liked,
+                             'likes_count': likes_count or 0})
+
+
+class ProfileFollowToggleView(ToggleView):
+    """ Класс ProfileFollowToggleView подписывает на автора или отписывает
+    от него.
+
+    Родительский класс -- ToggleView.
+
+    Возвращает {"author": username, "following": bool,
+    "followers_count": int}. На самого себя подписаться нельзя (400).
+    """
+
+    def post(self, *args, **kwargs):
+        author = get_object_or_404(User.objects.only('pk', 'username'),
+                                   username=self.kwargs['username'])
+        user = self.request.user
+        if author == user:
+            return JsonResponse(
+                {'error': 'Нельзя подписываться на самого себя'}, status=400)
+        following = self.get_desired_state(Follow.objects.filter(
+            author=author, user=user).exists)
+        if following:
+            follow(user, author.pk)
+        else:
+            unfollow(user, author.pk)
+        followers_count = AuthorStats.objects.filter(
+            pk=author.pk).values_list('followers_count', flat=True).first()
+        return JsonResponse({'author': author.username,
+                             'following': following,
+                             'followers_count': followers_count or 0})
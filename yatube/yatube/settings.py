@@ -58,6 +58,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.posts.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # 'corsheaders.middleware.CorsMiddleware',
@@ -67,6 +68,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'apps.posts.post_api.throttling.RateLimitHeadersMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -95,13 +97,57 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# SQLite с профилем для продакшена (apps.posts.sqlite). Соединения
+# переиспользуются между запросами CONN_MAX_AGE секунд (None -- без
+# ограничения, 0 -- новое соединение на каждый запрос). Прагмы выполняются
+# при открытии каждого соединения: журнал WAL -- чтения не блокируют запись;
+# synchronous=NORMAL -- без fsync на каждую транзакцию в WAL; отображение
+# файла в память и кэш страниц 64 МБ; ожидание блокировки записи до 5 с
+# вместо немедленной ошибки "database is locked"; временные таблицы в
+# памяти. immediate_writes -- транзакции изменяющих представлений и
+# сервисов начинаются с BEGIN IMMEDIATE (apps.posts.db.immediate_atomic)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'apps.posts.sqlite',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+                'busy_timeout': 5000,
+                'temp_store': 'MEMORY',
+            },
+            'immediate_writes': True,
+        },
     }
 }
 
+# Реплики для чтения: пути к копиям основной базы через запятую в
+# DB_REPLICAS (копии обновляются снаружи, например litestream или
+# sqlite3 .backup). Реплики открываются только для чтения (query_only) и не
+# мигрируются; в тестах они указывают на тестовую основную базу. Чтения
+# HTTP-запросов распределяются по репликам, кроме изменяющих запросов и
+# REPLICA_PIN_SECONDS секунд после записи пользователя
+# (apps.posts.routers.PrimaryReplicaRouter)
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': path.strip(),
+        'OPTIONS': {
+            'pragmas': {**DATABASES['default']['OPTIONS']['pragmas'],
+                        'query_only': 'ON'},
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+DATABASE_ROUTERS = ['apps.posts.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -151,12 +197,63 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Кэш в файле SQLite (режим WAL), общий для всех процессов сервера: кэш
+# страниц и счетчики ограничения частоты запросов API не дробятся по
+# воркерам. При превышении MAX_ENTRIES вытесняются давно не читавшиеся
+# записи
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'apps.posts.cache_backend.SQLiteCache',
+        'LOCATION': os.getenv('CACHE_LOCATION',
+                              os.path.join(BASE_DIR, 'cache', 'default.db')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
 
+# Тесты работают с кэшем во временном файле, а не с кэшем сайта
+TEST_RUNNER = 'yatube.test_runner.TemporaryCacheRunner'
+
+# Пагинация HTML-лент: 'offset' -- номера страниц, 'keyset' -- курсоры
+# "новее/старее" без COUNT(*)
+FEED_PAGINATION = 'offset'
+
+# Время жизни кэша общей части карточек постов, секунд. Актуальность
+# обеспечивает версия поста в ключе кэша
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Период переноса счетчиков попаданий в кэш карточек из памяти процесса в
+# общий кэш, секунд
+POST_CARD_STATS_FLUSH_INTERVAL = 60
+
+# Кэш страниц для анонимных пользователей. Страницы сбрасываются при
+# изменении зависимых записей, таймаут лишь ограничивает объем кэша
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Админ-панель: больше стольких записей список считается по оценке СУБД,
+# отфильтрованный список -- точно, но не дальше этого предела
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Фоновые задачи: при True выполняются сразу в потоке запроса, иначе
+# ставятся в очередь в БД и выполняются командой manage.py run_tasks
+BACKGROUND_TASKS_EAGER = False
+# Очередь задач: задержка первого повтора и её предел (удваивается с каждой
+# попыткой), число попыток и время, после которого зависшая задача снова
+# выдаётся в работу, секунд
+TASKS_RETRY_BASE_DELAY = 5
+TASKS_RETRY_MAX_DELAY = 60 * 60
+TASKS_MAX_ATTEMPTS = 5
+TASKS_VISIBILITY_TIMEOUT = 10 * 60
+
+# Лента подписок: размер пачки рассылки поста подписчикам и число постов
+# автора, добавляемых в ленту при подписке
+TIMELINE_FANOUT_BATCH_SIZE = 500
+TIMELINE_BACKFILL_SIZE = 100
+
+# Максимальное число элементов в пакетных запросах API (.../bulk/)
+API_BULK_MAX_ITEMS = 100
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 
@@ -164,19 +261,40 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 
+    # JSON через orjson и MessagePack (Accept: application/msgpack)
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.posts.post_api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'apps.posts.post_api.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.posts.post_api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
 
+    # скользящее окно по двум счетчикам в общем кэше; отдельные лимиты на
+    # чтение и запись, для пользователей и анонимов, и на выдачу токенов
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'apps.posts.post_api.throttling.SlidingWindowThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'user': '10000/day',  # лимит для UserRateThrottle
-        'anon': '1000/day',  # лимит для AnonRateThrottle
+        'user_read': '10000/day',
+        'user_write': '1000/day',
+        'anon_read': '1000/day',
+        'anon_write': '100/day',
+        'token': '20/min',  # TokenRateThrottle, с одного адреса
     },
 
+    # курсорная пагинация по (pub_date, id) без COUNT(*)
+    'DEFAULT_PAGINATION_CLASS':
+        'apps.posts.post_api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 20,
+
 }
 
 SIMPLE_JWT = {
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TemporaryCacheRunner(DiscoverRunner):
+    """ Класс TemporaryCacheRunner запускает тесты с кэшем default во
+    временном файле.
+
+    Кэш сайта (SQLiteCache) -- файл, общий для всех процессов, поэтому
+    тесты, очищающие кэш, не должны трогать кэш работающего сервера.
+    Бэкенд и параметры кэша сохраняются: тесты, проверяющие общий кэш
+    нескольких процессов, работают с тем же бэкендом, что и сайт.
+
+    Родительский класс -- DiscoverRunner.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.cache_settings = override_settings(CACHES={
+            **settings.CACHES,
+            'default': {
+                **settings.CACHES['default'],
+                'LOCATION': os.path.join(self.cache_directory.name,
+                                         'default.db'),
+            },
+        })
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        self.cache_directory.cleanup()
+        super().teardown_test_environment(**kwargs)